@@ -0,0 +1,187 @@
+"""
+Global admission control ahead of the per-user security checks.
+
+SecurityMiddleware reasons per user, so a flood from many distinct accounts passes
+it and still reaches Firestore. AdmissionMiddleware caps total updates per second
+with a token bucket and sheds the excess with a canned reply before any handler runs.
+
+Users in the middle of a survey get priority: new conversations may not take the
+last share of the bucket (ADMISSION_PRIORITY_RESERVE), so surveys keep going while
+new /start traffic is shed.
+
+Configured from the environment:
+- ADMISSION_RATE: admitted updates per second (default 0: admission control is off
+  until a rate matching the deployment's capacity is set)
+- ADMISSION_BURST: bucket size, i.e. the burst admitted at once (default 2 x rate)
+- ADMISSION_PRIORITY_RESERVE: share of the bucket reserved for survey updates
+- ADMISSION_SHED_REPLY_RATE: canned overload replies per second
+"""
+
+import logging
+import os
+import time
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from constants import msg_overloaded
+from functions import safe_callback_answer
+from logging_config import log_info, log_warning
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate tokens per second.
+
+    try_take() refuses when no token is left (admission control); reserve() always
+    takes one, letting the balance go negative, and returns how long the caller has
+    to wait for it - so concurrent callers queue up in order (outbound pacing).
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, reserve: float = 0.0) -> bool:
+        """Take a token if at least reserve tokens would be left"""
+        self._refill()
+        if self.tokens - 1 < reserve:
+            return False
+        self.tokens -= 1
+        return True
+
+    def reserve(self) -> float:
+        """Take a token; returns the delay (seconds) until it is actually available"""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def delay(self) -> float:
+        """Time until a token is available, without taking it"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def is_idle(self) -> bool:
+        """True when the bucket is full, i.e. the same as a new one"""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Outer update middleware admitting updates through a global token bucket.
+
+    Register it with dp.update.outer_middleware after creating the Dispatcher, so it
+    runs after FSMContextMiddleware and sees raw_state. Updates from users whose state
+    belongs to priority_states may use the reserved share of the bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float = 30.0,
+        burst: float = 60.0,
+        priority_reserve: float = 0.25,
+        priority_states: Any = None,
+        shed_reply_rate: float = 5.0,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.reserve = self.bucket.capacity * min(max(priority_reserve, 0.0), 1.0)
+        # A StatesGroup: `raw_state in priority_states` matches any of its states
+        self.priority_states = priority_states
+        # Replies are API calls too, so they are rate limited on their own
+        self.reply_bucket = TokenBucket(shed_reply_rate, shed_reply_rate)
+
+        self.admitted = 0
+        self.admitted_priority = 0
+        self.shed = 0
+        self.shed_priority = 0
+        self.shed_replies = 0
+        self._overloaded = False
+        self._shed_in_overload = 0
+
+    def _is_priority(self, data: dict[str, Any]) -> bool:
+        raw_state = data.get("raw_state")
+        if not raw_state or self.priority_states is None:
+            return False
+        return raw_state in self.priority_states
+
+    async def _reply_shed(self, event: TelegramObject) -> None:
+        if not self.reply_bucket.try_take():
+            return
+        self.shed_replies += 1
+        if isinstance(event, CallbackQuery):
+            await safe_callback_answer(event, msg_overloaded)
+        elif isinstance(event, Message):
+            try:
+                await event.answer(msg_overloaded)
+            except TelegramAPIError as e:
+                logger.debug("Overload reply failed: %s", str(e))
+
+    async def __call__(self, handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        priority = self._is_priority(data)
+        if self.bucket.try_take(0.0 if priority else self.reserve):
+            self.admitted += 1
+            if priority:
+                self.admitted_priority += 1
+            elif self._overloaded:
+                # Only new traffic getting through again means the overload is over
+                self._overloaded = False
+                log_info(logger, action="admission_recovered", shed=self._shed_in_overload)
+            return await handler(event, data)
+
+        self.shed += 1
+        if priority:
+            self.shed_priority += 1
+        if not self._overloaded:
+            self._overloaded = True
+            self._shed_in_overload = 0
+            log_warning(
+                logger,
+                action="admission_overload",
+                reason="Global update rate exceeded, shedding load",
+                rate=self.bucket.rate,
+            )
+        self._shed_in_overload += 1
+
+        inner_event = event.event if isinstance(event, Update) else event
+        await self._reply_shed(inner_event)
+
+    def stats(self) -> dict[str, int]:
+        """Get admitted and shed update counts."""
+        return {
+            "admitted": self.admitted,
+            "admitted_priority": self.admitted_priority,
+            "shed": self.shed,
+            "shed_priority": self.shed_priority,
+            "shed_replies": self.shed_replies,
+        }
+
+
+def create_admission_middleware(priority_states: Any = None) -> AdmissionMiddleware | None:
+    """
+    Create the admission middleware from ADMISSION_* settings.
+
+    Returns None when ADMISSION_RATE is 0 (admission control disabled, the default).
+    """
+    rate = float(os.getenv("ADMISSION_RATE", "0"))
+    if rate <= 0:
+        return None
+    return AdmissionMiddleware(
+        rate=rate,
+        burst=float(os.getenv("ADMISSION_BURST", str(rate * 2))),
+        priority_reserve=float(os.getenv("ADMISSION_PRIORITY_RESERVE", "0.25")),
+        priority_states=priority_states,
+        shed_reply_rate=float(os.getenv("ADMISSION_SHED_REPLY_RATE", "5")),
+    )
@@ -4,7 +4,9 @@ import sys
 from os import getenv
 from pathlib import Path
 
+from admission import create_admission_middleware
 from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
@@ -17,6 +19,7 @@ from build_resume.stage_resume import (
     convert_firebase_resume_to_display_format,
     format_resume_display,
 )
+from callback_router import CallbackRouter
 from constants import (
     ask_name,
     button_create_resume,
@@ -26,6 +29,7 @@ from constants import (
     msg_my_resume_title,
     msg_no_resume,
     msg_resume_deleted,
+    msg_resume_save_failed,
     msg_resume_start,
 )
 from dotenv import load_dotenv
@@ -50,15 +54,27 @@ from edit_resume import (
     toggle_race_duration_wrapper,
     toggle_type_of_work_wrapper,
 )
-from functions import safe_callback_answer
+from fsm_storage import buffer_fsm_data, create_fsm_storage
+from functions import keyboard_debouncer, safe_callback_answer
 from keyboards import (
     delete_resume_keyboard,
     get_main_menu_keyboard,
 )
 from logging_config import get_user_info, log_error, log_info, setup_logging
-from security_middleware import SecurityMiddleware
-
-from firebase_db.crud import delete_resume, get_resume
+from outbound import create_outbound_scheduler
+from security_middleware import create_security_middleware
+from user_lock import UserLockMiddleware
+from webhook import run_webhook
+
+from firebase_db.crud import (
+    delete_resume,
+    get_resume,
+    start_resume_saves,
+    start_resume_write_behind,
+    stop_resume_saves,
+    stop_resume_write_behind,
+)
+from firebase_db.executor import shutdown_firestore_executor
 
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
@@ -77,29 +93,27 @@ except Exception as e:
     raise
 
 TOKEN = getenv("BOT_TOKEN")
+# "polling" (default) or "webhook" (see webhook.py for its settings)
+BOT_MODE = getenv("BOT_MODE", "polling").strip().lower()
 
-dp = Dispatcher()
-
-# Initialize security middleware
-security_middleware = SecurityMiddleware(
-    # Rate limiting - allow normal survey completion
-    max_requests_per_minute=30,  # Enough for normal survey flow
-    max_requests_per_hour=200,
-    max_requests_per_day=1000,
-    # Spam detection
-    max_identical_messages=5,
-    identical_message_window=60,
-    min_message_interval=0.5,  # 500ms between messages
-    # DDoS protection
-    burst_threshold=10,  # 10 requests in 2 seconds = suspicious
-    burst_window=2.0,
-    # Survey protection - allow up to 1 hour for completion
-    max_survey_duration=3600,
-    max_state_changes_per_minute=20,  # Allow rapid navigation
-    # Blocking
-    initial_block_duration=300,  # 5 minutes
-    max_block_duration=86400,  # 24 hours
-)
+fsm_storage = create_fsm_storage()
+dp = Dispatcher(storage=fsm_storage)
+# Count updates so FSM storage calls per update show up in fsm_storage.stats()
+dp.update.outer_middleware(fsm_storage.count_update)
+
+# Global flood protection, ahead of the per-user checks; surveys in progress get priority
+admission_middleware = create_admission_middleware(priority_states=ResumeForm)
+if admission_middleware is not None:
+    dp.update.outer_middleware(admission_middleware)
+
+# Run one user's updates one at a time, so concurrent toggles don't overwrite FSM data
+user_lock_middleware = UserLockMiddleware(max_waiters=10)
+dp.update.outer_middleware(user_lock_middleware)
+# One FSM data read and at most one write per update (inside the user lock)
+dp.update.outer_middleware(buffer_fsm_data)
+
+# Initialize security middleware (thresholds tuned for the survey, see the factory)
+security_middleware = create_security_middleware()
 
 # Register security middleware (applies to all updates)
 dp.update.middleware(security_middleware)
@@ -228,7 +242,6 @@ async def handle_my_resume_button(message: Message, state: FSMContext) -> None:
         )
 
 
-@dp.callback_query(lambda c: c.data == "delete_resume_confirm")
 async def handle_delete_resume(callback: CallbackQuery, state: FSMContext) -> None:
     """Handle delete resume confirmation."""
     try:
@@ -270,19 +283,61 @@ async def handle_delete_resume(callback: CallbackQuery, state: FSMContext) -> No
         await safe_callback_answer(callback, "Помилка при видаленні резюме")
 
 
+# All callback queries are routed by callback_data through one dispatch table
+callback_router = CallbackRouter()
+callback_router.register(dp)
+
+callback_router.exact("delete_resume_confirm", handle_delete_resume)
+
 # Register edit resume handlers
-dp.callback_query.register(handle_edit_resume_menu, lambda c: c.data == "edit_resume_menu")
-dp.callback_query.register(handle_edit_field, lambda c: c.data.startswith("edit_field_"))
+callback_router.exact("edit_resume_menu", handle_edit_resume_menu)
+callback_router.prefix("edit_field_", handle_edit_field)
+
+# Paces all outgoing API requests (Telegram flood limits) and retries on RetryAfter
+outbound_scheduler = create_outbound_scheduler()
+
+
+async def notify_resume_save_failed(bot: Bot, user_id: int) -> None:
+    """Tell the user that their finished resume could not be saved."""
+    try:
+        await bot.send_message(
+            user_id,
+            msg_resume_save_failed,
+            reply_markup=get_main_menu_keyboard(has_resume=False),
+        )
+    except TelegramAPIError as e:
+        log_error(logger, action="resume_save_failed_notification", error=str(e), user_id=user_id)
 
 
 async def main() -> None:
     try:
         bot = Bot(token=TOKEN)
-        log_info(logger, action="bot_initialized", data={"status": "starting_polling"})
-        await dp.start_polling(bot)
+        bot.session.middleware(outbound_scheduler)
+        await start_resume_write_behind()
+        await start_resume_saves(
+            on_failure=lambda user_id: notify_resume_save_failed(bot, user_id)
+        )
+        if BOT_MODE == "webhook":
+            log_info(logger, action="bot_initialized", data={"status": "starting_webhook"})
+            await run_webhook(dp, bot)
+        else:
+            log_info(logger, action="bot_initialized", data={"status": "starting_polling"})
+            await dp.start_polling(bot)
     except Exception as e:
         log_error(logger, action="bot_execution_failed", error=str(e), exc_info=True)
         raise
+    finally:
+        log_info(logger, action="fsm_storage_stats", data=fsm_storage.stats())
+        if admission_middleware is not None:
+            log_info(logger, action="admission_stats", data=admission_middleware.stats())
+        log_info(logger, action="user_lock_stats", data=user_lock_middleware.stats())
+        log_info(logger, action="keyboard_debouncer_stats", data=keyboard_debouncer.stats())
+        log_info(logger, action="outbound_stats", data=outbound_scheduler.stats())
+        # Finish background resume saves, flush queued resume writes and let in-flight
+        # Firestore calls finish before exit
+        await stop_resume_saves()
+        await stop_resume_write_behind()
+        await shutdown_firestore_executor()
 
 
 if __name__ == "__main__":
@@ -299,31 +354,17 @@ if __name__ == "__main__":
         dp.message.register(process_desired_salary_wrapper, ResumeForm.desired_salary)
         dp.message.register(process_description_wrapper, ResumeForm.description)
 
-        dp.callback_query.register(
-            process_place_of_region_callback_wrapper, lambda c: c.data.startswith("region_")
-        )
-        dp.callback_query.register(
-            toggle_driving_categories_wrapper, lambda c: c.data.startswith("driver_categories_")
-        )
-        dp.callback_query.register(
-            process_driving_semi_trailer_types_wrapper, lambda c: c.data.startswith("semi_trailer_")
-        )
-        dp.callback_query.register(
-            toggle_type_of_work_wrapper, lambda c: c.data.startswith("type_of_work_")
-        )
-        dp.callback_query.register(
-            process_adr_license_wrapper, lambda c: c.data in ["adr_yes", "adr_no"]
-        )
-        dp.callback_query.register(
-            toggle_race_duration_wrapper, lambda c: c.data.startswith("race_duration_")
-        )
-        dp.callback_query.register(
-            toggle_docs_for_driving_abroad_wrapper, lambda c: c.data.startswith("docs_abroad_")
-        )
-        dp.callback_query.register(
-            process_military_booking_wrapper, lambda c: c.data in ["military_yes", "military_no"]
-        )
-        dp.callback_query.register(skip_description_wrapper, lambda c: c.data == "skip_description")
+        callback_router.prefix("region_", process_place_of_region_callback_wrapper)
+        callback_router.prefix("driver_categories_", toggle_driving_categories_wrapper)
+        callback_router.prefix("semi_trailer_", process_driving_semi_trailer_types_wrapper)
+        callback_router.prefix("type_of_work_", toggle_type_of_work_wrapper)
+        callback_router.exact("adr_yes", process_adr_license_wrapper)
+        callback_router.exact("adr_no", process_adr_license_wrapper)
+        callback_router.prefix("race_duration_", toggle_race_duration_wrapper)
+        callback_router.prefix("docs_abroad_", toggle_docs_for_driving_abroad_wrapper)
+        callback_router.exact("military_yes", process_military_booking_wrapper)
+        callback_router.exact("military_no", process_military_booking_wrapper)
+        callback_router.exact("skip_description", skip_description_wrapper)
 
         log_info(logger, action="handlers_registered", data={"status": "success"})
         asyncio.run(main())
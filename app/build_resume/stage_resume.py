@@ -105,7 +105,15 @@ from constants import (
     resume_display_type_of_work,
     resume_display_types_of_cars,
 )
-from functions import get_updated_keyboard, safe_callback_answer, toggle_selection
+from functions import (
+    build_selection_keyboard,
+    get_updated_keyboard,
+    keyboard_debouncer,
+    safe_callback_answer,
+    selection_items,
+    selection_mask,
+    toggle_selection,
+)
 from keyboards import get_main_menu_keyboard, keyboard_place_of_living, phone_keyboard, remove_keyboard
 from logging_config import (
     get_user_info,
@@ -117,7 +125,7 @@ from logging_config import (
     sanitize_text,
 )
 
-from firebase_db.crud import add_resume
+from firebase_db.crud import submit_resume_save
 
 
 class ResumeForm(StatesGroup):
@@ -425,9 +433,6 @@ async def process_place_of_city(message: Message, state: FSMContext) -> None:
 
 async def toggle_driving_categories(callback: CallbackQuery, state: FSMContext) -> None:
     """Toggle driving categories selection and handle submit."""
-    data = await state.get_data()
-    selected = set(data.get("selected_driver_categories", []))
-
     is_submit = callback.data == "driver_categories_submit"
 
     await toggle_selection(
@@ -441,12 +446,12 @@ async def toggle_driving_categories(callback: CallbackQuery, state: FSMContext)
 
     if is_submit:
         updated_data = await state.get_data()
-        selected = list(updated_data.get("selected_driver_categories", []))
+        selected = selection_items(
+            updated_data.get("selected_driver_categories"), DRIVING_CATEGORIES
+        )
 
         if selected:
-            await state.update_data(
-                selected_driver_categories=selected, current_category_index=0, driving_experience={}
-            )
+            await state.update_data(current_category_index=0, driving_experience={})
 
             await state.set_state(ResumeForm.driving_exp_per_category)
 
@@ -466,7 +471,9 @@ async def process_driving_exp_by_category(message: Message, state: FSMContext) -
     """Process driving experience for each category sequentially with validation."""
     user_info = get_user_info(message)
     data = await state.get_data()
-    selected_categories = data.get("selected_driver_categories", [])
+    selected_categories = selection_items(
+        data.get("selected_driver_categories"), DRIVING_CATEGORIES
+    )
     current_index = data.get("current_category_index", 0)
     experience_dict = data.get("driving_experience", {})
 
@@ -545,7 +552,9 @@ async def process_driving_semi_trailer_types(callback: CallbackQuery, state: FSM
 
     if callback.data == f"{prefix}submit":
         current_data = await state.get_data()
-        selected_types = list(current_data.get("semi_trailer_selection", []))
+        selected_types = selection_mask(
+            current_data.get("semi_trailer_selection"), SEMI_TRAILERS_TYPES
+        )
 
         if not selected_types:
             user_info = get_user_info(callback)
@@ -559,7 +568,7 @@ async def process_driving_semi_trailer_types(callback: CallbackQuery, state: FSM
             "Collected semi-trailer types - user_id: %s, username: %s, types: %s",
             user_info["user_id"],
             user_info["username"],
-            len(selected_types),
+            selected_types.bit_count(),
         )
 
         await state.set_state(ResumeForm.is_adr_license)
@@ -568,6 +577,7 @@ async def process_driving_semi_trailer_types(callback: CallbackQuery, state: FSM
             user_info["user_id"],
         )
 
+        await keyboard_debouncer.discard(callback.message)
         await callback.message.edit_reply_markup()
         await callback.message.answer(msg_all_data_collected)
 
@@ -602,7 +612,9 @@ async def process_driving_exp_per_category(message: Message, state: FSMContext)
     """Process the user's driving experience per category with validation and move to the next state."""
     user_info = get_user_info(message)
     data = await state.get_data()
-    selected_categories = data.get("selected_driver_categories", [])
+    selected_categories = selection_items(
+        data.get("selected_driver_categories"), DRIVING_CATEGORIES
+    )
     current_index = data.get("current_category_index", 0)
     experience_dict = data.get("driving_experience", {})
 
@@ -690,7 +702,7 @@ async def toggle_type_of_work(callback: CallbackQuery, state: FSMContext) -> Non
 
     if is_submit:
         updated_data = await state.get_data()
-        selected = list(updated_data.get("selected_types_of_work", []))
+        selected = selection_mask(updated_data.get("selected_types_of_work"), TYPES_OF_WORK)
 
         if selected:
             user_info = get_user_info(callback)
@@ -699,7 +711,7 @@ async def toggle_type_of_work(callback: CallbackQuery, state: FSMContext) -> Non
                 "Collected types of work - user_id: %s, username: %s, types: %s",
                 user_info["user_id"],
                 user_info["username"],
-                len(selected),
+                selected.bit_count(),
             )
 
             await state.set_state(ResumeForm.types_of_cars)
@@ -792,7 +804,9 @@ async def process_types_of_cars(message: Message, state: FSMContext) -> None:
 
     # Check if user needs to answer about semi-trailer types
     data = await state.get_data()
-    selected_categories = data.get("selected_driver_categories", [])
+    selected_categories = selection_items(
+        data.get("selected_driver_categories"), DRIVING_CATEGORIES
+    )
     selected_set = set(selected_categories)
     needs_additional_survey = any(
         cat in selected_set for cat in DRIVING_CATEGORIES_ADDITIONAL_INFO
@@ -878,7 +892,9 @@ async def toggle_race_duration(callback: CallbackQuery, state: FSMContext) -> No
 
     if is_submit:
         updated_data = await state.get_data()
-        selected = list(updated_data.get("selected_race_durations", []))
+        selected = selection_mask(
+            updated_data.get("selected_race_durations"), RACE_DURATION_OPTIONS
+        )
 
         if selected:
             user_info = get_user_info(callback)
@@ -887,7 +903,7 @@ async def toggle_race_duration(callback: CallbackQuery, state: FSMContext) -> No
                 "Collected race durations - user_id: %s, username: %s, count: %s",
                 user_info["user_id"],
                 user_info["username"],
-                len(selected),
+                selected.bit_count(),
             )
 
             await state.set_state(ResumeForm.desired_salary)
@@ -971,7 +987,7 @@ async def toggle_docs_for_driving_abroad(callback: CallbackQuery, state: FSMCont
 
     if not is_submit:
         data = await state.get_data()
-        selected = set(data.get("selected_docs_abroad", []))
+        selected = selection_mask(data.get("selected_docs_abroad"), DOCS_FOR_DRIVING_ABROAD)
 
         if not callback.data.startswith(prefix):
             user_info = get_user_info(callback)
@@ -985,9 +1001,7 @@ async def toggle_docs_for_driving_abroad(callback: CallbackQuery, state: FSMCont
 
         try:
             idx = int(item_id)
-            if 0 <= idx < len(DOCS_FOR_DRIVING_ABROAD):
-                item = DOCS_FOR_DRIVING_ABROAD[idx]
-            else:
+            if not 0 <= idx < len(DOCS_FOR_DRIVING_ABROAD):
                 user_info = get_user_info(callback)
                 logger.warning("Invalid index - user_id: %s, index: %s", user_info["user_id"], idx)
                 await safe_callback_answer(callback, error_invalid_index, show_alert=True)
@@ -1001,32 +1015,27 @@ async def toggle_docs_for_driving_abroad(callback: CallbackQuery, state: FSMCont
             return
 
         # "Не маю" is the last option in DOCS_FOR_DRIVING_ABROAD
-        no_docs_option = DOCS_FOR_DRIVING_ABROAD[-1]  # "Не маю"
+        no_docs_bit = 1 << (len(DOCS_FOR_DRIVING_ABROAD) - 1)
 
-        if item == no_docs_option:
+        if idx == len(DOCS_FOR_DRIVING_ABROAD) - 1:
             # When "Не маю" is selected, clear all other selections
-            selected = {no_docs_option}
+            selected = no_docs_bit
         else:
             # If user selects any other option, remove "Не маю" if it was selected
-            if no_docs_option in selected:
-                selected.remove(no_docs_option)
-
+            selected &= ~no_docs_bit
             # Toggle the selected item
-            if item in selected:
-                selected.remove(item)
-            else:
-                selected.add(item)
+            selected ^= 1 << idx
 
-        await state.update_data(selected_docs_abroad=list(selected))
+        await state.update_data(selected_docs_abroad=selected)
 
-        keyboard = await get_updated_keyboard(
-            selected=selected, categories=DOCS_FOR_DRIVING_ABROAD, prefix=prefix
-        )
-        await callback.message.edit_reply_markup(reply_markup=keyboard)
+        keyboard = build_selection_keyboard(tuple(DOCS_FOR_DRIVING_ABROAD), prefix, selected)
+        keyboard_debouncer.schedule(callback.message, keyboard)
         await safe_callback_answer(callback)
     else:
         updated_data = await state.get_data()
-        selected = list(updated_data.get("selected_docs_abroad", []))
+        selected = selection_mask(
+            updated_data.get("selected_docs_abroad"), DOCS_FOR_DRIVING_ABROAD
+        )
 
         if not selected:
             user_info = get_user_info(callback)
@@ -1042,12 +1051,14 @@ async def toggle_docs_for_driving_abroad(callback: CallbackQuery, state: FSMCont
             "Collected docs for driving abroad - user_id: %s, username: %s, count: %s",
             user_info["user_id"],
             user_info["username"],
-            len(selected),
+            selected.bit_count(),
         )
 
+        await keyboard_debouncer.discard(callback.message)
         await callback.message.edit_reply_markup()
+        selected_items = selection_items(selected, DOCS_FOR_DRIVING_ABROAD)
         await callback.message.answer(
-            msg_selected_template.format(items=", ".join(sorted(selected)))
+            msg_selected_template.format(items=", ".join(sorted(selected_items)))
         )
 
         await state.set_state(ResumeForm.military_booking)
@@ -1229,7 +1240,7 @@ def format_resume_display(data: dict) -> str:
         region_name = REGIONS.get(region_key, region_key)
         lines.append(resume_display_location.format(region=region_name, city=city))
 
-    categories = data.get("selected_driver_categories", [])
+    categories = selection_items(data.get("selected_driver_categories"), DRIVING_CATEGORIES)
     if categories:
         categories_str = ", ".join(categories)
         lines.append(resume_display_driving_categories.format(categories=categories_str))
@@ -1243,12 +1254,12 @@ def format_resume_display(data: dict) -> str:
         if exp_lines:
             lines.append(resume_display_driving_experience.format(experience="\n".join(exp_lines)))
 
-    semi_trailer_types = data.get("semi_trailer_types", [])
+    semi_trailer_types = selection_items(data.get("semi_trailer_types"), SEMI_TRAILERS_TYPES)
     if semi_trailer_types:
         types_str = ", ".join(semi_trailer_types)
         lines.append(resume_display_semi_trailer_types.format(types=types_str))
 
-    types_of_work = data.get("types_of_work", [])
+    types_of_work = selection_items(data.get("types_of_work"), TYPES_OF_WORK)
     if types_of_work:
         work_str = ", ".join(types_of_work)
         lines.append(resume_display_type_of_work.format(types=work_str))
@@ -1262,12 +1273,12 @@ def format_resume_display(data: dict) -> str:
         adr_status = "✅ Так" if has_adr else "❌ Ні"
         lines.append(resume_display_adr_license.format(status=adr_status))
 
-    race_durations = data.get("race_duration_preference", [])
+    race_durations = selection_items(data.get("race_duration_preference"), RACE_DURATION_OPTIONS)
     if race_durations:
         duration_str = ", ".join(race_durations)
         lines.append(resume_display_race_duration.format(duration=duration_str))
 
-    docs_abroad = data.get("docs_for_driving_abroad", [])
+    docs_abroad = selection_items(data.get("docs_for_driving_abroad"), DOCS_FOR_DRIVING_ABROAD)
     if docs_abroad:
         docs_str = ", ".join(docs_abroad)
         lines.append(resume_display_docs_abroad.format(docs=docs_str))
@@ -1328,56 +1339,6 @@ def convert_firebase_resume_to_display_format(firebase_data: dict) -> dict:
     return display_data
 
 
-def remove_emojis(text: str) -> str:
-    """
-    Remove emojis and other Unicode symbols from text.
-    
-    Removes emojis, symbols, and pictographs that are commonly used in Telegram.
-    Also cleans up extra spaces left after emoji removal.
-    """
-    if not text:
-        return text
-
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "\U0001F900-\U0001F9FF"
-        "\U0001FA00-\U0001FA6F"
-        "\U0001FA70-\U0001FAFF"
-        "\U00002600-\U000026FF"
-        "\U00002700-\U000027BF"
-        "]+",
-        flags=re.UNICODE,
-    )
-
-    cleaned = emoji_pattern.sub("", text)
-
-    cleaned = re.sub(r"\s+", " ", cleaned)
-    return cleaned.strip()
-
-
-def clean_data_for_firebase(value):
-    """
-    Recursively clean data structure removing emojis from strings.
-    
-    Handles strings, lists, dicts, and other types.
-    Preserves data structure while cleaning text content.
-    """
-    if isinstance(value, str):
-        return remove_emojis(value)
-    elif isinstance(value, list):
-        return [clean_data_for_firebase(item) for item in value]
-    elif isinstance(value, dict):
-        return {key: clean_data_for_firebase(val) for key, val in value.items()}
-    else:
-        return value
-
-
 def _convert_car_types_to_list(car_types) -> list:
     """
     Convert car types from string to list by splitting on comma.
@@ -1417,7 +1378,8 @@ def prepare_resume_data_for_firebase(data: dict, user_id: int | None, username:
     
     Returns:
         Dictionary with all resume data organized for database storage.
-        All emojis and Telegram symbols are removed from text fields.
+        Values are validated and emojis removed from free-text fields when the
+        Firestore document is built (firebase_db.resume_schema).
     
     Raises:
         ValueError: If user_id is None (required for saving to Firebase)
@@ -1449,91 +1411,37 @@ def prepare_resume_data_for_firebase(data: dict, user_id: int | None, username:
     region_key = data.get("place_of_living_region")
     region_name = REGIONS.get(region_key, region_key) if region_key else None
 
-    # Validate and normalize numeric fields
-    age = data.get("age")
-    if age is not None:
-        try:
-            age = int(age) if isinstance(age, (int, float, str)) else None
-            # Age should be reasonable (0-150)
-            if age is not None and (age < 0 or age > 150):
-                logger.warning(f"Invalid age value: {age}, setting to None")
-                age = None
-        except (ValueError, TypeError):
-            logger.warning(f"Could not convert age to int: {age}, setting to None")
-            age = None
-    
-    desired_salary = data.get("desired_salary")
-    if desired_salary is not None:
-        try:
-            # Convert to int if it's a string or float
-            if isinstance(desired_salary, str):
-                # Remove spaces, commas, dots
-                salary_clean = desired_salary.replace(" ", "").replace(",", "").replace(".", "")
-                desired_salary = int(salary_clean) if salary_clean else None
-            elif isinstance(desired_salary, float):
-                desired_salary = int(desired_salary)
-            elif not isinstance(desired_salary, int):
-                desired_salary = None
-        except (ValueError, TypeError):
-            logger.warning(f"Could not convert desired_salary to int: {desired_salary}, setting to None")
-            desired_salary = None
-    
-    # Validate driving_experience values
-    driving_experience = data.get("driving_experience", {})
-    if isinstance(driving_experience, dict):
-        validated_experience = {}
-        for category, years in driving_experience.items():
-            try:
-                if isinstance(years, (int, float)):
-                    # Convert float to int if whole number, otherwise keep as float
-                    if isinstance(years, float) and years.is_integer():
-                        years = int(years)
-                    # Validate years are reasonable (0-100)
-                    if isinstance(years, (int, float)) and 0 <= years <= 100:
-                        validated_experience[category] = years
-                    else:
-                        logger.warning(f"Invalid experience years for {category}: {years}, skipping")
-                else:
-                    logger.warning(f"Invalid experience type for {category}: {type(years)}, skipping")
-            except (ValueError, TypeError):
-                logger.warning(f"Could not validate experience for {category}: {years}, skipping")
-        driving_experience = validated_experience
-    
     firebase_data = {
         "user_id": user_id,  # Always int, never None
         "username": username,  # str or None
         "name": data.get("name"),
         "phone": data.get("phone"),
-        "age": age,  # Validated int or None
+        "age": data.get("age"),
         "place_of_living": {
             "region_key": region_key,
             "region_name": region_name,
             "city": data.get("place_of_living_city"),
         },
-        "driving_categories": data.get("selected_driver_categories", []),
-        "driving_experience": driving_experience,  # Validated dict
-        "semi_trailer_types": data.get("semi_trailer_types", []),
-        "types_of_work": data.get("types_of_work", []),
+        # Multi-select fields are bitmasks in FSM data; Firebase keeps the option strings
+        "driving_categories": selection_items(
+            data.get("selected_driver_categories"), DRIVING_CATEGORIES
+        ),
+        "driving_experience": data.get("driving_experience", {}),
+        "semi_trailer_types": selection_items(data.get("semi_trailer_types"), SEMI_TRAILERS_TYPES),
+        "types_of_work": selection_items(data.get("types_of_work"), TYPES_OF_WORK),
         "types_of_cars": _convert_car_types_to_list(data.get("types_of_cars")),
-        "race_duration_preference": data.get("race_duration_preference", []),
+        "race_duration_preference": selection_items(
+            data.get("race_duration_preference"), RACE_DURATION_OPTIONS
+        ),
         "is_adr_license": data.get("is_adr_license", False),
-        "docs_for_driving_abroad": data.get("docs_for_driving_abroad", []),
+        "docs_for_driving_abroad": selection_items(
+            data.get("docs_for_driving_abroad"), DOCS_FOR_DRIVING_ABROAD
+        ),
         "military_booking": data.get("military_booking", False),
-        "desired_salary": desired_salary,  # Validated int or None
+        "desired_salary": data.get("desired_salary"),
         "description": data.get("description", ""),
     }
 
-    # Store original user_id and username before cleaning (they should not be modified)
-    original_user_id = user_id
-    original_username = username
-
-    # Clean emojis from text fields (user_id and username are preserved)
-    firebase_data = clean_data_for_firebase(firebase_data)
-
-    # Ensure user_id and username are never modified by clean_data_for_firebase
-    firebase_data["user_id"] = original_user_id
-    firebase_data["username"] = original_username
-
     return firebase_data
 
 
@@ -1603,13 +1511,13 @@ async def finalize_resume(
             user_info["username"],
         )
 
+        # Don't wait for Firestore: the resume is journaled locally and saved in the
+        # background, the user is notified separately if the save fails for good
         try:
-            resume_key = await add_resume(firebase_data)
-            if resume_key:
+            if await submit_resume_save(firebase_data):
                 logger.info(
-                    "Resume saved to Firebase - user_id: %s, resume_key: %s",
+                    "Resume submitted for saving - user_id: %s",
                     user_info["user_id"],
-                    resume_key,
                 )
             else:
                 logger.warning(
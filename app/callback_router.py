@@ -0,0 +1,72 @@
+"""
+Callback query routing by callback_data.
+
+With one lambda filter per handler, aiogram tries every filter in turn for each
+callback. CallbackRouter indexes handlers by exact callback_data and by prefix, so
+a callback is routed with a few dict lookups however many handlers are registered.
+
+Usage:
+    router = CallbackRouter()
+    router.exact("adr_yes", process_adr_license)
+    router.prefix("region_", process_region)
+    router.register(dp)
+"""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+CallbackHandler = Callable[[CallbackQuery, FSMContext], Awaitable[Any]]
+
+
+class CallbackRouter:
+    """Dispatch table of callback handlers (exact callback_data first, then longest prefix)"""
+
+    def __init__(self):
+        self._exact: dict[str, CallbackHandler] = {}
+        self._prefixes: dict[str, CallbackHandler] = {}
+        # Distinct prefix lengths, longest first
+        self._prefix_lengths: list[int] = []
+
+    def exact(self, callback_data: str, handler: CallbackHandler) -> None:
+        """Route callbacks whose data equals callback_data to handler."""
+        if callback_data in self._exact:
+            raise ValueError(f"Callback data {callback_data!r} is already routed")
+        self._exact[callback_data] = handler
+
+    def prefix(self, prefix: str, handler: CallbackHandler) -> None:
+        """Route callbacks whose data starts with prefix to handler."""
+        if prefix in self._prefixes:
+            raise ValueError(f"Callback prefix {prefix!r} is already routed")
+        self._prefixes[prefix] = handler
+        self._prefix_lengths = sorted({*self._prefix_lengths, len(prefix)}, reverse=True)
+
+    def resolve(self, callback_data: str) -> CallbackHandler | None:
+        """Get the handler for callback_data (None if no route matches)."""
+        handler = self._exact.get(callback_data)
+        if handler is not None:
+            return handler
+        for length in self._prefix_lengths:
+            if length <= len(callback_data):
+                handler = self._prefixes.get(callback_data[:length])
+                if handler is not None:
+                    return handler
+        return None
+
+    def match(self, callback: CallbackQuery) -> dict[str, Any] | bool:
+        """aiogram filter: passes the resolved handler on to dispatch()."""
+        handler = self.resolve(callback.data or "")
+        if handler is None:
+            return False
+        return {"routed_handler": handler}
+
+    async def dispatch(
+        self, callback: CallbackQuery, state: FSMContext, routed_handler: CallbackHandler
+    ) -> Any:
+        return await routed_handler(callback, state)
+
+    def register(self, dp: Dispatcher) -> None:
+        """Register the router as a single callback query handler."""
+        dp.callback_query.register(self.dispatch, self.match)
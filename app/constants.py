@@ -70,6 +70,11 @@ msg_resume_saved = (
     "✅ Дякуємо! Ваше резюме успішно збережено.\n\n"
     "Наш менеджер перегляне вашу анкету та зв'яжеться з вами найближчим часом, коли з'явиться відповідна вакансія."
 )
+msg_resume_save_failed = (
+    "⚠️ На жаль, не вдалося зберегти ваше резюме через технічну помилку.\n\n"
+    "Ми спробуємо зберегти його ще раз автоматично. Якщо резюме не з'явиться в розділі "
+    "\"📋 Моє резюме\", заповніть анкету повторно через /start."
+)
 
 resume_display_title = "📋 <b>Ваше резюме</b>\n\n"
 resume_display_name = "👤 <b>Ім'я:</b> {name}"
@@ -208,6 +213,9 @@ msg_bot_greeting_with_resume = "👋 Вітаємо! Ваше резюме зб
 msg_resume_start = "🚀 Почнемо створювати ваше резюме!"
 msg_selected_template = "✅ Ви обрали: {items}"
 msg_all_data_collected = "✅ Всі дані про водійські категорії зібрано!"
+msg_overloaded = "⏳ Бот зараз перевантажений. Будь ласка, спробуйте ще раз за хвилину."
+msg_request_rejected = "⏳ Забагато запитів. Будь ласка, зачекайте кілька секунд."
+msg_please_wait = "⏳ Зачекайте, будь ласка, ще обробляємо ваші попередні повідомлення."
 
 button_confirm = "✅ Підтвердити"
 button_send_phone = "📞 Надіслати номер"
@@ -33,6 +33,7 @@ from constants import (
     DRIVING_CATEGORIES_ADDITIONAL_INFO,
     RACE_DURATION_OPTIONS,
     REGIONS,
+    SEMI_TRAILERS_TYPES,
     TYPES_OF_WORK,
     ask_age,
     ask_description,
@@ -91,7 +92,14 @@ from constants import (
     msg_resume_updated,
     msg_selected_template,
 )
-from functions import get_updated_keyboard
+from functions import (
+    build_selection_keyboard,
+    get_updated_keyboard,
+    keyboard_debouncer,
+    safe_callback_answer,
+    selection_items,
+    selection_mask,
+)
 from keyboards import delete_resume_keyboard, keyboard_place_of_living, phone_keyboard, remove_keyboard
 from logging_config import (
     get_user_info,
@@ -265,7 +273,9 @@ async def handle_edit_field(callback: CallbackQuery, state: FSMContext) -> None:
             )
             await state.set_state(ResumeForm.driving_categories)
             # Store current categories in state but don't show them as selected
-            await state.update_data(selected_driver_categories=current_categories)
+            await state.update_data(
+                selected_driver_categories=selection_mask(current_categories, DRIVING_CATEGORIES)
+            )
             await safe_callback_answer(callback)
 
         elif field == "type_of_work":
@@ -284,7 +294,7 @@ async def handle_edit_field(callback: CallbackQuery, state: FSMContext) -> None:
             )
             await state.set_state(ResumeForm.type_of_work)
             # Store current types in state but don't show them as selected
-            await state.update_data(types_of_work=current_types)
+            await state.update_data(types_of_work=selection_mask(current_types, TYPES_OF_WORK))
             await safe_callback_answer(callback)
 
         elif field == "types_of_cars":
@@ -325,7 +335,9 @@ async def handle_edit_field(callback: CallbackQuery, state: FSMContext) -> None:
             )
             await state.set_state(ResumeForm.race_duration_preference)
             # Store current durations in state but don't show them as selected
-            await state.update_data(race_duration_preference=current_durations)
+            await state.update_data(
+                race_duration_preference=selection_mask(current_durations, RACE_DURATION_OPTIONS)
+            )
             await safe_callback_answer(callback)
 
         elif field == "salary":
@@ -351,7 +363,9 @@ async def handle_edit_field(callback: CallbackQuery, state: FSMContext) -> None:
             )
             await state.set_state(ResumeForm.docs_for_driving_abroad)
             # Store current docs in state but don't show them as selected
-            await state.update_data(docs_for_driving_abroad=current_docs)
+            await state.update_data(
+                docs_for_driving_abroad=selection_mask(current_docs, DOCS_FOR_DRIVING_ABROAD)
+            )
             await safe_callback_answer(callback)
 
         elif field == "military":
@@ -440,7 +454,10 @@ async def save_edited_field(message: Message, state: FSMContext) -> None:
         elif editing_field == "driving_categories":
             # Handle interconnected: if categories change, may need to update experience and semi-trailer types
             # Use all_selected_categories if available (preserved from edit), otherwise use selected_driver_categories
-            new_categories = data.get("all_selected_categories") or data.get("selected_driver_categories", [])
+            new_categories = selection_items(
+                data.get("all_selected_categories") or data.get("selected_driver_categories"),
+                DRIVING_CATEGORIES,
+            )
             field_updates["driving_categories"] = new_categories
 
             # Get existing experience from resume
@@ -464,8 +481,9 @@ async def save_edited_field(message: Message, state: FSMContext) -> None:
             )
             if needs_semi_trailer:
                 # Get existing semi-trailer types or new ones from state
-                semi_trailer_types = data.get("semi_trailer_types") or editing_resume.get(
-                    "semi_trailer_types", []
+                semi_trailer_types = selection_items(
+                    data.get("semi_trailer_types") or editing_resume.get("semi_trailer_types", []),
+                    SEMI_TRAILERS_TYPES,
                 )
                 if semi_trailer_types:
                     field_updates["semi_trailer_types"] = semi_trailer_types
@@ -473,7 +491,9 @@ async def save_edited_field(message: Message, state: FSMContext) -> None:
                 # Remove semi_trailer_types if no longer needed
                 field_updates["semi_trailer_types"] = []
         elif editing_field == "type_of_work":
-            field_updates["types_of_work"] = data.get("types_of_work", [])
+            field_updates["types_of_work"] = selection_items(
+                data.get("types_of_work"), TYPES_OF_WORK
+            )
         elif editing_field == "types_of_cars":
             types_of_cars = data.get("types_of_cars", "")
             # Convert to list format for Firebase
@@ -486,11 +506,15 @@ async def save_edited_field(message: Message, state: FSMContext) -> None:
         elif editing_field == "adr":
             field_updates["is_adr_license"] = data.get("is_adr_license", False)
         elif editing_field == "race_duration":
-            field_updates["race_duration_preference"] = data.get("race_duration_preference", [])
+            field_updates["race_duration_preference"] = selection_items(
+                data.get("race_duration_preference"), RACE_DURATION_OPTIONS
+            )
         elif editing_field == "salary":
             field_updates["desired_salary"] = data.get("desired_salary")
         elif editing_field == "docs_abroad":
-            field_updates["docs_for_driving_abroad"] = data.get("docs_for_driving_abroad", [])
+            field_updates["docs_for_driving_abroad"] = selection_items(
+                data.get("docs_for_driving_abroad"), DOCS_FOR_DRIVING_ABROAD
+            )
         elif editing_field == "military":
             field_updates["military_booking"] = data.get("military_booking", False)
         elif editing_field == "description":
@@ -1193,7 +1217,9 @@ async def toggle_driving_categories_wrapper(callback: CallbackQuery, state: FSMC
 
             # Now handle the submit logic - get updated data after toggle_selection
             updated_data = await state.get_data()
-            selected = list(updated_data.get("selected_driver_categories", []))
+            selected = selection_items(
+                updated_data.get("selected_driver_categories"), DRIVING_CATEGORIES
+            )
 
             if selected:
                 # When editing, ask for experience for ALL selected categories (even if they have experience)
@@ -1214,6 +1240,7 @@ async def toggle_driving_categories_wrapper(callback: CallbackQuery, state: FSMC
                     all_selected_categories=selected,  # Save all selected categories
                 )
                 first_cat = categories_to_ask[0]
+                await keyboard_debouncer.discard(callback.message)
                 # Try to remove keyboard, ignore if already removed
                 try:
                     await callback.message.edit_reply_markup(reply_markup=None)
@@ -1250,7 +1277,7 @@ async def toggle_type_of_work_wrapper(callback: CallbackQuery, state: FSMContext
         if is_submit:
             # Handle submit manually - don't call toggle_selection to avoid duplicate messages
             current_data = await state.get_data()
-            selected = list(current_data.get("selected_types_of_work", []))
+            selected = selection_items(current_data.get("selected_types_of_work"), TYPES_OF_WORK)
             
             if not selected:
                 user_info = get_user_info(callback)
@@ -1263,7 +1290,7 @@ async def toggle_type_of_work_wrapper(callback: CallbackQuery, state: FSMContext
             editing_username = current_data.get("editing_username")
             user_info = {"user_id": editing_user_id, "username": editing_username}
             
-            await state.update_data(types_of_work=selected)
+            await state.update_data(types_of_work=selection_mask(selected, TYPES_OF_WORK))
             log_info(
                 logger,
                 action="types_of_work_collected_edit",
@@ -1272,6 +1299,7 @@ async def toggle_type_of_work_wrapper(callback: CallbackQuery, state: FSMContext
                 types=len(selected),
             )
             
+            await keyboard_debouncer.discard(callback.message)
             # Try to remove keyboard, ignore if already removed
             try:
                 await callback.message.edit_reply_markup(reply_markup=None)
@@ -1310,7 +1338,9 @@ async def toggle_race_duration_wrapper(callback: CallbackQuery, state: FSMContex
         if is_submit:
             # Handle submit manually - don't call toggle_selection to avoid duplicate messages
             current_data = await state.get_data()
-            selected = list(current_data.get("selected_race_durations", []))
+            selected = selection_items(
+                current_data.get("selected_race_durations"), RACE_DURATION_OPTIONS
+            )
             
             if not selected:
                 user_info = get_user_info(callback)
@@ -1323,7 +1353,9 @@ async def toggle_race_duration_wrapper(callback: CallbackQuery, state: FSMContex
             editing_username = current_data.get("editing_username")
             user_info = {"user_id": editing_user_id, "username": editing_username}
             
-            await state.update_data(race_duration_preference=selected)
+            await state.update_data(
+                race_duration_preference=selection_mask(selected, RACE_DURATION_OPTIONS)
+            )
             log_info(
                 logger,
                 action="race_duration_collected_edit",
@@ -1332,6 +1364,7 @@ async def toggle_race_duration_wrapper(callback: CallbackQuery, state: FSMContex
                 count=len(selected),
             )
             
+            await keyboard_debouncer.discard(callback.message)
             # Try to remove keyboard, ignore if already removed
             try:
                 await callback.message.edit_reply_markup(reply_markup=None)
@@ -1373,7 +1406,9 @@ async def toggle_docs_for_driving_abroad_wrapper(
         if not is_submit:
             # Handle toggle with special logic for "❌ Не маю"
             current_data = await state.get_data()
-            selected = set(current_data.get("selected_docs_abroad", []))
+            selected = selection_mask(
+                current_data.get("selected_docs_abroad"), DOCS_FOR_DRIVING_ABROAD
+            )
             
             if not callback.data.startswith(prefix):
                 user_info = get_user_info(callback)
@@ -1392,9 +1427,7 @@ async def toggle_docs_for_driving_abroad_wrapper(
             
             try:
                 idx = int(item_id)
-                if 0 <= idx < len(DOCS_FOR_DRIVING_ABROAD):
-                    item = DOCS_FOR_DRIVING_ABROAD[idx]
-                else:
+                if not 0 <= idx < len(DOCS_FOR_DRIVING_ABROAD):
                     user_info = get_user_info(callback)
                     log_warning(
                         logger,
@@ -1420,33 +1453,28 @@ async def toggle_docs_for_driving_abroad_wrapper(
                 return
             
             # "Не маю" is the last option in DOCS_FOR_DRIVING_ABROAD
-            no_docs_option = DOCS_FOR_DRIVING_ABROAD[-1]  # "Не маю"
+            no_docs_bit = 1 << (len(DOCS_FOR_DRIVING_ABROAD) - 1)
             
-            if item == no_docs_option:
+            if idx == len(DOCS_FOR_DRIVING_ABROAD) - 1:
                 # When "Не маю" is selected, clear all other selections
-                selected = {no_docs_option}
+                selected = no_docs_bit
             else:
                 # If user selects any other option, remove "Не маю" if it was selected
-                if no_docs_option in selected:
-                    selected.remove(no_docs_option)
-                
+                selected &= ~no_docs_bit
                 # Toggle the selected item
-                if item in selected:
-                    selected.remove(item)
-                else:
-                    selected.add(item)
+                selected ^= 1 << idx
             
-            await state.update_data(selected_docs_abroad=list(selected))
+            await state.update_data(selected_docs_abroad=selected)
             
-            keyboard = await get_updated_keyboard(
-                selected=selected, categories=DOCS_FOR_DRIVING_ABROAD, prefix=prefix
-            )
-            await callback.message.edit_reply_markup(reply_markup=keyboard)
+            keyboard = build_selection_keyboard(tuple(DOCS_FOR_DRIVING_ABROAD), prefix, selected)
+            keyboard_debouncer.schedule(callback.message, keyboard)
             await safe_callback_answer(callback)
         else:
             # Handle submit
             current_data = await state.get_data()
-            selected = list(current_data.get("selected_docs_abroad", []))
+            selected = selection_items(
+                current_data.get("selected_docs_abroad"), DOCS_FOR_DRIVING_ABROAD
+            )
             
             if not selected:
                 user_info = get_user_info(callback)
@@ -1465,7 +1493,9 @@ async def toggle_docs_for_driving_abroad_wrapper(
             editing_username = current_data.get("editing_username")
             user_info = {"user_id": editing_user_id, "username": editing_username}
             
-            await state.update_data(docs_for_driving_abroad=selected)
+            await state.update_data(
+                docs_for_driving_abroad=selection_mask(selected, DOCS_FOR_DRIVING_ABROAD)
+            )
             log_info(
                 logger,
                 action="docs_abroad_collected_edit",
@@ -1474,6 +1504,7 @@ async def toggle_docs_for_driving_abroad_wrapper(
                 count=len(selected),
             )
             
+            await keyboard_debouncer.discard(callback.message)
             # Try to remove keyboard, ignore if already removed
             try:
                 await callback.message.edit_reply_markup(reply_markup=None)
@@ -1500,11 +1531,14 @@ async def process_driving_exp_per_category_wrapper(message: Message, state: FSMC
             all_selected = data.get("all_selected_categories", [])
             if not all_selected:
                 # Fallback: try to get from selected_driver_categories
-                all_selected = data.get("selected_driver_categories", [])
+                all_selected = selection_items(
+                    data.get("selected_driver_categories"), DRIVING_CATEGORIES
+                )
             # Store all_selected in state to preserve it (in case it wasn't stored)
             await state.update_data(
                 all_selected_categories=all_selected,
-                selected_driver_categories=categories_to_process  # Temporarily set for processing
+                # Temporarily set for processing
+                selected_driver_categories=selection_mask(categories_to_process, DRIVING_CATEGORIES),
             )
 
             # Process experience (but intercept to prevent continuing to next question)
@@ -1616,11 +1650,17 @@ async def process_driving_exp_per_category_wrapper(message: Message, state: FSMC
                     existing_semi_trailer = editing_resume.get("semi_trailer_types", [])
                     if existing_semi_trailer:
                         # Already have, just save
-                        await state.update_data(semi_trailer_types=existing_semi_trailer)
+                        await state.update_data(
+                            semi_trailer_types=selection_mask(
+                                existing_semi_trailer, SEMI_TRAILERS_TYPES
+                            )
+                        )
                         # experience_dict already contains merged experience (existing + new)
                         await state.update_data(
                             driving_experience=experience_dict,
-                            selected_driver_categories=all_selected,
+                            selected_driver_categories=selection_mask(
+                                all_selected, DRIVING_CATEGORIES
+                            ),
                         )
                         await save_edited_field(message, state)
                     else:
@@ -1631,7 +1671,11 @@ async def process_driving_exp_per_category_wrapper(message: Message, state: FSMC
                         keyboard = await get_updated_keyboard(
                             selected=set(), categories=SEMI_TRAILERS_TYPES, prefix="semi_trailer_"
                         )
-                        await state.update_data(selected_driver_categories=all_selected)
+                        await state.update_data(
+                            selected_driver_categories=selection_mask(
+                                all_selected, DRIVING_CATEGORIES
+                            )
+                        )
                         await message.answer(
                             ask_semi_trailer_types, parse_mode="HTML", reply_markup=keyboard
                         )
@@ -1640,7 +1684,10 @@ async def process_driving_exp_per_category_wrapper(message: Message, state: FSMC
                     # No semi-trailer types needed, save experiences
                     # experience_dict already contains merged experience (existing + new)
                     await state.update_data(
-                        driving_experience=experience_dict, selected_driver_categories=all_selected
+                        driving_experience=experience_dict,
+                        selected_driver_categories=selection_mask(
+                            all_selected, DRIVING_CATEGORIES
+                        ),
                     )
                     await save_edited_field(message, state)
         else:
@@ -1661,7 +1708,9 @@ async def process_driving_semi_trailer_types_wrapper(
 
         if callback.data == f"{prefix}submit":
             current_data = await state.get_data()
-            selected_types = list(current_data.get("semi_trailer_selection", []))
+            selected_types = selection_mask(
+                current_data.get("semi_trailer_selection"), SEMI_TRAILERS_TYPES
+            )
 
             if not selected_types:
                 user_info = get_user_info(callback)
@@ -1687,7 +1736,7 @@ async def process_driving_semi_trailer_types_wrapper(
                 action="semi_trailer_collected_edit",
                 user_id=user_info["user_id"],
                 username=user_info["username"],
-                types=len(selected_types),
+                types=selected_types.bit_count(),
             )
 
             # experience_dict in state should already contain merged experience (existing + new)
@@ -1699,16 +1748,16 @@ async def process_driving_semi_trailer_types_wrapper(
                 current_experience = editing_resume.get("driving_experience", {})
             
             # Restore all selected categories from state before saving
-            all_selected = current_data.get("all_selected_categories", [])
-            if not all_selected:
-                # Fallback: try to get from selected_driver_categories
-                all_selected = current_data.get("selected_driver_categories", [])
+            all_selected = current_data.get("all_selected_categories") or current_data.get(
+                "selected_driver_categories"
+            )
             
             await state.update_data(
                 driving_experience=current_experience,
-                selected_driver_categories=all_selected
+                selected_driver_categories=selection_mask(all_selected, DRIVING_CATEGORIES),
             )
 
+            await keyboard_debouncer.discard(callback.message)
             # Try to remove keyboard, ignore if already removed
             try:
                 await callback.message.edit_reply_markup(reply_markup=None)
@@ -0,0 +1,364 @@
+"""
+FSM storage backends for the Dispatcher.
+
+In-progress surveys live in FSM storage. The default memory storage loses them on
+restart and can't be shared between processes, so the backend is selected with
+FSM_STORAGE:
+
+- memory: aiogram MemoryStorage (default)
+- sqlite: local SQLite file, survives restarts (single host)
+- redis: any Redis-compatible server, shared by all bot processes
+
+State data is serialized with msgpack in both persistent backends (datetimes, e.g. the
+timestamps of a resume loaded for editing, as an extension type). Every backend is
+wrapped in InstrumentedStorage, which counts storage calls per update.
+
+buffer_fsm_data gives handlers a BufferedFSMContext, so an update costs at most one
+data read and one data write, however often handlers call get_data/update_data.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Mapping, TypeVar
+
+import msgpack
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SQLITE_PATH = PROJECT_ROOT / "data" / "fsm.sqlite3"
+
+T = TypeVar("T")
+
+_UNSET: Any = object()
+
+# msgpack extension type: ISO 8601 text, naive or with UTC offset
+_EXT_DATETIME = 1
+
+
+def _pack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Also covers Firestore's DatetimeWithNanoseconds (kept to microseconds)
+        return msgpack.ExtType(_EXT_DATETIME, datetime.isoformat(value).encode())
+    raise TypeError(f"Cannot serialize {type(value).__name__} in FSM data")
+
+
+def _unpack_ext(code: int, payload: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(payload.decode())
+    return msgpack.ExtType(code, payload)
+
+
+def pack_data(data: Mapping[str, Any]) -> bytes | None:
+    """Serialize FSM data with msgpack (None for empty data)."""
+    if not data:
+        return None
+    return msgpack.packb(dict(data), use_bin_type=True, default=_pack_default)
+
+
+def unpack_data(raw: bytes | None) -> dict[str, Any]:
+    """Deserialize FSM data packed with pack_data."""
+    if not raw:
+        return {}
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False, ext_hook=_unpack_ext)
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+def _storage_key(key: StorageKey) -> str:
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    if key.thread_id:
+        parts.append(str(key.thread_id))
+    if key.business_connection_id:
+        parts.append(str(key.business_connection_id))
+    parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM storage in a local SQLite database.
+
+    All queries run on one dedicated thread that owns the connection, so the event
+    loop never blocks on disk I/O. WAL mode keeps commits cheap and lets several
+    processes on the same host share the file.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_SQLITE_PATH):
+        self.path = Path(path)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data BLOB)"
+            )
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _set_column_sync(self, column: str, key: str, value: Any) -> None:
+        conn = self._connect()
+        conn.execute(
+            f"INSERT INTO fsm (key, {column}) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}",
+            (key, value),
+        )
+        if value is None:
+            conn.execute(
+                "DELETE FROM fsm WHERE key = ? AND state IS NULL AND data IS NULL", (key,)
+            )
+
+    def _get_column_sync(self, column: str, key: str) -> Any:
+        row = self._connect().execute(f"SELECT {column} FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _update_data_sync(self, key: str, data: Mapping[str, Any]) -> dict[str, Any]:
+        conn = self._connect()
+        # Read-modify-write in one transaction and one thread hop
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM fsm WHERE key = ?", (key,)).fetchone()
+            current = unpack_data(row[0] if row else None)
+            current.update(data)
+            conn.execute(
+                "INSERT INTO fsm (key, data) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                (key, pack_data(current)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return current
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._run(self._set_column_sync, "state", _storage_key(key), _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return await self._run(self._get_column_sync, "state", _storage_key(key))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._run(self._set_column_sync, "data", _storage_key(key), pack_data(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return unpack_data(await self._run(self._get_column_sync, "data", _storage_key(key)))
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        current = await self._run(self._update_data_sync, _storage_key(key), data)
+        return current.copy()
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=True)
+
+
+class InstrumentedStorage(BaseStorage):
+    """
+    Storage wrapper counting calls to the wrapped storage.
+
+    Register count_update as an outer update middleware to also count updates,
+    so stats() reports storage calls per update.
+    """
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+        self.calls: Counter[str] = Counter()
+        self.updates = 0
+
+    async def count_update(self, handler, event, data: dict[str, Any]) -> Any:
+        self.updates += 1
+        return await handler(event, data)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.calls["set_state"] += 1
+        await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        self.calls["get_state"] += 1
+        return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self.calls["set_data"] += 1
+        await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        self.calls["get_data"] += 1
+        return await self.storage.get_data(key)
+
+    async def get_value(
+        self, storage_key: StorageKey, dict_key: str, default: Any | None = None
+    ) -> Any | None:
+        self.calls["get_value"] += 1
+        return await self.storage.get_value(storage_key, dict_key, default)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        # Delegated as is, so backends with a single-round-trip update keep it
+        self.calls["update_data"] += 1
+        return await self.storage.update_data(key, data)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+    def stats(self) -> dict[str, Any]:
+        """Get storage call counts (total, per method and per update)."""
+        total = sum(self.calls.values())
+        return {
+            "updates": self.updates,
+            "calls": total,
+            "calls_per_update": total / self.updates if self.updates else 0.0,
+            **{f"{method}_calls": count for method, count in self.calls.items()},
+        }
+
+
+class BufferedFSMContext(FSMContext):
+    """
+    FSMContext reading state data once and writing it back once.
+
+    Data is loaded on first access and kept in memory; get_data/update_data/set_data
+    work on that copy and flush() writes it with a single set_data if it changed.
+    The state itself is cached but written through, so filters and later middlewares
+    see state changes immediately.
+
+    Whole data is written back, so concurrent updates of the same user must be
+    serialized (see UserLockMiddleware).
+    """
+
+    def __init__(self, storage: BaseStorage, key: StorageKey, raw_state: Any = _UNSET):
+        super().__init__(storage=storage, key=key)
+        self._state = raw_state
+        self._data: dict[str, Any] | None = None
+        self._dirty = False
+
+    async def _load(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+        return self._data
+
+    async def get_state(self) -> str | None:
+        if self._state is _UNSET:
+            self._state = await self.storage.get_state(key=self.key)
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        await self.storage.set_state(key=self.key, state=state)
+        self._state = _state_name(state)
+
+    async def get_data(self) -> dict[str, Any]:
+        return (await self._load()).copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        return (await self._load()).get(key, default)
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        self._data = dict(data)
+        self._dirty = True
+
+    async def update_data(
+        self, data: Mapping[str, Any] | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        current = await self._load()
+        if data:
+            current.update(data)
+        current.update(kwargs)
+        self._dirty = True
+        return current.copy()
+
+    async def flush(self) -> None:
+        """Write buffered data back to storage if it changed."""
+        if self._dirty:
+            await self.storage.set_data(key=self.key, data=self._data)
+            self._dirty = False
+
+
+async def buffer_fsm_data(handler, event, data: dict[str, Any]) -> Any:
+    """
+    Outer update middleware replacing data["state"] with a BufferedFSMContext.
+
+    Register after UserLockMiddleware, so the write-back happens before the user's
+    next update runs. Data is flushed even if the handler fails, as unbuffered
+    writes would have been.
+    """
+    state: FSMContext | None = data.get("state")
+    if state is None:
+        return await handler(event, data)
+    buffered = BufferedFSMContext(state.storage, state.key, data.get("raw_state", _UNSET))
+    data["state"] = buffered
+    try:
+        return await handler(event, data)
+    finally:
+        await buffered.flush()
+
+
+def create_redis_storage(url: str) -> BaseStorage:
+    """
+    Create Redis FSM storage with msgpack-encoded state data.
+
+    Requires the redis package (pip install redis).
+    """
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+
+    class MsgpackRedisStorage(RedisStorage):
+        """aiogram RedisStorage storing data as msgpack instead of JSON."""
+
+        async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+            redis_key = self.key_builder.build(key, "data")
+            packed = pack_data(data)
+            if packed is None:
+                await self.redis.delete(redis_key)
+                return
+            await self.redis.set(redis_key, packed, ex=self.data_ttl)
+
+        async def get_data(self, key: StorageKey) -> dict[str, Any]:
+            return unpack_data(await self.redis.get(self.key_builder.build(key, "data")))
+
+    return MsgpackRedisStorage.from_url(url, key_builder=DefaultKeyBuilder(with_bot_id=True))
+
+
+def _create_backend() -> BaseStorage:
+    backend = os.getenv("FSM_STORAGE", "memory").strip().lower()
+    if backend == "sqlite":
+        path = os.getenv("FSM_STORAGE_PATH") or DEFAULT_SQLITE_PATH
+        logger.info(f"Using SQLite FSM storage: {path}")
+        return SQLiteStorage(path)
+    if backend == "redis":
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        logger.info("Using Redis FSM storage")
+        return create_redis_storage(url)
+    if backend != "memory":
+        logger.warning(f"Unknown FSM_STORAGE {backend!r}, falling back to memory storage")
+    return MemoryStorage()
+
+
+def create_fsm_storage() -> InstrumentedStorage:
+    """
+    Create FSM storage selected by FSM_STORAGE (memory, sqlite or redis).
+
+    FSM_STORAGE_PATH sets the SQLite file, REDIS_URL the Redis server.
+    """
+    return InstrumentedStorage(_create_backend())
@@ -1,8 +1,11 @@
+import asyncio
 import logging
+from functools import lru_cache
+from typing import Iterable, Sequence
 
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from constants import (
     button_confirm,
     error_invalid_index,
@@ -39,29 +42,184 @@ async def safe_callback_answer(
         )
 
 
-async def get_updated_keyboard(
-    selected: set[str], categories: list[str], prefix: str
-) -> InlineKeyboardMarkup:
+class KeyboardDebouncer:
     """
-    Universal multiple button choosing func.
-    Uses index-based callback_data to avoid exceeding 64-byte limit.
+    Coalesces inline keyboard edits per message.
+
+    schedule() only remembers the latest markup of a message; the edit is sent once
+    no newer markup arrived for `delay` seconds. A user tapping through a multi-select
+    keyboard then costs one edit_reply_markup call instead of one per tap.
     """
-    keyboard = []
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        # (chat_id, message_id) -> (message, latest markup, send deadline)
+        self._pending: dict[tuple[int, int], tuple[Message, InlineKeyboardMarkup, float]] = {}
+        self._tasks: dict[tuple[int, int], asyncio.Task] = {}
+        # Keys whose edit_reply_markup call is running
+        self._in_flight: set[tuple[int, int]] = set()
+        self.scheduled = 0
+        self.sent = 0
+        self.saved = 0
+
+    @staticmethod
+    def _key(message: Message) -> tuple[int, int]:
+        return message.chat.id, message.message_id
+
+    def schedule(self, message: Message, reply_markup: InlineKeyboardMarkup) -> None:
+        """Set the keyboard of message after a quiet period, replacing a pending edit."""
+        key = self._key(message)
+        self.scheduled += 1
+        if key in self._pending:
+            self.saved += 1
+        loop = asyncio.get_running_loop()
+        self._pending[key] = (message, reply_markup, loop.time() + self.delay)
+        if key not in self._tasks:
+            self._tasks[key] = loop.create_task(self._send_when_quiet(key))
+
+    async def discard(self, message: Message) -> None:
+        """
+        Drop a pending edit of message.
+
+        Call before removing or replacing the keyboard directly, so a late
+        debounced edit doesn't bring the old keyboard back. An edit already sent to
+        Telegram can't be taken back, so it is waited for - the caller's own change
+        then lands after it.
+        """
+        key = self._key(message)
+        if self._pending.pop(key, None) is not None:
+            self.saved += 1
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return
+        if key in self._in_flight:
+            await asyncio.wait([task])
+        else:
+            task.cancel()
+
+    async def _send_when_quiet(self, key: tuple[int, int]) -> None:
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        try:
+            # Stop once discard() gave the key up, a newer task may own it by then
+            while self._tasks.get(key) is task and key in self._pending:
+                message, reply_markup, deadline = self._pending[key]
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                del self._pending[key]
+                self._in_flight.add(key)
+                try:
+                    await self._edit(message, reply_markup)
+                finally:
+                    self._in_flight.discard(key)
+        except asyncio.CancelledError:
+            return
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    async def _edit(self, message: Message, reply_markup: InlineKeyboardMarkup) -> None:
+        self.sent += 1
+        try:
+            await message.edit_reply_markup(reply_markup=reply_markup)
+        except TelegramBadRequest as e:
+            # "message is not modified" when taps cancelled each other out
+            logger.debug("Debounced keyboard edit failed: %s", str(e))
+        except TelegramAPIError as e:
+            logger.warning("Unexpected error editing keyboard: %s", str(e))
+
+    def stats(self) -> dict[str, int]:
+        """Get keyboard edit counts, including API calls saved by coalescing."""
+        return {
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "saved": self.saved,
+            "pending": len(self._pending),
+        }
+
+
+keyboard_debouncer = KeyboardDebouncer()
+
+
+@lru_cache(maxsize=64)
+def _option_callback_data(categories: tuple[str, ...], prefix: str) -> tuple[str, ...]:
+    """callback_data of each option, checked against the 64-byte limit once per keyboard."""
+    result = []
     for idx, cat in enumerate(categories):
-        text = f"{cat}{' ✔' if cat in selected else ''}"
         callback_data = f"{prefix}{idx}"
         if len(callback_data.encode("utf-8")) > 64:
             callback_data = f"{prefix}{cat[:20]}"
             if len(callback_data.encode("utf-8")) > 64:
                 callback_data = callback_data[:60]
+        result.append(callback_data)
+    return tuple(result)
 
-        keyboard.append([InlineKeyboardButton(text=text, callback_data=callback_data)])
 
+@lru_cache(maxsize=1024)
+def build_selection_keyboard(
+    categories: tuple[str, ...], prefix: str, selected_mask: int
+) -> InlineKeyboardMarkup:
+    """
+    Build (and cache) a multi-select keyboard.
+
+    Bit i of selected_mask marks categories[i] as selected. Telegram objects are
+    frozen, so the same markup instance is safely shared between users.
+    """
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=f"{cat}{' ✔' if selected_mask >> idx & 1 else ''}",
+                callback_data=callback_data,
+            )
+        ]
+        for idx, (cat, callback_data) in enumerate(
+            zip(categories, _option_callback_data(categories, prefix))
+        )
+    ]
     keyboard.append([InlineKeyboardButton(text=button_confirm, callback_data=f"{prefix}submit")])
 
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def selection_mask(selected: int | Iterable[str] | None, options: Sequence[str]) -> int:
+    """
+    Bitmask of selected options: bit i set means options[i] is selected.
+
+    Multi-select fields are kept in FSM data as such masks. A list of option strings
+    (older FSM data, resumes loaded from Firebase) is converted; unknown strings are dropped.
+    """
+    if isinstance(selected, int):
+        return selected
+    mask = 0
+    for item in selected or ():
+        if item in options:
+            mask |= 1 << options.index(item)
+    return mask
+
+
+def selection_items(selected: int | Iterable[str] | None, options: Sequence[str]) -> list[str]:
+    """Selected option strings (in options order) of a selection mask or a legacy list."""
+    if isinstance(selected, int):
+        return [option for idx, option in enumerate(options) if selected >> idx & 1]
+    return list(selected or ())
+
+
+async def get_updated_keyboard(
+    selected: set[str], categories: list[str], prefix: str
+) -> InlineKeyboardMarkup:
+    """
+    Universal multiple button choosing func.
+    Uses index-based callback_data to avoid exceeding 64-byte limit.
+    """
+    selected_mask = 0
+    for idx, cat in enumerate(categories):
+        if cat in selected:
+            selected_mask |= 1 << idx
+    return build_selection_keyboard(tuple(categories), prefix, selected_mask)
+
+
 async def toggle_selection(
     callback: CallbackQuery,
     state: FSMContext,
@@ -75,7 +233,7 @@ async def toggle_selection(
     Handles both index-based and text-based callback_data for compatibility.
     """
     data = await state.get_data()
-    selected = set(data.get(field_name, []))
+    selected_mask = selection_mask(data.get(field_name), options)
 
     if not callback.data.startswith(prefix):
         await safe_callback_answer(callback, error_processing, show_alert=True)
@@ -84,13 +242,16 @@ async def toggle_selection(
     item_id = callback.data[len(prefix) :]
 
     if item_id == "submit":
-        if not selected:
+        if not selected_mask:
             await safe_callback_answer(callback, error_no_selection, show_alert=True)
             return
 
+        await keyboard_debouncer.discard(callback.message)
         await callback.message.edit_reply_markup()
         await callback.message.answer(
-            msg_selected_template.format(items=", ".join(sorted(selected)))
+            msg_selected_template.format(
+                items=", ".join(sorted(selection_items(selected_mask, options)))
+            )
         )
 
         if next_state:
@@ -100,24 +261,20 @@ async def toggle_selection(
 
     try:
         idx = int(item_id)
-        if 0 <= idx < len(options):
-            item = options[idx]
-        else:
-            await safe_callback_answer(callback, error_invalid_index, show_alert=True)
-            return
     except ValueError:
-        item = item_id
+        # Text-based callback_data of long options (see _option_callback_data)
+        idx = next(
+            (i for i, option in enumerate(options) if item_id in (option, option[:20])), -1
+        )
+    if not 0 <= idx < len(options):
+        await safe_callback_answer(callback, error_invalid_index, show_alert=True)
+        return
 
-    if item in selected:
-        selected.remove(item)
-    else:
-        selected.add(item)
+    selected_mask ^= 1 << idx
 
-    await state.update_data(**{field_name: list(selected)})
+    await state.update_data(**{field_name: selected_mask})
 
-    keyboard: InlineKeyboardMarkup = await get_updated_keyboard(
-        selected=selected, categories=options, prefix=prefix
-    )
+    keyboard = build_selection_keyboard(tuple(options), prefix, selected_mask)
 
-    await callback.message.edit_reply_markup(reply_markup=keyboard)
+    keyboard_debouncer.schedule(callback.message, keyboard)
     await safe_callback_answer(callback)
@@ -0,0 +1,211 @@
+"""
+Outbound Telegram API rate limiting.
+
+Telegram allows roughly 30 messages per second per bot and about one per second per
+chat (short bursts are tolerated) and answers excess requests with 429 RetryAfter.
+The per-chat default follows that documented limit; the burst of 5 covers the
+largest reply of a survey step (the debounced keyboard edit, removing the keyboard,
+the "you selected" message and the next question), so survey replies are not held
+back and only longer runs are spread out to one per second.
+OutboundScheduler is a bot session middleware that paces every API request before
+it is sent:
+
+- per-chat pacing: a token bucket per chat (OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST)
+- global limit: a token bucket for the bot (OUTBOUND_RATE); waiting requests are
+  released by priority - callback answers first, then edits, then everything else
+- RetryAfter: the request waits as long as Telegram asks and is sent again, up to
+  OUTBOUND_MAX_RETRIES times
+
+Long polling and webhook setup are not paced.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any
+
+from admission import TokenBucket
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    DeleteWebhook,
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    GetUpdates,
+    SetWebhook,
+    TelegramMethod,
+)
+from aiogram.methods.base import Response, TelegramType
+from logging_config import log_warning
+
+logger = logging.getLogger(__name__)
+
+LANE_CALLBACK = 0
+LANE_EDIT = 1
+LANE_DEFAULT = 2
+LANE_NAMES = {LANE_CALLBACK: "callback", LANE_EDIT: "edit", LANE_DEFAULT: "default"}
+
+_EDIT_METHODS = (EditMessageText, EditMessageReplyMarkup, EditMessageCaption, EditMessageMedia)
+_UNPACED_METHODS = (GetUpdates, SetWebhook, DeleteWebhook)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Session middleware pacing API requests per chat and globally, by priority lane.
+
+    Register with bot.session.middleware(scheduler).
+    """
+
+    def __init__(
+        self,
+        rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 5.0,
+        max_retries: int = 3,
+        max_tracked_chats: int = 10000,
+    ):
+        self.global_pacer = TokenBucket(rate, rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max(0, max_retries)
+        self.max_tracked_chats = max_tracked_chats
+        self._chat_pacers: OrderedDict[Any, TokenBucket] = OrderedDict()
+
+        # Requests waiting for the global bucket: (lane, seq, future)
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._pump_task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+        self.sent = {lane: 0 for lane in LANE_NAMES}
+        self.total_wait = {lane: 0.0 for lane in LANE_NAMES}
+        self.max_wait = {lane: 0.0 for lane in LANE_NAMES}
+        self.retries = 0
+        self.retry_after_total = 0.0
+
+    @staticmethod
+    def _lane(method: TelegramMethod[Any]) -> int:
+        if isinstance(method, AnswerCallbackQuery):
+            return LANE_CALLBACK
+        if isinstance(method, _EDIT_METHODS):
+            return LANE_EDIT
+        return LANE_DEFAULT
+
+    def _chat_pacer(self, chat_id: Any) -> TokenBucket:
+        pacer = self._chat_pacers.get(chat_id)
+        if pacer is None:
+            pacer = self._chat_pacers[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self._chat_pacers) > self.max_tracked_chats:
+                # Least recently used chat; an idle pacer is the same as a new one
+                oldest_id, oldest = next(iter(self._chat_pacers.items()))
+                if oldest.is_idle():
+                    del self._chat_pacers[oldest_id]
+        else:
+            self._chat_pacers.move_to_end(chat_id)
+        return pacer
+
+    async def _pump(self) -> None:
+        """Release waiting requests one global token at a time, best lane first."""
+        while True:
+            if not self._waiting:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self.global_pacer.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self.global_pacer.reserve()
+                future.set_result(None)
+
+    async def _acquire_global(self, lane: int) -> None:
+        if not self._waiting and self.global_pacer.delay() == 0:
+            self.global_pacer.reserve()
+            return
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (lane, next(self._seq), future))
+        self._wakeup.set()
+        await future
+
+    async def _acquire(self, method: TelegramMethod[Any], lane: int) -> None:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            delay = self._chat_pacer(chat_id).reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await self._acquire_global(lane)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, _UNPACED_METHODS):
+            return await make_request(bot, method)
+
+        lane = self._lane(method)
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            await self._acquire(method, lane)
+            waited = time.monotonic() - start
+            self.sent[lane] += 1
+            self.total_wait[lane] += waited
+            self.max_wait[lane] = max(self.max_wait[lane], waited)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                self.retry_after_total += e.retry_after
+                log_warning(
+                    logger,
+                    action="telegram_retry_after",
+                    reason=f"Flood control, retrying in {e.retry_after}s",
+                    method=type(method).__name__,
+                    attempt=attempt,
+                )
+                await asyncio.sleep(e.retry_after)
+
+    def stats(self) -> dict[str, Any]:
+        """Get sent requests and queue wait (seconds) per lane, plus RetryAfter counts."""
+        stats: dict[str, Any] = {
+            "waiting": len(self._waiting),
+            "tracked_chats": len(self._chat_pacers),
+            "retries": self.retries,
+            "retry_after_total": self.retry_after_total,
+        }
+        for lane, name in LANE_NAMES.items():
+            sent = self.sent[lane]
+            stats[f"{name}_sent"] = sent
+            stats[f"{name}_avg_wait"] = self.total_wait[lane] / sent if sent else 0.0
+            stats[f"{name}_max_wait"] = self.max_wait[lane]
+        return stats
+
+
+def create_outbound_scheduler() -> OutboundScheduler:
+    """Create the scheduler from OUTBOUND_* settings."""
+    return OutboundScheduler(
+        rate=float(os.getenv("OUTBOUND_RATE", "30")),
+        chat_rate=float(os.getenv("OUTBOUND_CHAT_RATE", "1")),
+        chat_burst=float(os.getenv("OUTBOUND_CHAT_BURST", "5")),
+        max_retries=int(os.getenv("OUTBOUND_MAX_RETRIES", "3")),
+    )
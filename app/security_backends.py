@@ -0,0 +1,280 @@
+"""
+State backends for SecurityMiddleware.
+
+The backend owns the state that has to be shared between bot replicas and survive
+restarts: rate/burst/callback windows, blocks and the dynamic white/blacklists.
+Per-update heuristics (identical messages, survey flow, suspicious score) stay in
+the middleware.
+
+- InMemorySecurityBackend: process-local state (default)
+- RedisSecurityBackend: any Redis-compatible server; every window update is one
+  atomic Lua script call, so replicas share limits exactly
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Protocol
+
+if TYPE_CHECKING:
+    from security_middleware import UserActivity
+
+WHITELIST = "whitelist"
+BLACKLIST = "blacklist"
+
+
+@dataclass(slots=True)
+class RequestCounts:
+    """Request window estimates right after recording a request"""
+
+    per_minute: float
+    per_hour: float
+    per_day: float
+    burst: int  # Requests in the burst window, including this one
+    previous_request_time: float | None
+
+
+@dataclass(slots=True)
+class CallbackCounts:
+    """Callback window counts right after recording a callback"""
+
+    per_second: int  # Callbacks in the last second, including this one
+    # Presses of the same button in a row, counted from the first press of the run
+    # until identical_window has passed (any other callback starts a new run)
+    identical: int
+
+
+@dataclass(slots=True)
+class UserStatus:
+    whitelisted: bool
+    blacklisted: bool
+    blocked_until: float | None
+
+
+class SecurityBackend(Protocol):
+    async def get_user_status(self, user_id: int) -> UserStatus: ...
+
+    async def record_request(
+        self, user_id: int, now: float, burst_window: float
+    ) -> RequestCounts: ...
+
+    async def record_callback(
+        self, user_id: int, now: float, callback_data: str, identical_window: float
+    ) -> CallbackCounts: ...
+
+    async def set_block(self, user_id: int, blocked_until: float) -> None: ...
+
+    async def add_to_list(self, name: str, user_id: int) -> None: ...
+
+    async def remove_from_list(self, name: str, user_id: int) -> None: ...
+
+
+class InMemorySecurityBackend:
+    """
+    Process-local backend working on the middleware's UserActivity records.
+
+    activity_for(user_id) returns the (possibly new) record; expiry and the
+    tracked-users cap stay with the middleware.
+    """
+
+    def __init__(
+        self,
+        activity_for: Callable[[int], UserActivity],
+        get_activity: Callable[[int], UserActivity | None],
+        whitelist: set[int],
+        blacklist: set[int],
+    ):
+        self._activity_for = activity_for
+        self._get_activity = get_activity
+        self._lists = {WHITELIST: whitelist, BLACKLIST: blacklist}
+
+    async def get_user_status(self, user_id: int) -> UserStatus:
+        activity = self._get_activity(user_id)
+        return UserStatus(
+            whitelisted=user_id in self._lists[WHITELIST],
+            blacklisted=user_id in self._lists[BLACKLIST],
+            blocked_until=activity.blocked_until if activity else None,
+        )
+
+    async def record_request(self, user_id: int, now: float, burst_window: float) -> RequestCounts:
+        activity = self._activity_for(user_id)
+        previous_request_time = activity.request_times.last()
+        activity.request_times.append(now)
+        activity.minute_requests.hit(now)
+        activity.hour_requests.hit(now)
+        activity.day_requests.hit(now)
+        return RequestCounts(
+            per_minute=activity.minute_requests.estimate(now),
+            per_hour=activity.hour_requests.estimate(now),
+            per_day=activity.day_requests.estimate(now),
+            burst=activity.request_times.count_since(now - burst_window),
+            previous_request_time=previous_request_time,
+        )
+
+    async def record_callback(
+        self, user_id: int, now: float, callback_data: str, identical_window: float
+    ) -> CallbackCounts:
+        activity = self._activity_for(user_id)
+        activity.callback_times.expire_before(now - 1.0)
+        activity.callback_times.append(now)
+
+        if (
+            callback_data == activity.last_callback_data
+            and now - activity.callback_streak_start <= identical_window
+        ):
+            activity.callback_streak += 1
+        else:
+            activity.callback_streak = 1
+            activity.callback_streak_start = now
+        activity.last_callback_data = callback_data
+
+        return CallbackCounts(
+            per_second=len(activity.callback_times), identical=activity.callback_streak
+        )
+
+    async def set_block(self, user_id: int, blocked_until: float) -> None:
+        self._activity_for(user_id).blocked_until = blocked_until
+
+    async def add_to_list(self, name: str, user_id: int) -> None:
+        self._lists[name].add(user_id)
+
+    async def remove_from_list(self, name: str, user_id: int) -> None:
+        self._lists[name].discard(user_id)
+
+
+# KEYS: user hash, burst zset. ARGV: now, burst window.
+# Returns the minute/hour/day estimates (as strings), the burst count and the previous
+# request time ('' if none).
+_RECORD_REQUEST_SCRIPT = """
+local now = tonumber(ARGV[1])
+local burst_window = tonumber(ARGV[2])
+local previous = redis.call('HGET', KEYS[1], 'last')
+local result = {}
+for i, window in ipairs({60, 3600, 86400}) do
+    local start = now - (now % window)
+    local fields = redis.call('HMGET', KEYS[1], window .. ':start', window .. ':cur', window .. ':prev')
+    local cur_start = tonumber(fields[1] or '0')
+    local cur = tonumber(fields[2] or '0')
+    local prev = tonumber(fields[3] or '0')
+    if start ~= cur_start then
+        if start - cur_start == window then prev = cur else prev = 0 end
+        cur = 0
+    end
+    cur = cur + 1
+    redis.call('HSET', KEYS[1], window .. ':start', start, window .. ':cur', cur, window .. ':prev', prev)
+    result[i] = tostring(prev * (1 - (now - start) / window) + cur)
+end
+local seq = redis.call('HINCRBY', KEYS[1], 'seq', 1)
+redis.call('HSET', KEYS[1], 'last', ARGV[1])
+redis.call('EXPIRE', KEYS[1], 2 * 86400)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. (now - burst_window))
+redis.call('ZADD', KEYS[2], now, ARGV[1] .. ':' .. seq)
+redis.call('EXPIRE', KEYS[2], math.ceil(burst_window) + 1)
+result[4] = redis.call('ZCARD', KEYS[2])
+result[5] = previous or ''
+return result
+"""
+
+# KEYS: callback hash, callback zset. ARGV: now, callback data, identical window.
+# Returns callbacks in the last second and the identical-press streak.
+_RECORD_CALLBACK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local identical_window = tonumber(ARGV[3])
+local seq = redis.call('HINCRBY', KEYS[1], 'seq', 1)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. (now - 1))
+redis.call('ZADD', KEYS[2], now, ARGV[1] .. ':' .. seq)
+redis.call('EXPIRE', KEYS[2], 2)
+local per_second = redis.call('ZCARD', KEYS[2])
+local last = redis.call('HMGET', KEYS[1], 'data', 'streak', 'streak_start')
+local streak = 1
+local streak_start = now
+if last[1] == ARGV[2] and last[3] and now - tonumber(last[3]) <= identical_window then
+    streak = tonumber(last[2]) + 1
+    streak_start = tonumber(last[3])
+end
+redis.call('HSET', KEYS[1], 'data', ARGV[2], 'streak', streak, 'streak_start', tostring(streak_start))
+redis.call('EXPIRE', KEYS[1], math.ceil(identical_window) + 1)
+return {per_second, streak}
+"""
+
+
+class RedisSecurityBackend:
+    """
+    Shared backend on a Redis-compatible server.
+
+    Timestamps come from the calling replica, so replicas need roughly synced clocks.
+    """
+
+    def __init__(self, redis: Any, prefix: str = "security"):
+        self.redis = redis
+        self.prefix = prefix
+        self._record_request = redis.register_script(_RECORD_REQUEST_SCRIPT)
+        self._record_callback = redis.register_script(_RECORD_CALLBACK_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "security") -> RedisSecurityBackend:
+        """Create the backend from a Redis URL (requires the redis package)"""
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), prefix=prefix)
+
+    def _key(self, *parts: Any) -> str:
+        return ":".join((self.prefix, *(str(part) for part in parts)))
+
+    async def get_user_status(self, user_id: int) -> UserStatus:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.sismember(self._key(WHITELIST), user_id)
+            pipe.sismember(self._key(BLACKLIST), user_id)
+            pipe.get(self._key("block", user_id))
+            whitelisted, blacklisted, blocked_until = await pipe.execute()
+        return UserStatus(
+            whitelisted=bool(whitelisted),
+            blacklisted=bool(blacklisted),
+            blocked_until=float(blocked_until) if blocked_until else None,
+        )
+
+    async def record_request(self, user_id: int, now: float, burst_window: float) -> RequestCounts:
+        per_minute, per_hour, per_day, burst, previous = await self._record_request(
+            keys=[self._key("user", user_id), self._key("burst", user_id)],
+            args=[repr(now), repr(burst_window)],
+        )
+        return RequestCounts(
+            per_minute=float(per_minute),
+            per_hour=float(per_hour),
+            per_day=float(per_day),
+            burst=int(burst),
+            previous_request_time=float(previous) if previous else None,
+        )
+
+    async def record_callback(
+        self, user_id: int, now: float, callback_data: str, identical_window: float
+    ) -> CallbackCounts:
+        per_second, identical = await self._record_callback(
+            keys=[self._key("callback", user_id), self._key("callbacks", user_id)],
+            args=[repr(now), callback_data, repr(identical_window)],
+        )
+        return CallbackCounts(per_second=int(per_second), identical=int(identical))
+
+    async def set_block(self, user_id: int, blocked_until: float) -> None:
+        ttl_ms = max(1, int((blocked_until - time.time()) * 1000))
+        await self.redis.set(self._key("block", user_id), repr(blocked_until), px=ttl_ms)
+
+    async def add_to_list(self, name: str, user_id: int) -> None:
+        await self.redis.sadd(self._key(name), user_id)
+
+    async def remove_from_list(self, name: str, user_id: int) -> None:
+        await self.redis.srem(self._key(name), user_id)
+
+
+def create_security_backend() -> RedisSecurityBackend | None:
+    """
+    Create the backend selected by SECURITY_BACKEND (memory or redis).
+
+    Returns None for memory - the middleware then uses its own in-process backend.
+    """
+    backend = os.getenv("SECURITY_BACKEND", "memory").strip().lower()
+    if backend == "redis":
+        return RedisSecurityBackend.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return None
@@ -4,21 +4,205 @@ Provides protection against spam, DDoS attacks, and malicious users
 while allowing normal survey completion flow.
 """
 
+import asyncio
+import hashlib
 import logging
+import math
+import re
 import time
-from collections import defaultdict, deque
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Awaitable, Callable, Coroutine, Sequence
 
 from aiogram import BaseMiddleware
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message, TelegramObject
-from logging_config import log_info, log_warning
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from constants import msg_request_rejected
+from functions import safe_callback_answer
+from logging_config import log_error, log_info, log_warning
+from security_backends import (
+    BLACKLIST,
+    WHITELIST,
+    InMemorySecurityBackend,
+    RequestCounts,
+    SecurityBackend,
+    create_security_backend,
+)
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+class SlidingWindowCounter:
+    """
+    O(1) approximate sliding-window request counter.
+
+    Keeps the counts of the current and the previous fixed window and weights the
+    previous one by how much of it still overlaps the sliding window.
+    """
+
+    __slots__ = ("window", "current_start", "current", "previous")
+
+    def __init__(self, window: float):
+        self.window = window
+        self.current_start = 0.0
+        self.current = 0
+        self.previous = 0
+
+    def _roll(self, now: float) -> None:
+        start = now - (now % self.window)
+        if start != self.current_start:
+            # The previous window only counts if it is directly before the current one
+            self.previous = self.current if start - self.current_start == self.window else 0
+            self.current = 0
+            self.current_start = start
+
+    def hit(self, now: float) -> None:
+        """Count one request at time now."""
+        self._roll(now)
+        self.current += 1
+
+    def estimate(self, now: float) -> float:
+        """Estimated number of requests in the last window seconds."""
+        self._roll(now)
+        overlap = 1.0 - (now - self.current_start) / self.window
+        return self.previous * overlap + self.current
+
+
+class TimestampRing:
+    """
+    Fixed-capacity ring buffer of timestamps backed by array('d').
+
+    Replaces deque(maxlen=...) of boxed floats: 8 bytes per entry, allocated on
+    first append. Entries can carry a 64-bit integer key (e.g. a message digest),
+    with per-key counts kept for O(1) lookups.
+    Timestamps are expected in ascending order.
+    """
+
+    __slots__ = ("capacity", "_times", "_keys", "_key_counts", "_with_keys", "_start", "_size")
+
+    def __init__(self, capacity: int, with_keys: bool = False):
+        self.capacity = max(1, capacity)
+        self._with_keys = with_keys
+        self._times: array | None = None
+        self._keys: array | None = None
+        self._key_counts: dict[int, int] | None = None
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    def append(self, timestamp: float, key: int = 0) -> None:
+        """Add a timestamp, overwriting the oldest one when full."""
+        if self._times is None:
+            self._times = array("d", bytes(8 * self.capacity))
+            if self._with_keys:
+                self._keys = array("q", bytes(8 * self.capacity))
+                self._key_counts = {}
+        if self._size < self.capacity:
+            i = self._index(self._size)
+            self._size += 1
+        else:
+            i = self._start
+            self._forget_key(i)
+            self._start = self._index(1)
+        self._times[i] = timestamp
+        if self._keys is not None:
+            self._keys[i] = key
+            self._key_counts[key] = self._key_counts.get(key, 0) + 1
+
+    def _forget_key(self, i: int) -> None:
+        if self._keys is None:
+            return
+        key = self._keys[i]
+        remaining = self._key_counts[key] - 1
+        if remaining:
+            self._key_counts[key] = remaining
+        else:
+            del self._key_counts[key]
+
+    def last(self) -> float | None:
+        """Newest timestamp, or None if empty."""
+        return self._times[self._index(self._size - 1)] if self._size else None
+
+    def expire_before(self, cutoff: float) -> None:
+        """Drop entries older than cutoff."""
+        while self._size and self._times[self._start] < cutoff:
+            self._forget_key(self._start)
+            self._start = self._index(1)
+            self._size -= 1
+
+    def count_since(self, cutoff: float) -> int:
+        """Number of entries newer than cutoff."""
+        count = 0
+        for i in range(self._size - 1, -1, -1):
+            if self._times[self._index(i)] <= cutoff:
+                break
+            count += 1
+        return count
+
+    def count_key(self, key: int) -> int:
+        """Number of entries stored with key."""
+        if self._key_counts is None:
+            return 0
+        return self._key_counts.get(key, 0)
+
+    def keys(self) -> list[int]:
+        """Keys of all entries, oldest first."""
+        if self._keys is None:
+            return []
+        return [self._keys[self._index(i)] for i in range(self._size)]
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+        if self._key_counts is not None:
+            self._key_counts.clear()
+
+
+_WORD_RE = re.compile(r"\w+")
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _digest64(data: bytes) -> int:
+    # Signed, so it fits array('q')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
+def message_digest(text: str) -> int:
+    """Fixed-size (blake2b-64) fingerprint of a message; the text itself is not kept."""
+    return _digest64(text.encode("utf-8"))
+
+
+def message_simhash(text: str) -> int:
+    """
+    64-bit simhash of the message words.
+
+    Slightly varied texts (changed punctuation, case, a word or two) get fingerprints
+    within a small Hamming distance of each other.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return message_digest(text)
+    hashes = [_digest64(word.encode("utf-8")) & _UINT64_MASK for word in words]
+    # Majority vote per bit position over all word hashes
+    threshold = len(hashes) / 2
+    bits = "".join(
+        "1" if column.count("1") > threshold else "0"
+        for column in map("".join, zip(*(format(h, "064b") for h in hashes)))
+    )
+    return int.from_bytes(int(bits, 2).to_bytes(8, "big"), "big", signed=True)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return ((a ^ b) & _UINT64_MASK).bit_count()
+
+
+@dataclass(slots=True)
 class UserActivity:
     """Track user activity for security analysis"""
 
@@ -26,18 +210,60 @@ class UserActivity:
     message_count: int = 0
     callback_count: int = 0
     last_activity: float = field(default_factory=time.time)
-    request_times: deque = field(default_factory=lambda: deque(maxlen=100))
-    identical_messages: deque = field(default_factory=lambda: deque(maxlen=10))
+    request_times: TimestampRing = field(default_factory=lambda: TimestampRing(100))
+    # Timestamps keyed by message digest (see message_digest)
+    identical_messages: TimestampRing = field(
+        default_factory=lambda: TimestampRing(10, with_keys=True)
+    )
+    # Timestamps keyed by message simhash, only used with near-duplicate detection
+    similar_messages: TimestampRing = field(
+        default_factory=lambda: TimestampRing(10, with_keys=True)
+    )
     suspicious_score: int = 0
     blocked_until: float | None = None
     survey_start_time: float | None = None
     last_state: str | None = None
-    state_changes: deque = field(
-        default_factory=lambda: deque(maxlen=100)
-    )
+    state_changes: TimestampRing = field(default_factory=lambda: TimestampRing(100))
     last_command_time: float | None = None
-    callback_times: deque = field(default_factory=lambda: deque(maxlen=50))  # Track callback frequency
+    callback_times: TimestampRing = field(default_factory=lambda: TimestampRing(50))  # Track callback frequency
     last_callback_data: str | None = None  # Track identical callbacks
+    callback_streak: int = 0  # Consecutive presses of last_callback_data
+    callback_streak_start: float = 0.0
+    # Rate limit windows (request_times only keeps the last few requests)
+    minute_requests: SlidingWindowCounter = field(default_factory=lambda: SlidingWindowCounter(60))
+    hour_requests: SlidingWindowCounter = field(default_factory=lambda: SlidingWindowCounter(3600))
+    day_requests: SlidingWindowCounter = field(default_factory=lambda: SlidingWindowCounter(86400))
+
+
+@dataclass(slots=True)
+class CheckContext:
+    """Per-update input shared by the security rules"""
+
+    user_id: int
+    data: dict[str, Any]
+    counts: RequestCounts
+    message_text: str | None = None
+    callback_data: str | None = None
+    is_callback: bool = False
+    is_command: bool = False
+
+
+@dataclass(slots=True)
+class RuleStats:
+    """Timing of one security rule"""
+
+    calls: int = 0
+    failures: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+# Rules per update type, evaluated in order until the first failure.
+# Local checks first, then the ones that may need a backend or storage round trip.
+DEFAULT_RULES: dict[str, tuple[str, ...]] = {
+    "message": ("command_spam", "spam", "rate_limit", "burst", "survey"),
+    "callback_query": ("rate_limit", "burst", "callback_spam", "survey"),
+}
 
 
 class SecurityMiddleware(BaseMiddleware):
@@ -51,6 +277,12 @@ class SecurityMiddleware(BaseMiddleware):
     - User behavior analysis
     - Survey flow protection (allows normal completion)
     - Whitelist/Blacklist support
+
+    Rate/burst/callback windows, blocks and lists are kept in a SecurityBackend;
+    pass a shared one (e.g. RedisSecurityBackend) when running several replicas.
+
+    Checks run as an ordered rule pipeline per update type (see DEFAULT_RULES) that
+    stops at the first failing rule.
     """
 
     def __init__(
@@ -67,12 +299,21 @@ class SecurityMiddleware(BaseMiddleware):
         max_state_changes_per_minute: int = 20,
         initial_block_duration: int = 300,
         max_block_duration: int = 86400,
+        block_score_threshold: int = 20,  # Suspicious score that gets a user blocked
         whitelist: set[int] | None = None,
         blacklist: set[int] | None = None,
         # Callback protection
         max_callbacks_per_second: float = 5.0,  # Allow rapid toggle operations
         max_identical_callbacks: int = 10,  # Same callback spam threshold
         identical_callback_window: float = 3.0,  # seconds
+        # Memory bounds
+        user_idle_ttl: int = 86400,  # Forget users idle for this long (seconds)
+        max_tracked_users: int = 100_000,  # LRU cap on tracked users
+        expiry_batch_size: int = 10,  # Users examined for expiry per update
+        backend: SecurityBackend | None = None,
+        rules: dict[str, Sequence[str]] | None = None,
+        # Near-duplicate spam: max simhash Hamming distance (None disables, e.g. 3)
+        near_duplicate_distance: int | None = None,
     ):
         super().__init__()
 
@@ -88,39 +329,113 @@ class SecurityMiddleware(BaseMiddleware):
         self.max_state_changes_per_minute = max_state_changes_per_minute
         self.initial_block_duration = initial_block_duration
         self.max_block_duration = max_block_duration
+        self.block_score_threshold = block_score_threshold
         self.max_callbacks_per_second = max_callbacks_per_second
         self.max_identical_callbacks = max_identical_callbacks
         self.identical_callback_window = identical_callback_window
+        self.near_duplicate_distance = near_duplicate_distance
+        self.user_idle_ttl = user_idle_ttl
+        self.max_tracked_users = max_tracked_users
+        self.expiry_batch_size = max(1, expiry_batch_size)
 
-        self.user_activities: dict[int, UserActivity] = defaultdict(lambda: UserActivity(user_id=0))
+        # Ordered from least to most recently active (LRU)
+        self.user_activities: OrderedDict[int, UserActivity] = OrderedDict()
 
         self.whitelist: set[int] = whitelist or set()
         self.blacklist: set[int] = blacklist or set()
 
-        self._last_cleanup = time.time()
-        self._cleanup_interval = 3600
+        self.backend: SecurityBackend = backend or InMemorySecurityBackend(
+            activity_for=self._activity,
+            get_activity=self.user_activities.get,
+            whitelist=self.whitelist,
+            blacklist=self.blacklist,
+        )
 
-    def _cleanup_old_data(self) -> None:
-        """Remove old user activity data to prevent memory leaks"""
-        current_time = time.time()
-        if current_time - self._last_cleanup < self._cleanup_interval:
-            return
+        self.expired_users = 0
+        self.evicted_users = 0
+        # Background white/blacklist writes to a shared backend
+        self._list_updates: set[asyncio.Task] = set()
+
+        self._rule_funcs: dict[str, Callable[[CheckContext], Awaitable[tuple[bool, str]]]] = {
+            "command_spam": self._rule_command_spam,
+            "spam": self._rule_spam,
+            "rate_limit": self._rule_rate_limit,
+            "burst": self._rule_burst,
+            "callback_spam": self._rule_callback_spam,
+            "survey": self._rule_survey,
+        }
+        self.rules: dict[str, tuple[str, ...]] = {
+            update_type: tuple(names) for update_type, names in (rules or DEFAULT_RULES).items()
+        }
+        for names in self.rules.values():
+            unknown = set(names) - self._rule_funcs.keys()
+            if unknown:
+                raise ValueError(f"Unknown security rules: {', '.join(sorted(unknown))}")
+        self.rule_stats: dict[str, RuleStats] = {name: RuleStats() for name in self._rule_funcs}
+
+    def _new_activity(self, user_id: int) -> UserActivity:
+        """Create activity tracking with ring buffers sized to the configured thresholds"""
+        return UserActivity(
+            user_id=user_id,
+            # Burst check needs burst_threshold entries, spam interval check the last one
+            request_times=TimestampRing(self.burst_threshold),
+            identical_messages=TimestampRing(self.max_identical_messages, with_keys=True),
+            similar_messages=TimestampRing(self.max_identical_messages, with_keys=True),
+            state_changes=TimestampRing(self.max_state_changes_per_minute + 1),
+            # One more than allowed, the current callback is recorded before the check
+            callback_times=TimestampRing(math.ceil(self.max_callbacks_per_second) + 1),
+        )
 
-        cutoff_time = current_time - 86400
-        users_to_remove = []
+    def _activity(self, user_id: int) -> UserActivity:
+        """Get (or start) tracking of a user and mark them most recently active"""
+        activity = self.user_activities.get(user_id)
+        if activity is None:
+            activity = self._new_activity(user_id)
+            self.user_activities[user_id] = activity
+            if len(self.user_activities) > self.max_tracked_users:
+                self._evict_least_recent()
+        else:
+            self.user_activities.move_to_end(user_id)
+        return activity
 
-        for user_id, activity in self.user_activities.items():
-            if (
-                activity.blocked_until is None
-                and activity.last_activity < cutoff_time
-                and len(activity.request_times) == 0
-            ):
-                users_to_remove.append(user_id)
+    def _is_block_active(self, activity: UserActivity, current_time: float) -> bool:
+        return activity.blocked_until is not None and activity.blocked_until > current_time
 
-        for user_id in users_to_remove:
+    def _evict_least_recent(self) -> None:
+        """Enforce max_tracked_users by evicting least recently active users (not blocked ones)"""
+        current_time = time.time()
+        for _ in range(self.expiry_batch_size):
+            if len(self.user_activities) <= self.max_tracked_users:
+                return
+            user_id, activity = next(iter(self.user_activities.items()))
+            if self._is_block_active(activity, current_time):
+                # Keep blocks in force; look at them again later
+                self.user_activities.move_to_end(user_id)
+                continue
             del self.user_activities[user_id]
+            self.evicted_users += 1
+
+    def _cleanup_old_data(self) -> None:
+        """
+        Expire idle users a few at a time to keep memory bounded.
 
-        self._last_cleanup = current_time
+        user_activities is in LRU order, so idle users are always at the front and
+        each call does O(expiry_batch_size) work instead of a periodic full sweep.
+        """
+        current_time = time.time()
+        cutoff_time = current_time - self.user_idle_ttl
+
+        for _ in range(self.expiry_batch_size):
+            if not self.user_activities:
+                return
+            user_id, activity = next(iter(self.user_activities.items()))
+            if activity.last_activity >= cutoff_time:
+                return
+            if self._is_block_active(activity, current_time):
+                self.user_activities.move_to_end(user_id)
+                continue
+            del self.user_activities[user_id]
+            self.expired_users += 1
 
     def _is_whitelisted(self, user_id: int) -> bool:
         """Check if user is whitelisted"""
@@ -130,33 +445,38 @@ class SecurityMiddleware(BaseMiddleware):
         """Check if user is blacklisted"""
         return user_id in self.blacklist
 
-    def _is_blocked(self, user_id: int) -> bool:
-        """Check if user is currently blocked"""
-        activity = self.user_activities[user_id]
-        if activity.blocked_until is None:
+    def _is_blocked(self, user_id: int, shared_blocked_until: float | None = None) -> bool:
+        """Check if user is currently blocked (locally or by another replica)"""
+        current_time = time.time()
+        if shared_blocked_until is not None and current_time < shared_blocked_until:
+            return True
+
+        activity = self.user_activities.get(user_id)
+        if activity is None or activity.blocked_until is None:
             return False
 
-        if time.time() < activity.blocked_until:
+        if current_time < activity.blocked_until:
             return True
 
         activity.blocked_until = None
         activity.suspicious_score = max(0, activity.suspicious_score - 10)
         return False
 
-    def _block_user(self, user_id: int, duration: int | None = None) -> None:
+    async def _block_user(self, user_id: int, duration: int | None = None) -> None:
         """Block user for specified duration"""
         activity = self.user_activities[user_id]
 
         if duration is None:
-            if activity.suspicious_score < 20:
+            if activity.suspicious_score < self.block_score_threshold:
                 duration = self.initial_block_duration
-            elif activity.suspicious_score < 50:
+            elif activity.suspicious_score < self.block_score_threshold * 2.5:
                 duration = self.initial_block_duration * 2
             else:
                 duration = self.max_block_duration
 
         activity.blocked_until = time.time() + duration
         activity.suspicious_score += 5
+        await self.backend.set_block(user_id, activity.blocked_until)
 
         log_warning(
             logger,
@@ -167,140 +487,151 @@ class SecurityMiddleware(BaseMiddleware):
             suspicious_score=activity.suspicious_score,
         )
 
-    def _check_rate_limit(self, user_id: int) -> tuple[bool, str]:
+    def _check_rate_limit(self, user_id: int, counts: RequestCounts) -> tuple[bool, str]:
         """Check if user exceeds rate limits"""
-        activity = self.user_activities[user_id]
-        current_time = time.time()
-
-        requests_last_minute = sum(1 for t in activity.request_times if current_time - t < 60)
-        requests_last_hour = sum(1 for t in activity.request_times if current_time - t < 3600)
-        requests_last_day = sum(1 for t in activity.request_times if current_time - t < 86400)
+        requests_last_minute = counts.per_minute
+        requests_last_hour = counts.per_hour
+        requests_last_day = counts.per_day
 
         if requests_last_minute > self.max_requests_per_minute:
-            return False, f"Rate limit exceeded: {requests_last_minute} requests per minute"
+            return False, f"Rate limit exceeded: {requests_last_minute:.0f} requests per minute"
 
         if requests_last_hour > self.max_requests_per_hour:
-            return False, f"Rate limit exceeded: {requests_last_hour} requests per hour"
+            return False, f"Rate limit exceeded: {requests_last_hour:.0f} requests per hour"
 
         if requests_last_day > self.max_requests_per_day:
-            return False, f"Rate limit exceeded: {requests_last_day} requests per day"
+            return False, f"Rate limit exceeded: {requests_last_day:.0f} requests per day"
 
         return True, ""
 
-    def _check_burst_protection(self, user_id: int) -> tuple[bool, str]:
+    def _check_burst_protection(self, user_id: int, counts: RequestCounts) -> tuple[bool, str]:
         """Check for request bursts (DDoS pattern)"""
         activity = self.user_activities[user_id]
-        current_time = time.time()
-
-        recent_requests = [
-            t for t in activity.request_times if current_time - t < self.burst_window
-        ]
+        recent_requests = counts.burst
 
-        if len(recent_requests) >= self.burst_threshold:
+        if recent_requests >= self.burst_threshold:
             activity.suspicious_score += 10
-            return False, f"Burst detected: {len(recent_requests)} requests in {self.burst_window}s"
+            return False, f"Burst detected: {recent_requests} requests in {self.burst_window}s"
 
         return True, ""
 
     def _check_spam_detection(
-        self, user_id: int, message_text: str | None = None
+        self,
+        user_id: int,
+        message_text: str | None = None,
+        previous_request_time: float | None = None,
     ) -> tuple[bool, str]:
         """Detect spam patterns"""
         activity = self.user_activities[user_id]
         current_time = time.time()
 
         if message_text:
-            while (
-                activity.identical_messages
-                and current_time - activity.identical_messages[0][0] > self.identical_message_window
-            ):
-                activity.identical_messages.popleft()
-
-            identical_count = sum(
-                1 for _, text in activity.identical_messages if text == message_text
-            )
+            cutoff_time = current_time - self.identical_message_window
+            activity.identical_messages.expire_before(cutoff_time)
+
+            digest = message_digest(message_text)
+            identical_count = activity.identical_messages.count_key(digest)
 
             if identical_count >= self.max_identical_messages:
                 activity.suspicious_score += 15
                 return False, f"Spam detected: {identical_count} identical messages"
 
-            activity.identical_messages.append((current_time, message_text))
+            if self.near_duplicate_distance is not None:
+                activity.similar_messages.expire_before(cutoff_time)
+                fingerprint = message_simhash(message_text)
+                similar_count = sum(
+                    1
+                    for key in activity.similar_messages.keys()
+                    if hamming_distance(key, fingerprint) <= self.near_duplicate_distance
+                )
+                if similar_count >= self.max_identical_messages:
+                    activity.suspicious_score += 15
+                    return False, f"Spam detected: {similar_count} near-duplicate messages"
+                activity.similar_messages.append(current_time, fingerprint)
+
+            activity.identical_messages.append(current_time, digest)
 
-        if activity.request_times:
-            time_since_last = current_time - activity.request_times[-1]
+        if previous_request_time is not None:
+            time_since_last = current_time - previous_request_time
             if time_since_last < self.min_message_interval:
                 activity.suspicious_score += 5
                 return False, f"Messages too frequent: {time_since_last:.2f}s interval"
 
         return True, ""
 
-    async def _check_survey_protection(
-        self, user_id: int, state: FSMContext | None = None
-    ) -> tuple[bool, str]:
+    async def _resolve_state(self, user_id: int, data: dict[str, Any]) -> tuple[bool, str | None]:
+        """
+        Get the current FSM state without an extra storage read.
+
+        FSMContextMiddleware already put raw_state into data; only fall back to the
+        storage when it's missing, and share the result with handlers.
+
+        Returns:
+            (resolved, state) - resolved is False if the state couldn't be read
+        """
+        if "raw_state" in data:
+            return True, data["raw_state"]
+
+        state: FSMContext | None = data.get("state")
+        if state is None:
+            return False, None
+        try:
+            current_state = await state.get_state()
+        except Exception as e:
+            logger.warning(f"Failed to get FSM state for user {user_id}: {e}")
+            return False, None
+        data["raw_state"] = current_state
+        return True, current_state
+
+    def _check_survey_protection(self, user_id: int, current_state: str | None) -> tuple[bool, str]:
         """Protect survey flow while detecting abuse"""
         activity = self.user_activities[user_id]
         current_time = time.time()
 
-        if state:
-            try:
-                current_state = await state.get_state()
-            except Exception as e:
-                logger.warning(f"Failed to get FSM state for user {user_id}: {e}")
-                return True, ""
+        if current_state and activity.survey_start_time is None:
+            activity.survey_start_time = current_time
+            activity.last_state = str(current_state)
+            activity.state_changes.append(current_time)
+            return True, ""
 
-            if current_state and activity.survey_start_time is None:
+        if current_state and activity.survey_start_time:
+            survey_duration = current_time - activity.survey_start_time
+            if survey_duration > self.max_survey_duration:
+                # Start tracking anew, so a user coming back to an old survey isn't locked out
                 activity.survey_start_time = current_time
-                activity.last_state = str(current_state)
-                activity.state_changes.append(current_time)
-                return True, ""
-
-            if current_state and activity.survey_start_time:
-                survey_duration = current_time - activity.survey_start_time
-                if survey_duration > self.max_survey_duration:
-                    return False, f"Survey duration exceeded: {survey_duration:.0f}s"
+                activity.state_changes.clear()
+                return False, f"Survey duration exceeded: {survey_duration:.0f}s"
 
-                if str(current_state) != activity.last_state:
-                    activity.state_changes.append(current_time)
-                    activity.last_state = str(current_state)
+            if str(current_state) != activity.last_state:
+                activity.state_changes.append(current_time)
+                activity.last_state = str(current_state)
 
-                    while activity.state_changes and current_time - activity.state_changes[0] > 60:
-                        activity.state_changes.popleft()
+                activity.state_changes.expire_before(current_time - 60)
 
-                    state_changes_last_minute = len(activity.state_changes)
-                    if state_changes_last_minute > self.max_state_changes_per_minute:
-                        activity.suspicious_score += 10
-                        return (
-                            False,
-                            f"Too many state changes: {state_changes_last_minute} in last minute",
-                        )
+                state_changes_last_minute = len(activity.state_changes)
+                if state_changes_last_minute > self.max_state_changes_per_minute:
+                    activity.suspicious_score += 10
+                    return (
+                        False,
+                        f"Too many state changes: {state_changes_last_minute} in last minute",
+                    )
 
-                return True, ""
+            return True, ""
 
         if activity.survey_start_time:
-            try:
-                if state:
-                    current_state = await state.get_state()
-                    if not current_state:
-                        activity.survey_start_time = None
-                        activity.state_changes.clear()
-                        activity.last_state = None
-                else:
-                    activity.survey_start_time = None
-                    activity.state_changes.clear()
-                    activity.last_state = None
-            except Exception:
-                pass
+            # Survey finished or cancelled
+            activity.survey_start_time = None
+            activity.state_changes.clear()
+            activity.last_state = None
 
         return True, ""
 
     def _update_activity(self, user_id: int, is_callback: bool = False) -> None:
         """Update user activity tracking"""
-        activity = self.user_activities[user_id]
-        activity.user_id = user_id
+        activity = self._activity(user_id)
         current_time = time.time()
 
         activity.last_activity = current_time
-        activity.request_times.append(current_time)
 
         if is_callback:
             activity.callback_count += 1
@@ -322,142 +653,224 @@ class SecurityMiddleware(BaseMiddleware):
         activity.last_command_time = current_time
         return True, ""
 
-    def _check_callback_spam(
+    async def _check_callback_spam(
         self, user_id: int, callback_data: str | None, is_callback: bool
     ) -> tuple[bool, str]:
-        """Check for callback spam (rapid button clicking, especially toggle operations)"""
+        """
+        Check for callback spam (rapid button clicking, especially toggle operations).
+
+        Identical callbacks are counted as a streak: presses of the same button in a
+        row, from the first press of the streak until identical_callback_window has
+        passed. Pressing any other button, or a press after the window, starts a new
+        streak, so toggling two options back and forth never adds up.
+        """
         if not is_callback or not callback_data:
             return True, ""
 
         activity = self.user_activities[user_id]
-        current_time = time.time()
-
-        # Remove old callback times (older than 1 second)
-        while activity.callback_times and current_time - activity.callback_times[0] > 1.0:
-            activity.callback_times.popleft()
+        counts = await self.backend.record_callback(
+            user_id, time.time(), callback_data, self.identical_callback_window
+        )
 
-        # Check callback frequency (callbacks per second)
-        if len(activity.callback_times) >= self.max_callbacks_per_second:
+        # Check callback frequency (callbacks per second, including this one)
+        if counts.per_second > self.max_callbacks_per_second:
             activity.suspicious_score += 5
-            return False, f"Callback spam: {len(activity.callback_times)} callbacks per second"
+            return False, f"Callback spam: {counts.per_second} callbacks per second"
 
         # Check for identical callbacks (same button pressed repeatedly)
-        if callback_data == activity.last_callback_data:
-            # Count identical callbacks in window
-            identical_count = sum(
-                1
-                for t in activity.callback_times
-                if current_time - t < self.identical_callback_window
+        if counts.identical > self.max_identical_callbacks:
+            activity.suspicious_score += 8
+            return (
+                False,
+                f"Identical callback spam: {counts.identical} identical callbacks in {self.identical_callback_window}s",
             )
-            if identical_count >= self.max_identical_callbacks:
-                activity.suspicious_score += 8
-                return (
-                    False,
-                    f"Identical callback spam: {identical_count} identical callbacks in {self.identical_callback_window}s",
-                )
 
-        activity.callback_times.append(current_time)
-        activity.last_callback_data = callback_data
         return True, ""
 
+    async def _rule_command_spam(self, ctx: CheckContext) -> tuple[bool, str]:
+        return self._check_command_spam(ctx.user_id, ctx.is_command)
+
+    async def _rule_spam(self, ctx: CheckContext) -> tuple[bool, str]:
+        return self._check_spam_detection(
+            ctx.user_id, ctx.message_text, ctx.counts.previous_request_time
+        )
+
+    async def _rule_rate_limit(self, ctx: CheckContext) -> tuple[bool, str]:
+        return self._check_rate_limit(ctx.user_id, ctx.counts)
+
+    async def _rule_burst(self, ctx: CheckContext) -> tuple[bool, str]:
+        return self._check_burst_protection(ctx.user_id, ctx.counts)
+
+    async def _rule_callback_spam(self, ctx: CheckContext) -> tuple[bool, str]:
+        return await self._check_callback_spam(ctx.user_id, ctx.callback_data, ctx.is_callback)
+
+    async def _rule_survey(self, ctx: CheckContext) -> tuple[bool, str]:
+        state_resolved, current_state = await self._resolve_state(ctx.user_id, ctx.data)
+        if not state_resolved:
+            return True, ""
+        return self._check_survey_protection(ctx.user_id, current_state)
+
+    async def _run_rules(self, update_type: str, ctx: CheckContext) -> tuple[str, str] | None:
+        """
+        Run the rules configured for update_type in order.
+
+        Returns:
+            (rule name, reason) of the first failing rule, or None if all passed
+        """
+        for name in self.rules.get(update_type, ()):
+            started_at = time.perf_counter()
+            passed, reason = await self._rule_funcs[name](ctx)
+            elapsed = time.perf_counter() - started_at
+
+            stats = self.rule_stats[name]
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            if not passed:
+                stats.failures += 1
+                return name, reason
+        return None
+
+    @staticmethod
+    def _unwrap_event(event: TelegramObject) -> tuple[str | None, TelegramObject | None]:
+        """Get (update type, message or callback) from the event"""
+        if isinstance(event, Update):
+            # Registered on dp.update - the message/callback is inside the Update
+            if event.message is not None:
+                return "message", event.message
+            if event.callback_query is not None:
+                return "callback_query", event.callback_query
+            return None, None
+        if isinstance(event, Message):
+            return "message", event
+        if isinstance(event, CallbackQuery):
+            return "callback_query", event
+        return None, None
+
+    @staticmethod
+    async def _answer_rejected(inner_event: TelegramObject) -> None:
+        """Answer a rejected callback, so the button stops showing a loading spinner"""
+        if isinstance(inner_event, CallbackQuery):
+            await safe_callback_answer(inner_event, msg_request_rejected)
+
     async def __call__(self, handler, event: TelegramObject, data: dict[str, Any]) -> Any:
         """Main middleware handler"""
         self._cleanup_old_data()
 
-        user_id = None
-        message_text = None
-        callback_data = None
-        is_callback = False
-        is_command = False
-        state: FSMContext | None = None
+        update_type, inner_event = self._unwrap_event(event)
+        user = getattr(inner_event, "from_user", None)
+        user_id = user.id if user else None
 
-        if isinstance(event, Message):
-            user_id = event.from_user.id if event.from_user else None
-            message_text = event.text
-            state = data.get("state")
-            is_command = message_text and message_text.startswith("/") if message_text else False
-        elif isinstance(event, CallbackQuery):
-            user_id = event.from_user.id if event.from_user else None
-            is_callback = True
-            callback_data = event.data if hasattr(event, "data") else None
-            state = data.get("state")
-
-        if not user_id:
+        if not user_id or update_type not in self.rules:
             return await handler(event, data)
 
-        if self._is_whitelisted(user_id):
+        status = await self.backend.get_user_status(user_id)
+
+        if self._is_whitelisted(user_id) or status.whitelisted:
             return await handler(event, data)
 
-        if self._is_blacklisted(user_id):
+        if self._is_blacklisted(user_id) or status.blacklisted:
             log_warning(
                 logger,
                 action="blacklisted_user_blocked",
                 reason="User is in blacklist",
                 user_id=user_id,
             )
+            await self._answer_rejected(inner_event)
             return
 
-        if self._is_blocked(user_id):
+        if self._is_blocked(user_id, status.blocked_until):
             log_warning(
                 logger,
                 action="blocked_user_request",
                 reason="User is currently blocked",
                 user_id=user_id,
             )
+            await self._answer_rejected(inner_event)
             return
 
+        is_callback = update_type == "callback_query"
         self._update_activity(user_id, is_callback)
-
-        checks = [
-            ("rate_limit", self._check_rate_limit(user_id)),
-            ("burst", self._check_burst_protection(user_id)),
-            ("command_spam", self._check_command_spam(user_id, is_command)),
-        ]
-
-        # Callback spam check
+        ctx = CheckContext(
+            user_id=user_id,
+            data=data,
+            counts=await self.backend.record_request(user_id, time.time(), self.burst_window),
+            is_callback=is_callback,
+        )
         if is_callback:
-            checks.append(("callback_spam", self._check_callback_spam(user_id, callback_data, is_callback)))
+            ctx.callback_data = inner_event.data
+        else:
+            ctx.message_text = inner_event.text
+            ctx.is_command = bool(ctx.message_text and ctx.message_text.startswith("/"))
 
-        if message_text:
-            checks.append(("spam", self._check_spam_detection(user_id, message_text)))
+        failure = await self._run_rules(update_type, ctx)
+        if failure is not None:
+            check_name, reason = failure
+            activity = self.user_activities[user_id]
+            activity.suspicious_score += 5
 
-        if state:
-            checks.append(("survey", await self._check_survey_protection(user_id, state)))
+            log_warning(
+                logger,
+                action="security_check_failed",
+                reason=f"{check_name}: {reason}",
+                user_id=user_id,
+                check=check_name,
+                suspicious_score=activity.suspicious_score,
+            )
 
-        for check_name, (passed, reason) in checks:
-            if not passed:
-                activity = self.user_activities[user_id]
-                activity.suspicious_score += 5
+            if activity.suspicious_score >= self.block_score_threshold:
+                await self._block_user(user_id)
 
-                log_warning(
-                    logger,
-                    action="security_check_failed",
-                    reason=f"{check_name}: {reason}",
-                    user_id=user_id,
-                    check=check_name,
-                    suspicious_score=activity.suspicious_score,
-                )
+            await self._answer_rejected(inner_event)
+            return
 
-                if activity.suspicious_score >= 20:
-                    self._block_user(user_id)
+        return await handler(event, data)
 
-                return
+    def _update_shared_list(self, update: Coroutine[Any, Any, None]) -> None:
+        """Send a white/blacklist change to a shared backend in the background"""
+        if isinstance(self.backend, InMemorySecurityBackend):
+            # The in-memory backend works on self.whitelist/self.blacklist directly
+            update.close()
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(update)
+        except RuntimeError:
+            update.close()
+            log_warning(
+                logger,
+                action="security_list_not_shared",
+                reason="No running event loop, change is kept in this process only",
+            )
+            return
+        self._list_updates.add(task)
+        task.add_done_callback(self._list_update_done)
 
-        return await handler(event, data)
+    def _list_update_done(self, task: asyncio.Task) -> None:
+        self._list_updates.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log_error(logger, "security_list_update", str(task.exception()))
+
+    async def flush_list_updates(self) -> None:
+        """Wait until white/blacklist changes have reached the backend"""
+        if self._list_updates:
+            await asyncio.gather(*self._list_updates, return_exceptions=True)
 
     def add_to_whitelist(self, user_id: int) -> None:
         """Add user to whitelist"""
         self.whitelist.add(user_id)
+        self._update_shared_list(self.backend.add_to_list(WHITELIST, user_id))
         log_info(logger, action="user_whitelisted", user_id=user_id)
 
     def remove_from_whitelist(self, user_id: int) -> None:
         """Remove user from whitelist"""
         self.whitelist.discard(user_id)
+        self._update_shared_list(self.backend.remove_from_list(WHITELIST, user_id))
         log_info(logger, action="user_removed_from_whitelist", user_id=user_id)
 
     def add_to_blacklist(self, user_id: int) -> None:
         """Add user to blacklist"""
         self.blacklist.add(user_id)
+        self._update_shared_list(self.backend.add_to_list(BLACKLIST, user_id))
         log_warning(
             logger, action="user_blacklisted", reason="User added to blacklist", user_id=user_id
         )
@@ -465,6 +878,7 @@ class SecurityMiddleware(BaseMiddleware):
     def remove_from_blacklist(self, user_id: int) -> None:
         """Remove user from blacklist"""
         self.blacklist.discard(user_id)
+        self._update_shared_list(self.backend.remove_from_list(BLACKLIST, user_id))
         log_info(logger, action="user_removed_from_blacklist", user_id=user_id)
 
     def get_user_stats(self, user_id: int) -> dict[str, Any]:
@@ -484,11 +898,69 @@ class SecurityMiddleware(BaseMiddleware):
             "is_whitelisted": self._is_whitelisted(user_id),
             "is_blacklisted": self._is_blacklisted(user_id),
             "last_activity": activity.last_activity,
+            "requests_last_minute": round(activity.minute_requests.estimate(current_time)),
+            "requests_last_hour": round(activity.hour_requests.estimate(current_time)),
+            "requests_last_day": round(activity.day_requests.estimate(current_time)),
             "survey_active": activity.survey_start_time is not None,
-            "state_changes_last_minute": len(
-                [t for t in activity.state_changes if current_time - t < 60]
-            ),
-            "callbacks_per_second": len(
-                [t for t in activity.callback_times if current_time - t < 1.0]
-            ),
+            "state_changes_last_minute": activity.state_changes.count_since(current_time - 60),
+            "callbacks_per_second": activity.callback_times.count_since(current_time - 1.0),
+        }
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get middleware-wide tracking statistics"""
+        return {
+            "tracked_users": len(self.user_activities),
+            "max_tracked_users": self.max_tracked_users,
+            "expired_users": self.expired_users,
+            "evicted_users": self.evicted_users,
+        }
+
+    def get_rule_stats(self) -> dict[str, dict[str, Any]]:
+        """Get per-rule call counts, failures and timings (seconds)"""
+        return {
+            name: {
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "avg_time": stats.total_time / stats.calls if stats.calls else 0.0,
+                "max_time": stats.max_time,
+            }
+            for name, stats in self.rule_stats.items()
         }
+
+
+def create_security_middleware(backend: SecurityBackend | None = None) -> SecurityMiddleware:
+    """
+    Create the middleware with the bot's thresholds.
+
+    Multi-select survey steps are answered by tapping toggles, a few taps per second
+    for several seconds. The burst and callback limits leave room for that, and one
+    rejected tap doesn't get the user blocked - it takes several failed checks.
+
+    The backend defaults to the one selected by SECURITY_BACKEND.
+    """
+    return SecurityMiddleware(
+        # Rate limiting - allow normal survey completion, including toggle steps
+        max_requests_per_minute=60,
+        max_requests_per_hour=300,
+        max_requests_per_day=1000,
+        # Spam detection
+        max_identical_messages=5,
+        identical_message_window=60,
+        min_message_interval=0.5,  # 500ms between messages
+        # DDoS protection
+        burst_threshold=20,  # 20 requests in 2 seconds = suspicious
+        burst_window=2.0,
+        # Survey protection - allow up to 1 hour for completion
+        max_survey_duration=3600,
+        max_state_changes_per_minute=20,  # Allow rapid navigation
+        # Callback protection - fast toggling in multi-select steps is normal
+        max_callbacks_per_second=8.0,
+        max_identical_callbacks=10,
+        identical_callback_window=3.0,
+        # Blocking
+        initial_block_duration=300,  # 5 minutes
+        max_block_duration=86400,  # 24 hours
+        block_score_threshold=40,
+        # Shared state (SECURITY_BACKEND=redis) keeps limits and blocks across replicas/restarts
+        backend=backend or create_security_backend(),
+    )
@@ -0,0 +1,129 @@
+"""
+Per-user update serialization.
+
+Toggle handlers read FSM data, change it and write it back. When a user taps fast,
+aiogram runs these updates concurrently and the writes overwrite each other.
+UserLockMiddleware runs the updates of one user in a chat one at a time, while
+different users still run in parallel.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from constants import msg_please_wait
+from functions import safe_callback_answer
+from logging_config import log_warning
+
+logger = logging.getLogger(__name__)
+
+
+class _UserSlot:
+    __slots__ = ("lock", "pending", "notified")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0  # Update holding the lock plus updates waiting for it
+        self.notified = False  # The user was asked to wait since the queue filled up
+
+
+class UserLockMiddleware(BaseMiddleware):
+    """
+    Outer update middleware serializing updates per (chat, user).
+
+    Register it with dp.update.outer_middleware after creating the Dispatcher, so it
+    runs after FSMContextMiddleware. A slot exists only while its user has updates in
+    flight, and at most max_waiters updates queue behind the running one - further
+    updates are dropped - so memory stays bounded. Dropped callbacks are answered,
+    and for dropped messages the user gets one "please wait" reply per full queue.
+    """
+
+    def __init__(self, max_waiters: int = 10):
+        self.max_waiters = max(0, max_waiters)
+        self._slots: dict[tuple[int, int], _UserSlot] = {}
+
+        self.acquired = 0
+        self.contended = 0
+        self.dropped = 0
+        self.dropped_messages = 0
+        self.wait_replies = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def __call__(self, handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        chat = data.get("event_chat")
+        key = (chat.id if chat else user.id, user.id)
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _UserSlot()
+        elif slot.pending > self.max_waiters:
+            # pending - 1 updates are already waiting
+            self.dropped += 1
+            log_warning(
+                logger,
+                action="user_update_dropped",
+                reason="Too many queued updates",
+                user_id=user.id,
+                pending=slot.pending,
+            )
+            inner_event = event.event if isinstance(event, Update) else event
+            if isinstance(inner_event, CallbackQuery):
+                await safe_callback_answer(inner_event, msg_please_wait)
+            elif isinstance(inner_event, Message):
+                self.dropped_messages += 1
+                await self._reply_wait(slot, inner_event)
+            return
+
+        slot.pending += 1
+        contended = slot.lock.locked()
+        start = time.monotonic()
+        try:
+            async with slot.lock:
+                waited = time.monotonic() - start
+                self.acquired += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                if contended:
+                    self.contended += 1
+                    # raw_state was read before waiting; the previous update may have changed it
+                    state: FSMContext | None = data.get("state")
+                    if state is not None:
+                        data["raw_state"] = await state.get_state()
+                return await handler(event, data)
+        finally:
+            slot.pending -= 1
+            if not slot.pending:
+                del self._slots[key]
+
+    async def _reply_wait(self, slot: _UserSlot, message: Message) -> None:
+        """Ask the user to wait, once until their queue is drained"""
+        if slot.notified:
+            return
+        slot.notified = True
+        self.wait_replies += 1
+        try:
+            await message.answer(msg_please_wait)
+        except TelegramAPIError as e:
+            logger.debug("Please-wait reply failed: %s", str(e))
+
+    def stats(self) -> dict[str, Any]:
+        """Get lock usage and queue wait metrics (seconds)."""
+        return {
+            "active_users": len(self._slots),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "dropped": self.dropped,
+            "dropped_messages": self.dropped_messages,
+            "wait_replies": self.wait_replies,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait,
+        }
@@ -0,0 +1,108 @@
+"""
+Webhook mode: receive updates from Telegram on an aiohttp server instead of long polling.
+
+Configured from the environment:
+- WEBHOOK_URL: public HTTPS base URL Telegram sends updates to (required)
+- WEBHOOK_PATH: request path of the webhook endpoint
+- WEBAPP_HOST / WEBAPP_PORT: address the aiohttp server listens on
+- WEBHOOK_SECRET: secret token checked on every request (X-Telegram-Bot-Api-Secret-Token)
+- WEBHOOK_MAX_IN_FLIGHT: updates processed concurrently
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from logging_config import log_info, log_warning
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler with a bound on concurrently processed updates.
+
+    Updates are handled inside the request, so a handler's API call can be returned
+    as the webhook response. Requests over the limit wait for a free slot, which
+    pushes back on Telegram (it also caps open connections with max_connections).
+    """
+
+    def __init__(
+        self, dispatcher: Dispatcher, bot: Bot, max_in_flight: int = 40, **kwargs: Any
+    ):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=False, **kwargs)
+        self.max_in_flight = max(1, max_in_flight)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+        self.handled = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        async with self._semaphore:
+            self.in_flight += 1
+            self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+            try:
+                return await super().handle(request)
+            finally:
+                self.in_flight -= 1
+                self.handled += 1
+
+    def stats(self) -> dict[str, int]:
+        """Get webhook concurrency metrics."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_in_flight_seen": self.max_in_flight_seen,
+            "handled": self.handled,
+        }
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Register the webhook with Telegram and serve updates until cancelled.
+    """
+    base_url = os.getenv("WEBHOOK_URL", "").rstrip("/")
+    if not base_url:
+        raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    host = os.getenv("WEBAPP_HOST", "0.0.0.0")
+    port = int(os.getenv("WEBAPP_PORT", "8080"))
+    max_in_flight = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "40"))
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        # Every start re-registers the webhook, so a random secret works for a single process
+        secret = secrets.token_urlsafe(32)
+        log_warning(logger, action="webhook_secret_generated", reason="WEBHOOK_SECRET not set")
+
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dispatcher=dp, bot=bot, max_in_flight=max_in_flight, secret_token=secret
+    )
+    handler.register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host=host, port=port).start()
+        await bot.set_webhook(
+            url=f"{base_url}{path}",
+            secret_token=secret,
+            max_connections=min(max_in_flight, 100),
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        log_info(
+            logger,
+            action="webhook_started",
+            data={"host": host, "port": port, "path": path, "max_in_flight": max_in_flight},
+        )
+        await asyncio.Event().wait()
+    finally:
+        log_info(logger, action="webhook_stopped", data=handler.stats())
+        # Runs the shutdown hooks; the request handler's hook closes the bot session
+        await runner.cleanup()
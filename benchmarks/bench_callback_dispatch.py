@@ -0,0 +1,99 @@
+"""
+Callback dispatch cost vs number of callback handlers.
+
+Registers HANDLERS callback handlers on a Dispatcher, half routed by exact
+callback_data and half by prefix, either
+- as one handler per route with a lambda filter (c.data == ... / c.data.startswith(...)),
+  the way bot.py registered them before, or
+- through CallbackRouter, a single handler with a dict lookup,
+
+and times dp.feed_update for callbacks spread evenly over all routes.
+
+Usage:
+    python benchmarks/bench_callback_dispatch.py [callbacks]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.types import CallbackQuery, Update, User  # noqa: E402
+from callback_router import CallbackRouter  # noqa: E402
+
+HANDLER_COUNTS = (10, 30, 100, 300)  # bot.py routes about 30
+USER = User(id=42, is_bot=False, first_name="Bench")
+
+
+def routes(count: int) -> list[tuple[str, str, str]]:
+    """(kind, route, callback_data hitting it)"""
+    result = []
+    for i in range(count):
+        if i % 2:
+            result.append(("prefix", f"step{i}_", f"step{i}_3"))
+        else:
+            result.append(("exact", f"action{i}", f"action{i}"))
+    return result
+
+
+async def handle(callback: CallbackQuery, state) -> None:
+    pass
+
+
+def linear_dispatcher(route_list) -> Dispatcher:
+    dp = Dispatcher()
+    for kind, route, _ in route_list:
+        if kind == "exact":
+            dp.callback_query.register(handle, lambda c, route=route: c.data == route)
+        else:
+            dp.callback_query.register(handle, lambda c, route=route: c.data.startswith(route))
+    return dp
+
+
+def router_dispatcher(route_list) -> Dispatcher:
+    dp = Dispatcher()
+    callback_router = CallbackRouter()
+    for kind, route, _ in route_list:
+        getattr(callback_router, kind)(route, handle)
+    callback_router.register(dp)
+    return dp
+
+
+async def bench(dp: Dispatcher, bot: Bot, route_list, callbacks: int) -> float:
+    updates = [
+        Update(
+            update_id=i,
+            callback_query=CallbackQuery(
+                id=str(i),
+                from_user=USER,
+                chat_instance="bench",
+                data=route_list[i % len(route_list)][2],
+            ),
+        )
+        for i in range(callbacks)
+    ]
+    start = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - start) / callbacks * 1e6
+
+
+async def main(callbacks: int) -> None:
+    bot = Bot("42:BENCHMARK")
+    print(f"{callbacks} callbacks, spread evenly over the routes")
+    print(f"{'handlers':>8} {'lambda filters':>17} {'CallbackRouter':>17}")
+    for count in HANDLER_COUNTS:
+        route_list = routes(count)
+        linear = await bench(linear_dispatcher(route_list), bot, route_list, callbacks)
+        routed = await bench(router_dispatcher(route_list), bot, route_list, callbacks)
+        print(f"{count:>8} {linear:>14.1f} us {routed:>14.1f} us")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,110 @@
+"""
+Resume CRUD latency and throughput: executor path vs native AsyncClient.
+
+Runs firebase_db.crud against a local in-memory Firestore stand-in (see
+fake_firestore.py) with a fixed round-trip latency, once with
+FIRESTORE_CLIENT_MODE=executor (sync client in the Firestore thread pool) and once
+with async (AsyncClient). The resume cache is disabled so every call reaches the client.
+
+Usage:
+    python benchmarks/bench_firestore_client.py [operations] [latency_ms]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+os.environ["RESUME_CACHE_TTL"] = "0"
+
+from fake_firestore import FakeAsyncFirestore, FakeFirestore, FakeStore  # noqa: E402
+from firebase_db import crud, crud_async  # noqa: E402
+from firebase_db.executor import shutdown_firestore_executor  # noqa: E402
+
+CONCURRENCY = 100
+
+
+def resume(user_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "username": f"driver{user_id}",
+        "name": "Іван Петренко",
+        "phone": "+380501234567",
+        "age": 35,
+        "driving_categories": ["C", "CE"],
+        "desired_salary": 45000,
+    }
+
+
+async def sequential(operation, count: int) -> list[float]:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        await operation(i + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def concurrent(operation, count: int) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def run(user_id: int) -> None:
+        async with semaphore:
+            await operation(user_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i + 1) for i in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+async def bench_mode(mode: str, count: int, latency: float) -> None:
+    store = FakeStore(latency)
+    crud.FIRESTORE_CLIENT_MODE = mode
+    crud.get_firestore_client = lambda: FakeFirestore(store)
+    crud_async.get_async_firestore_client = lambda: FakeAsyncFirestore(store)
+
+    async def add(user_id):
+        await crud.add_resume(resume(user_id))
+
+    async def get(user_id):
+        await crud.get_resume(user_id)
+
+    async def update(user_id):
+        await crud.update_resume(user_id, {"age": 36})
+
+    async def delete(user_id):
+        await crud.delete_resume(user_id)
+
+    for name, operation in (("add", add), ("get", get), ("update", update), ("delete", delete)):
+        latencies = await sequential(operation, count)
+        if name == "delete":
+            await concurrent(add, count)
+        throughput = await concurrent(operation, count)
+        print(
+            f"{mode:<10} {name:<8} {statistics.mean(latencies):>9.2f} ms"
+            f" {statistics.quantiles(latencies, n=20)[-1]:>9.2f} ms {throughput:>10.0f}/s"
+        )
+    await shutdown_firestore_executor()
+
+
+async def main(count: int, latency: float) -> None:
+    print(
+        f"{count} operations per run, round trip {latency * 1000:.0f} ms, "
+        f"{CONCURRENCY} concurrent for throughput"
+    )
+    print(f"{'mode':<10} {'op':<8} {'mean':>12} {'p95':>12} {'throughput':>12}")
+    for mode in ("executor", "async"):
+        await bench_mode(mode, count, latency)
+
+
+if __name__ == "__main__":
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(operations, latency_ms / 1000))
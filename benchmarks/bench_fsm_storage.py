@@ -0,0 +1,112 @@
+"""
+Per-update FSM storage latency: get_data/update_data for each backend.
+
+Runs the memory, SQLite and Redis backends (Redis against fakeredis, a local stand-in,
+unless REDIS_URL is set) with the FSM data of a survey in progress, and compares a
+toggle update done with plain FSMContext calls against the same update through
+BufferedFSMContext.
+
+Usage:
+    python benchmarks/bench_fsm_storage.py [iterations]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from fsm_storage import BufferedFSMContext, SQLiteStorage, create_redis_storage  # noqa: E402
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+SURVEY_DATA = {
+    "name": "Іван Петренко",
+    "phone": "+380501234567",
+    "age": 35,
+    "place_of_living_region": "Ky",
+    "place_of_living_city": "Бровари",
+    "selected_driver_categories": 0b10110,
+    "driving_experience": {"C": 5, "CE": 3},
+    "all_selected_categories": ["C", "CE"],
+    "semi_trailer_types": 0b00011,
+    "types_of_work": 0b010,
+}
+
+
+def _redis_storage():
+    url = os.getenv("REDIS_URL")
+    if url:
+        return create_redis_storage(url), "redis"
+    import fakeredis
+
+    storage = create_redis_storage("redis://localhost:6379/0")
+    storage.redis = fakeredis.FakeAsyncRedis()
+    return storage, "redis (fakeredis)"
+
+
+async def _timed(iterations: int, operation) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        await operation(i)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def bench_backend(name: str, storage, iterations: int) -> None:
+    await storage.set_data(KEY, SURVEY_DATA)
+
+    async def get_data(i):
+        await storage.get_data(KEY)
+
+    async def update_data(i):
+        await storage.update_data(KEY, {"types_of_work": i & 0b111})
+
+    async def toggle_plain(i):
+        # What a toggle handler did per update without buffering
+        context = FSMContext(storage, KEY)
+        await context.get_state()
+        data = await context.get_data()
+        await context.update_data(types_of_work=data["types_of_work"] ^ 0b001)
+        await context.get_data()
+
+    async def toggle_buffered(i):
+        context = BufferedFSMContext(storage, KEY, raw_state="ResumeForm:types_of_work")
+        data = await context.get_data()
+        await context.update_data(types_of_work=data["types_of_work"] ^ 0b001)
+        await context.get_data()
+        await context.flush()
+
+    results = [
+        ("get_data", await _timed(iterations, get_data)),
+        ("update_data", await _timed(iterations, update_data)),
+        ("toggle update, plain", await _timed(iterations, toggle_plain)),
+        ("toggle update, buffered", await _timed(iterations, toggle_buffered)),
+    ]
+    await storage.close()
+    for operation, micros in results:
+        print(f"{name:<20} {operation:<26} {micros:>10.1f} us")
+
+
+async def main(iterations: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", MemoryStorage()),
+            ("sqlite", SQLiteStorage(Path(tmp) / "fsm.sqlite3")),
+        ]
+        redis_storage, redis_name = _redis_storage()
+        backends.append((redis_name, redis_storage))
+        print(f"{'backend':<20} {'operation':<26} {'per call':>13}")
+        for name, storage in backends:
+            await bench_backend(name, storage, iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
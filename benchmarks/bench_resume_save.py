@@ -0,0 +1,76 @@
+"""
+Per-resume save latency with and without the verification read-back.
+
+finalize_resume saves a resume with add_resume. It used to read every saved
+document back (now only with FIRESTORE_VERIFY_WRITES). This runs add_resume against
+the local Firestore stand-in (see fake_firestore.py) with both settings, in both
+client modes, and reports latency plus Firestore round trips and reads per save.
+
+Usage:
+    python benchmarks/bench_resume_save.py [saves] [latency_ms]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+from fake_firestore import FakeAsyncFirestore, FakeFirestore, FakeStore  # noqa: E402
+from firebase_db import crud, crud_async  # noqa: E402
+from firebase_db.executor import shutdown_firestore_executor  # noqa: E402
+
+RESUME = {
+    "username": "driver42",
+    "name": "Іван Петренко",
+    "phone": "+380501234567",
+    "age": 35,
+    "place_of_living": {"region_key": "Ky", "region_name": "Київська", "city": "Бровари"},
+    "driving_categories": ["B", "C", "CE"],
+    "driving_experience": {"C": 5, "CE": 3},
+    "types_of_work": ["Міжнародні"],
+    "desired_salary": 45000,
+    "description": "Досвід міжнародних перевезень",
+}
+
+
+async def bench(mode: str, verify: bool, saves: int, latency: float) -> None:
+    store = FakeStore(latency)
+    crud.FIRESTORE_CLIENT_MODE = mode
+    crud.FIRESTORE_VERIFY_WRITES = verify
+    crud_async.FIRESTORE_VERIFY_WRITES = verify
+    crud.get_firestore_client = lambda: FakeFirestore(store)
+    crud_async.get_async_firestore_client = lambda: FakeAsyncFirestore(store)
+
+    latencies = []
+    for user_id in range(1, saves + 1):
+        start = time.perf_counter()
+        await crud.add_resume({**RESUME, "user_id": user_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+    await shutdown_firestore_executor()
+
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(
+        f"{mode:<10} {'read-back' if verify else 'write only':<11}"
+        f" {statistics.mean(latencies):>9.2f} ms {p95:>9.2f} ms"
+        f" {store.round_trips / saves:>12.1f} {store.reads / saves:>7.1f}"
+    )
+
+
+async def main(saves: int, latency: float) -> None:
+    print(f"{saves} saves, round trip {latency * 1000:.0f} ms")
+    print(f"{'mode':<10} {'save':<11} {'mean':>12} {'p95':>12} {'round trips':>12} {'reads':>7}")
+    for mode in ("executor", "async"):
+        for verify in (True, False):
+            await bench(mode, verify, saves, latency)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(count, latency_ms / 1000))
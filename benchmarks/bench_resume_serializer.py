@@ -0,0 +1,147 @@
+"""
+Resume document preparation: schema serializer vs the previous multi-pass pipeline.
+
+Before, a finished resume went through three passes: field validation in
+prepare_resume_data_for_firebase (age, desired_salary, driving_experience),
+clean_data_for_firebase (remove_emojis on every string, compiling its pattern on
+each call) and validate_and_normalize_numbers in crud. Now serialize_resume does it
+in one pass over a compiled schema.
+
+Both are run on the same resume, with a short and with a long description, and the
+outputs are compared first.
+
+Usage:
+    python benchmarks/bench_resume_serializer.py [iterations]
+"""
+
+import logging
+import re
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from firebase_db.resume_schema import (  # noqa: E402
+    serialize_resume,
+    validate_and_normalize_numbers,
+)
+
+RESUME = {
+    "name": "Іван 🚚 Петренко",
+    "phone": "+380501234567",
+    "age": "35",
+    "place_of_living": {"region_key": "Ky", "region_name": "Київська", "city": "Бровари 🏠"},
+    "driving_categories": ["B", "C", "CE"],
+    "driving_experience": {"C": 5, "CE": 3.0},
+    "semi_trailer_types": ["Тентований", "Рефрижератор"],
+    "types_of_work": ["Міжнародні"],
+    "types_of_cars": ["DAF", "MAN 👍", "Volvo"],
+    "race_duration_preference": ["Рейси до 7 днів"],
+    "is_adr_license": True,
+    "docs_for_driving_abroad": ["Код 95 (дозвіл на перевезення в ЄС)"],
+    "military_booking": False,
+    "desired_salary": "45 000",
+    "description": "Досвід 10 років 💪  на міжнародних рейсах",
+}
+LONG_DESCRIPTION = "Досвід міжнародних перевезень по ЄС 🚛, без ДТП. " * 40
+
+
+def remove_emojis_before(text: str) -> str:
+    if not text:
+        return text
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002600-\U000026FF"
+        "\U00002700-\U000027BF"
+        "]+",
+        flags=re.UNICODE,
+    )
+    cleaned = emoji_pattern.sub("", text)
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    return cleaned.strip()
+
+
+def clean_data_before(value):
+    if isinstance(value, str):
+        return remove_emojis_before(value)
+    if isinstance(value, list):
+        return [clean_data_before(item) for item in value]
+    if isinstance(value, dict):
+        return {key: clean_data_before(val) for key, val in value.items()}
+    return value
+
+
+def validate_fields_before(resume: dict) -> dict:
+    """The numeric field checks prepare_resume_data_for_firebase did"""
+    resume = dict(resume)
+    age = resume.get("age")
+    if age is not None:
+        try:
+            age = int(age) if isinstance(age, (int, float, str)) else None
+            if age is not None and (age < 0 or age > 150):
+                age = None
+        except (ValueError, TypeError):
+            age = None
+    resume["age"] = age
+
+    desired_salary = resume.get("desired_salary")
+    if desired_salary is not None:
+        try:
+            if isinstance(desired_salary, str):
+                salary_clean = desired_salary.replace(" ", "").replace(",", "").replace(".", "")
+                desired_salary = int(salary_clean) if salary_clean else None
+            elif isinstance(desired_salary, float):
+                desired_salary = int(desired_salary)
+            elif not isinstance(desired_salary, int):
+                desired_salary = None
+        except (ValueError, TypeError):
+            desired_salary = None
+    resume["desired_salary"] = desired_salary
+
+    validated_experience = {}
+    for category, years in resume.get("driving_experience", {}).items():
+        if isinstance(years, (int, float)):
+            if isinstance(years, float) and years.is_integer():
+                years = int(years)
+            if 0 <= years <= 100:
+                validated_experience[category] = years
+    resume["driving_experience"] = validated_experience
+    return resume
+
+
+def pipeline_before(resume: dict) -> dict:
+    return validate_and_normalize_numbers(clean_data_before(validate_fields_before(resume)))
+
+
+def main(iterations: int) -> None:
+    logging.disable(logging.WARNING)
+    print(f"{iterations} resumes per run")
+    print(f"{'description':<12} {'pipeline (before)':>18} {'serialize_resume':>18} {'speedup':>8}")
+    for label, resume in (
+        ("short", RESUME),
+        ("long", {**RESUME, "description": LONG_DESCRIPTION}),
+    ):
+        assert pipeline_before(resume) == serialize_resume(resume), "outputs differ"
+        before, after = (
+            min(timeit.repeat(lambda: convert(resume), number=iterations, repeat=3))
+            / iterations
+            * 1e6
+            for convert in (pipeline_before, serialize_resume)
+        )
+        print(f"{label:<12} {before:>15.1f} us {after:>15.1f} us {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
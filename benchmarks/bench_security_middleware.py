@@ -0,0 +1,129 @@
+"""
+SecurityMiddleware overhead per update with many active users.
+
+Feeds message and callback updates from USERS users round robin through the
+middleware (a no-op handler behind it) on a simulated clock, so every user sends an
+update every few seconds and no check trips. Reports the time spent in the
+middleware per update and the users it tracks.
+
+A second table compares the rate limit bookkeeping per request: three scans over the
+last 100 request times (what _check_rate_limit did before) vs the minute/hour/day
+SlidingWindowCounter-s.
+
+Usage:
+    python benchmarks/bench_security_middleware.py [users] [updates]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import timeit
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+import security_middleware  # noqa: E402
+from aiogram.types import CallbackQuery, Chat, Message, User  # noqa: E402
+from security_middleware import SecurityMiddleware, SlidingWindowCounter  # noqa: E402
+
+# Seconds of simulated time between two updates of the whole bot
+UPDATE_INTERVAL = 0.0005
+CALLBACK_SHARE = 3  # every third update is a callback
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+
+def make_events(users: int) -> list:
+    events = []
+    for user_id in range(1, users + 1):
+        user = User(id=user_id, is_bot=False, first_name="Bench")
+        chat = Chat(id=user_id, type="private")
+        events.append(
+            (
+                Message(message_id=1, date=datetime.now(), chat=chat, from_user=user, text=""),
+                CallbackQuery(id=str(user_id), from_user=user, chat_instance="bench", data="cat_1"),
+            )
+        )
+    return events
+
+
+async def run(users: int, updates: int) -> None:
+    clock = SimulatedClock()
+    security_middleware.time = clock
+    middleware = SecurityMiddleware()
+    events = make_events(users)
+    handled = 0
+
+    async def handler(event, data):
+        nonlocal handled
+        handled += 1
+
+    timings = []
+    for i in range(updates):
+        clock.now += UPDATE_INTERVAL
+        message, callback = events[i % users]
+        # Change text per round, identical messages would trip spam detection
+        if (i // users) % CALLBACK_SHARE == CALLBACK_SHARE - 1:
+            event = callback
+        else:
+            event = message.model_copy(update={"text": f"Відповідь {i}"})
+        start = time.perf_counter()
+        await middleware(handler, event, {})
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    timings.sort()
+    print(
+        f"{users:>7} {updates:>9} {statistics.mean(timings):>9.1f} us"
+        f" {timings[len(timings) // 2]:>9.1f} us {timings[int(len(timings) * 0.99)]:>9.1f} us"
+        f" {len(middleware.user_activities):>9} {handled:>9}"
+    )
+
+
+def bench_rate_limit_check(history: int, repeat: int = 20_000) -> None:
+    now = 1_700_000_000.0
+    request_times = deque((now - i for i in range(history)), maxlen=100)
+    counters = [SlidingWindowCounter(window) for window in (60, 3600, 86400)]
+
+    def scan():
+        for window in (60, 3600, 86400):
+            sum(1 for t in request_times if now - t < window)
+
+    def sliding_windows():
+        for counter in counters:
+            counter.hit(now)
+            counter.estimate(now)
+
+    scanned = min(timeit.repeat(scan, number=repeat, repeat=3)) / repeat * 1e6
+    counted = min(timeit.repeat(sliding_windows, number=repeat, repeat=3)) / repeat * 1e6
+    print(f"{history:>8} {scanned:>12.2f} us {counted:>12.2f} us")
+
+
+if __name__ == "__main__":
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    update_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    print(
+        f"{'users':>7} {'updates':>9} {'mean':>12} {'p50':>12} {'p99':>12}"
+        f" {'tracked':>9} {'handled':>9}"
+    )
+    asyncio.run(run(user_count, update_count))
+    print()
+    print(f"{'history':>8} {'deque scans':>15} {'counters':>15}")
+    for history_size in (10, 50, 100):
+        bench_rate_limit_check(history_size)
@@ -0,0 +1,149 @@
+"""
+Identical-message spam check: stored texts vs message digests.
+
+Per message length, a user's last WINDOW messages are kept, and each new (distinct,
+equal-length) message is checked against them:
+
+- plaintext deque (before): deque of (time, text) tuples, each check expires old
+  entries and compares the new text with every stored one
+- digest ring: SecurityMiddleware._check_spam_detection, a blake2b-64 digest looked
+  up in the TimestampRing key counts
+- digest ring + simhash: the same with near-duplicate detection enabled
+
+Reports the time per check and the memory the spam history of USERS users takes
+(tracemalloc).
+
+Usage:
+    python benchmarks/bench_spam_detection.py [users]
+"""
+
+import gc
+import sys
+import timeit
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+import security_middleware  # noqa: E402
+from security_middleware import SecurityMiddleware  # noqa: E402
+
+WINDOW = 10
+LENGTHS = (50, 1000, 4096)  # 4096 is Telegram's message length limit
+IDENTICAL_MESSAGE_WINDOW = 60
+MAX_IDENTICAL_MESSAGES = 5
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        self.now += 1.0
+        return self.now
+
+
+def messages(length: int, count: int, seed: int = 0) -> list[str]:
+    # Distinct texts with a long common prefix, the worst case for string compares
+    base = ("Шукаю роботу водієм категорії CE, досвід міжнародних рейсів. " * 70)[: length - 8]
+    return [f"{base}{seed + i:08d}" for i in range(count)]
+
+
+def check_plaintext(identical_messages: deque, message_text: str, current_time: float) -> bool:
+    """The identical-message part of _check_spam_detection before digests"""
+    while (
+        identical_messages
+        and current_time - identical_messages[0][0] > IDENTICAL_MESSAGE_WINDOW
+    ):
+        identical_messages.popleft()
+    identical_count = sum(1 for _, text in identical_messages if text == message_text)
+    if identical_count >= MAX_IDENTICAL_MESSAGES:
+        return False
+    identical_messages.append((current_time, message_text))
+    return True
+
+
+def bench_cpu(length: int, repeat: int = 2000) -> tuple[float, float, float]:
+    clock = SimulatedClock()
+    security_middleware.time = clock
+    texts = messages(length, repeat)
+
+    history: deque = deque(maxlen=WINDOW)
+    plain_iter = iter(texts * 4)
+
+    def plaintext():
+        check_plaintext(history, next(plain_iter), clock.time())
+
+    def middleware_check(middleware: SecurityMiddleware):
+        middleware._activity(42)
+        text_iter = iter(texts * 4)
+        return lambda: middleware._check_spam_detection(42, next(text_iter))
+
+    digest = middleware_check(SecurityMiddleware(max_identical_messages=WINDOW))
+    simhash = middleware_check(
+        SecurityMiddleware(max_identical_messages=WINDOW, near_duplicate_distance=3)
+    )
+    return tuple(
+        min(timeit.repeat(check, number=repeat // 2, repeat=3)) / (repeat // 2) * 1e6
+        for check in (plaintext, digest, simhash)
+    )
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return after - before
+
+
+def bench_memory(length: int, users: int) -> tuple[int, int]:
+    clock = SimulatedClock()
+    security_middleware.time = clock
+
+    def build_plaintext():
+        histories = []
+        for user_id in range(users):
+            history: deque = deque(maxlen=WINDOW)
+            for text in messages(length, WINDOW, seed=user_id * WINDOW):
+                check_plaintext(history, text, clock.time())
+            histories.append(history)
+        return histories
+
+    def build_digest():
+        middleware = SecurityMiddleware(max_identical_messages=WINDOW, max_tracked_users=users)
+        for user_id in range(users):
+            activity = middleware._activity(user_id)
+            for text in messages(length, WINDOW, seed=user_id * WINDOW):
+                middleware._check_spam_detection(user_id, text)
+            activity.request_times.append(clock.now)  # as the middleware would
+        return middleware
+
+    # The digest side also counts the rest of each user's UserActivity
+    return measure(build_plaintext), measure(build_digest)
+
+
+def main(users: int) -> None:
+    print(f"{WINDOW} messages kept per user; memory for {users} users")
+    print(
+        f"{'length':>7} {'plaintext':>12} {'digest':>12} {'+simhash':>12}"
+        f" {'plaintext mem':>14} {'digest mem':>14}"
+    )
+    for length in LENGTHS:
+        plaintext, digest, simhash = bench_cpu(length)
+        plaintext_memory, digest_memory = bench_memory(length, users)
+        print(
+            f"{length:>7} {plaintext:>9.2f} us {digest:>9.2f} us {simhash:>9.2f} us"
+            f" {plaintext_memory / 2**20:>11.1f} MB {digest_memory / 2**20:>11.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
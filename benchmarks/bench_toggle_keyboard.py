@@ -0,0 +1,108 @@
+"""
+CPU per multi-select toggle: rebuilt keyboards vs selection masks.
+
+Replays random taps on each survey multi-select step and times the work a toggle
+does between reading and writing FSM data (storage and API calls excluded):
+
+- rebuild (before): the selection as a list of strings, toggled through a set, and a
+  new keyboard with every button and callback_data built and checked again
+- mask: selection_mask, one XOR and build_selection_keyboard (cached per mask)
+- mask, cold cache: the same with the keyboard cache cleared before each toggle
+
+Usage:
+    python benchmarks/bench_toggle_keyboard.py [toggles]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+from constants import (  # noqa: E402
+    DOCS_FOR_DRIVING_ABROAD,
+    DRIVING_CATEGORIES,
+    RACE_DURATION_OPTIONS,
+    SEMI_TRAILERS_TYPES,
+    TYPES_OF_WORK,
+    button_confirm,
+)
+from functions import build_selection_keyboard, selection_mask  # noqa: E402
+
+STEPS = {
+    "driving_categories": ("cat_", DRIVING_CATEGORIES),
+    "semi_trailer_types": ("trailer_", SEMI_TRAILERS_TYPES),
+    "types_of_work": ("work_", TYPES_OF_WORK),
+    "race_duration_preference": ("race_", RACE_DURATION_OPTIONS),
+    "docs_for_driving_abroad": ("docs_", DOCS_FOR_DRIVING_ABROAD),
+}
+
+
+def rebuild_keyboard(
+    selected: set[str], categories: list[str], prefix: str
+) -> InlineKeyboardMarkup:
+    """get_updated_keyboard before masks and caching"""
+    keyboard = []
+    for idx, cat in enumerate(categories):
+        text = f"{cat}{' ✔' if cat in selected else ''}"
+        callback_data = f"{prefix}{idx}"
+        if len(callback_data.encode("utf-8")) > 64:
+            callback_data = f"{prefix}{cat[:20]}"
+            if len(callback_data.encode("utf-8")) > 64:
+                callback_data = callback_data[:60]
+        keyboard.append([InlineKeyboardButton(text=text, callback_data=callback_data)])
+    keyboard.append([InlineKeyboardButton(text=button_confirm, callback_data=f"{prefix}submit")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def toggle_rebuild(data: dict, field: str, prefix: str, options: list[str], idx: int):
+    selected = set(data.get(field, []))
+    item = options[idx]
+    if item in selected:
+        selected.remove(item)
+    else:
+        selected.add(item)
+    data[field] = list(selected)
+    return rebuild_keyboard(selected, options, prefix)
+
+
+def toggle_mask(data: dict, field: str, prefix: str, options: list[str], idx: int):
+    selected_mask = selection_mask(data.get(field), options) ^ 1 << idx
+    data[field] = selected_mask
+    return build_selection_keyboard(tuple(options), prefix, selected_mask)
+
+
+def toggle_mask_cold(data: dict, field: str, prefix: str, options: list[str], idx: int):
+    build_selection_keyboard.cache_clear()
+    return toggle_mask(data, field, prefix, options, idx)
+
+
+def bench(toggle, taps: list[tuple[str, int]]) -> float:
+    data: dict = {}
+    start = time.perf_counter()
+    for field, idx in taps:
+        prefix, options = STEPS[field]
+        toggle(data, field, prefix, options, idx)
+    return (time.perf_counter() - start) / len(taps) * 1e6
+
+
+def main(toggles: int) -> None:
+    rng = random.Random(0)
+    print(f"{toggles} toggles per step")
+    print(f"{'step':<26} {'options':>7} {'rebuild':>12} {'mask':>12} {'mask, cold':>12}")
+    for field, (prefix, options) in STEPS.items():
+        taps = [(field, rng.randrange(len(options))) for _ in range(toggles)]
+        rebuild, mask, cold = (
+            bench(toggle, taps) for toggle in (toggle_rebuild, toggle_mask, toggle_mask_cold)
+        )
+        print(
+            f"{field:<26} {len(options):>7} {rebuild:>9.2f} us {mask:>9.2f} us {cold:>9.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,153 @@
+"""
+Memory of SecurityMiddleware user tracking at 100k tracked users.
+
+Builds the per-user activity of USERS users with tracemalloc running, once with the
+current UserActivity (slotted dataclass, TimestampRing-s sized to the thresholds of
+create_security_middleware, message digests, sliding window counters) and once with
+the previous shape (plain dataclass of deque(maxlen=...) of floats,
+identical_messages keeping (time, text) tuples). Each user is fed the same activity:
+
+- idle: one /start and nothing after it
+- survey: a survey in progress, MESSAGES answers and CALLBACKS keyboard taps
+
+Usage:
+    python benchmarks/bench_user_activity_memory.py [users]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from security_middleware import (  # noqa: E402
+    SecurityMiddleware,
+    create_security_middleware,
+    message_digest,
+)
+
+MESSAGES = 12
+CALLBACKS = 20
+START = 1_700_000_000.0
+
+
+@dataclass
+class DequeUserActivity:
+    """UserActivity as it was before the ring buffers (kept here for comparison)"""
+
+    user_id: int
+    message_count: int = 0
+    callback_count: int = 0
+    last_activity: float = field(default_factory=time.time)
+    request_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    identical_messages: deque = field(default_factory=lambda: deque(maxlen=10))
+    suspicious_score: int = 0
+    blocked_until: float | None = None
+    survey_start_time: float | None = None
+    last_state: str | None = None
+    state_changes: deque = field(default_factory=lambda: deque(maxlen=100))
+    last_command_time: float | None = None
+    callback_times: deque = field(default_factory=lambda: deque(maxlen=50))
+    last_callback_data: str | None = None
+
+
+def survey_messages(user_id: int) -> list[str]:
+    # Fresh strings per user, like the texts of incoming updates
+    return [f"Відповідь {i} на питання анкети від користувача {user_id}" for i in range(MESSAGES)]
+
+
+def fill_deque(activities: dict, user_id: int, survey: bool) -> None:
+    activity = DequeUserActivity(user_id=user_id)
+    now = START
+    activity.request_times.append(now)
+    activity.last_command_time = now
+    if survey:
+        for text in survey_messages(user_id):
+            now += 5.0
+            activity.request_times.append(now)
+            activity.identical_messages.append((now, text))
+            activity.state_changes.append(now)
+            activity.message_count += 1
+        for i in range(CALLBACKS):
+            now += 0.7
+            activity.request_times.append(now)
+            activity.callback_times.append(now)
+            activity.last_callback_data = f"toggle_category_{i % 6}"
+            activity.callback_count += 1
+    activity.last_activity = now
+    activities[user_id] = activity
+
+
+def fill_current(middleware: SecurityMiddleware, user_id: int, survey: bool) -> None:
+    activity = middleware._activity(user_id)
+    now = START
+
+    def request() -> None:
+        activity.request_times.append(now)
+        activity.minute_requests.hit(now)
+        activity.hour_requests.hit(now)
+        activity.day_requests.hit(now)
+
+    request()
+    activity.last_command_time = now
+    if survey:
+        for text in survey_messages(user_id):
+            now += 5.0
+            request()
+            activity.identical_messages.append(now, message_digest(text))
+            activity.state_changes.append(now)
+            activity.message_count += 1
+        for i in range(CALLBACKS):
+            now += 0.7
+            request()
+            activity.callback_times.append(now)
+            activity.last_callback_data = f"toggle_category_{i % 6}"
+            activity.callback_count += 1
+    activity.last_activity = now
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return after - before
+
+
+def main(users: int) -> None:
+    print(f"{users} tracked users; survey: {MESSAGES} messages, {CALLBACKS} callbacks per user")
+    print(f"{'activity':<8} {'representation':<26} {'total':>10} {'per user':>12}")
+    for survey in (False, True):
+        label = "survey" if survey else "idle"
+
+        def build_deque():
+            activities = {}
+            for user_id in range(1, users + 1):
+                fill_deque(activities, user_id, survey)
+            return activities
+
+        def build_current():
+            middleware = create_security_middleware()
+            middleware.max_tracked_users = users
+            for user_id in range(1, users + 1):
+                fill_current(middleware, user_id, survey)
+            return middleware
+
+        builds = (("deque dataclass (before)", build_deque), ("TimestampRing", build_current))
+        for name, build in builds:
+            size = measure(build)
+            print(f"{label:<8} {name:<26} {size / 2**20:>7.1f} MB {size / users:>9.0f} B")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,192 @@
+"""
+Load test: long polling vs webhook mode with BoundedRequestHandler.
+
+Everything runs locally. A fake Bot API server feeds synthetic message updates
+(getUpdates for polling) and answers sendMessage after API_LATENCY, the way a handler
+waits on Telegram. The same Dispatcher with one message handler then
+- polls the fake server with dp.start_polling, or
+- receives the updates as webhook POSTs from CONCURRENCY concurrent clients on a
+  local aiohttp server with BoundedRequestHandler (for several WEBHOOK_MAX_IN_FLIGHT)
+
+and throughput and per-update latency are reported for each.
+
+Usage:
+    python benchmarks/bench_webhook.py [updates] [api_latency_ms]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+from webhook import BoundedRequestHandler  # noqa: E402
+
+TOKEN = "42:BENCHMARK"
+SECRET = "benchmark-secret"
+USERS = 500
+CONCURRENCY = 100
+MAX_IN_FLIGHT_VALUES = (10, 40, 100)
+
+
+def synthetic_update(update_id: int) -> dict:
+    user_id = 1000 + update_id % USERS
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": "Київ",
+        },
+    }
+
+
+class FakeBotAPI:
+    """Minimal Bot API: getMe, getUpdates from a prepared queue, delayed sendMessage."""
+
+    def __init__(self, api_latency: float):
+        self.api_latency = api_latency
+        self.updates: list[dict] = []
+        self.served_at: dict[int, float] = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = await request.post()
+        if method == "getme":
+            result = {"id": 42, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == "getupdates":
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 100))
+            batch = self.updates[offset : offset + limit]
+            if not batch:
+                await asyncio.sleep(0.05)
+            now = time.perf_counter()
+            for update in batch:
+                self.served_at.setdefault(update["update_id"], now)
+            result = batch
+        elif method == "sendmessage":
+            await asyncio.sleep(self.api_latency)
+            chat_id = int(params["chat_id"])
+            result = {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+async def start_site(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def create_dispatcher(handled: dict[int, float], total: int, done: asyncio.Event) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def reply(message: Message) -> None:
+        await message.answer("Дякуємо!")
+        handled[message.message_id] = time.perf_counter()
+        if len(handled) >= total:
+            done.set()
+
+    return dp
+
+
+def report(mode: str, started: float, sent_at: dict[int, float], handled: dict[int, float]):
+    elapsed = max(handled.values()) - started
+    latencies = sorted((handled[i] - sent_at[i]) * 1000 for i in handled)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{mode:<26} {len(handled):>7} {elapsed:>8.2f} s {len(handled) / elapsed:>9.0f}/s"
+        f" {statistics.median(latencies):>9.1f} ms {p95:>9.1f} ms"
+    )
+
+
+async def bench_polling(api: FakeBotAPI, api_url: str, total: int) -> None:
+    handled: dict[int, float] = {}
+    done = asyncio.Event()
+    dp = create_dispatcher(handled, total, done)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+    bot = Bot(TOKEN, session=session)
+    api.updates = [synthetic_update(i) for i in range(total)]
+    api.served_at = {}
+    started = time.perf_counter()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    await done.wait()
+    await dp.stop_polling()
+    await polling
+    await bot.session.close()
+    report("polling", started, api.served_at, handled)
+
+
+async def bench_webhook(api_url: str, total: int, max_in_flight: int) -> None:
+    handled: dict[int, float] = {}
+    done = asyncio.Event()
+    dp = create_dispatcher(handled, total, done)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dispatcher=dp, bot=bot, max_in_flight=max_in_flight, secret_token=SECRET
+    )
+    handler.register(app, path="/webhook")
+    runner, url = await start_site(app)
+
+    sent_at: dict[int, float] = {}
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+    async def post(client: ClientSession, update_id: int) -> None:
+        async with semaphore:
+            sent_at[update_id] = time.perf_counter()
+            async with client.post(
+                f"{url}/webhook", json=synthetic_update(update_id), headers=headers
+            ) as response:
+                response.raise_for_status()
+
+    started = time.perf_counter()
+    async with ClientSession() as client:
+        await asyncio.gather(*(post(client, i) for i in range(total)))
+    await done.wait()
+    await runner.cleanup()  # also closes the bot session
+    report(f"webhook, max_in_flight={max_in_flight}", started, sent_at, handled)
+
+
+async def main(total: int, api_latency: float) -> None:
+    api = FakeBotAPI(api_latency)
+    api_app = web.Application()
+    api_app.router.add_route("POST", "/bot{token}/{method}", api.handle)
+    api_runner, api_url = await start_site(api_app)
+    print(f"{total} updates from {USERS} users, sendMessage latency {api_latency * 1000:.0f} ms")
+    print(f"{'mode':<26} {'updates':>7} {'elapsed':>10} {'throughput':>11} {'p50':>12} {'p95':>12}")
+    try:
+        await bench_polling(api, api_url, total)
+        for max_in_flight in MAX_IN_FLIGHT_VALUES:
+            await bench_webhook(api_url, total, max_in_flight)
+    finally:
+        await api_runner.cleanup()
+
+
+if __name__ == "__main__":
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(updates, latency_ms / 1000))
@@ -0,0 +1,116 @@
+"""
+Resume writes one document at a time vs the write-behind queue.
+
+Replays edits of already saved resumes against the local Firestore stand-in (see
+fake_firestore.py). Every user edits several fields in a row, like save_edited_field
+does when going through the edit menu:
+- direct: update_resume writes each edit to Firestore before returning
+- write-behind: update_resume queues the edit; the queue coalesces edits per user and
+  commits WriteBatch-es of up to WRITE_BEHIND_MAX_BATCH writes
+
+Reported are the latency seen by the handler, the time until every edit is in
+Firestore, and Firestore round trips and document writes.
+
+Usage:
+    python benchmarks/bench_write_behind.py [edits_per_user] [users] [latency_ms]
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+from fake_firestore import FakeFirestore, FakeStore  # noqa: E402
+from firebase_db import crud  # noqa: E402
+from firebase_db.executor import shutdown_firestore_executor  # noqa: E402
+from firebase_db.journal import WriteJournal  # noqa: E402
+from firebase_db.write_behind import ResumeWriteBehindQueue  # noqa: E402
+
+CONCURRENCY = 50
+
+
+def populated_store(users: int, latency: float) -> FakeStore:
+    store = FakeStore(latency)
+    for user_id in range(1, users + 1):
+        store.documents[("resumes", str(user_id))] = {"user_id": user_id, "age": 30}
+    return store
+
+
+async def replay_edits(edits_per_user: int, users: int) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def edit_resume(user_id: int) -> None:
+        async with semaphore:
+            for i in range(edits_per_user):
+                start = time.perf_counter()
+                await crud.update_resume(user_id, {"age": 31 + i})
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(edit_resume(user_id) for user_id in range(1, users + 1)))
+    return latencies
+
+
+def report(mode: str, latencies: list[float], persisted: float, store: FakeStore) -> None:
+    print(
+        f"{mode:<13} {statistics.mean(latencies):>9.2f} ms {persisted:>9.2f} s"
+        f" {store.round_trips:>12} {store.writes:>8}"
+    )
+
+
+async def bench_direct(edits_per_user: int, users: int, latency: float) -> None:
+    store = populated_store(users, latency)
+    crud.get_firestore_client = lambda: FakeFirestore(store)
+    start = time.perf_counter()
+    latencies = await replay_edits(edits_per_user, users)
+    report("direct", latencies, time.perf_counter() - start, store)
+
+
+async def bench_write_behind(
+    edits_per_user: int, users: int, latency: float, journal_dir: str
+) -> None:
+    store = populated_store(users, latency)
+    crud.get_firestore_client = lambda: FakeFirestore(store)
+    queue = ResumeWriteBehindQueue(
+        commit=crud._commit_resume_writes,
+        journal=WriteJournal(Path(journal_dir) / "write_behind.jsonl"),
+        on_flushed=crud._invalidate_flushed,
+    )
+    await queue.start()
+    crud._write_behind = queue
+    start = time.perf_counter()
+    latencies = await replay_edits(edits_per_user, users)
+    # Stop flushes whatever the periodic flush has not committed yet
+    await queue.stop()
+    crud._write_behind = None
+    stats = queue.stats()
+    report("write-behind", latencies, time.perf_counter() - start, store)
+    print(
+        f"{'':<13} batches: {stats['batches']}, coalesced: {stats['coalesced']}, "
+        f"avg batch size: {stats['avg_batch_size']:.0f}"
+    )
+
+
+async def main(edits_per_user: int, users: int, latency: float) -> None:
+    print(
+        f"{users} resumes, {edits_per_user} edits each, round trip {latency * 1000:.0f} ms"
+    )
+    print(f"{'mode':<13} {'handler':>12} {'persisted':>11} {'round trips':>12} {'writes':>8}")
+    with tempfile.TemporaryDirectory() as journal_dir:
+        await bench_direct(edits_per_user, users, latency)
+        await bench_write_behind(edits_per_user, users, latency, journal_dir)
+    await shutdown_firestore_executor()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    asyncio.run(main(count, user_count, latency_ms / 1000))
@@ -0,0 +1,190 @@
+"""
+In-memory stand-in for the Firestore clients used by the benchmarks.
+
+FakeFirestore mimics google.cloud.firestore.Client and FakeAsyncFirestore mimics
+AsyncClient for the calls firebase_db makes (document get/set/update/delete,
+write_option and WriteBatch). Every round trip costs `latency` seconds: a blocking
+sleep for the sync client, like the gRPC call it replaces, and an asyncio.sleep for
+the async one. Both can share one store.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Optional
+
+from google.api_core.exceptions import NotFound
+
+
+class FakeWriteResult:
+    def __init__(self):
+        self.update_time = time.time()
+
+
+class FakeSnapshot:
+    def __init__(self, data: Optional[dict]):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeStore:
+    """Documents by (collection, id), plus round trip counts."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents: dict[tuple[str, str], dict] = {}
+        self.round_trips = 0
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def count(self, reads: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.round_trips += 1
+            self.reads += reads
+            self.writes += writes
+
+    def get(self, key: tuple[str, str]) -> FakeSnapshot:
+        self.count(reads=1)
+        return FakeSnapshot(self.documents.get(key))
+
+    def apply(self, op: str, key: tuple[str, str], data: Optional[dict] = None, exists=False):
+        if op == "set":
+            self.documents[key] = dict(data)
+        elif op == "update":
+            if key not in self.documents:
+                raise NotFound(f"No document to update: {key[1]}")
+            self.documents[key].update(data)
+        elif op == "delete":
+            if exists and key not in self.documents:
+                raise NotFound(f"No document to delete: {key[1]}")
+            self.documents.pop(key, None)
+
+    def commit(self, ops: list[tuple[str, tuple[str, str], Optional[dict], bool]]) -> None:
+        self.count(writes=len(ops))
+        for op, key, data, exists in ops:
+            if op == "update" and key not in self.documents:
+                raise NotFound(f"No document to update: {key[1]}")
+        for op, key, data, exists in ops:
+            self.apply(op, key, data, exists)
+
+
+class _WriteOption:
+    def __init__(self, exists: bool):
+        self.exists = exists
+
+
+class _Batch:
+    def __init__(self, store: FakeStore):
+        self._store = store
+        self._ops: list[tuple[str, tuple[str, str], Optional[dict], bool]] = []
+
+    def set(self, doc_ref, data: dict) -> None:
+        self._ops.append(("set", doc_ref.key, data, False))
+
+    def update(self, doc_ref, data: dict) -> None:
+        self._ops.append(("update", doc_ref.key, data, True))
+
+    def delete(self, doc_ref, option: Optional[_WriteOption] = None) -> None:
+        self._ops.append(("delete", doc_ref.key, None, bool(option and option.exists)))
+
+
+class _DocumentReference:
+    def __init__(self, store: FakeStore, collection: str, document_id: str):
+        self._store = store
+        self.key = (collection, document_id)
+        self.id = document_id
+
+    def _write(self, op: str, data: Optional[dict] = None, option=None) -> FakeWriteResult:
+        self._store.count(writes=1)
+        self._store.apply(op, self.key, data, bool(option and option.exists))
+        return FakeWriteResult()
+
+
+class _Collection:
+    def __init__(self, store: FakeStore, name: str, document_type):
+        self._store = store
+        self._name = name
+        self._document_type = document_type
+
+    def document(self, document_id: str):
+        return self._document_type(self._store, self._name, document_id)
+
+
+class FakeDocument(_DocumentReference):
+    def get(self) -> FakeSnapshot:
+        time.sleep(self._store.latency)
+        return self._store.get(self.key)
+
+    def set(self, data: dict) -> FakeWriteResult:
+        time.sleep(self._store.latency)
+        return self._write("set", data)
+
+    def update(self, data: dict) -> FakeWriteResult:
+        time.sleep(self._store.latency)
+        return self._write("update", data)
+
+    def delete(self, option: Optional[_WriteOption] = None) -> FakeWriteResult:
+        time.sleep(self._store.latency)
+        return self._write("delete", option=option)
+
+
+class FakeAsyncDocument(_DocumentReference):
+    async def get(self) -> FakeSnapshot:
+        await asyncio.sleep(self._store.latency)
+        return self._store.get(self.key)
+
+    async def set(self, data: dict) -> FakeWriteResult:
+        await asyncio.sleep(self._store.latency)
+        return self._write("set", data)
+
+    async def update(self, data: dict) -> FakeWriteResult:
+        await asyncio.sleep(self._store.latency)
+        return self._write("update", data)
+
+    async def delete(self, option: Optional[_WriteOption] = None) -> FakeWriteResult:
+        await asyncio.sleep(self._store.latency)
+        return self._write("delete", option=option)
+
+
+class FakeBatch(_Batch):
+    def commit(self) -> list[FakeWriteResult]:
+        time.sleep(self._store.latency)
+        self._store.commit(self._ops)
+        return [FakeWriteResult() for _ in self._ops]
+
+
+class FakeAsyncBatch(_Batch):
+    async def commit(self) -> list[FakeWriteResult]:
+        await asyncio.sleep(self._store.latency)
+        self._store.commit(self._ops)
+        return [FakeWriteResult() for _ in self._ops]
+
+
+class FakeFirestore:
+    """Stand-in for the sync google.cloud.firestore.Client."""
+
+    document_type: Any = FakeDocument
+    batch_type: Any = FakeBatch
+
+    def __init__(self, store: FakeStore):
+        self.store = store
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self.store, name, self.document_type)
+
+    def write_option(self, exists: bool) -> _WriteOption:
+        return _WriteOption(exists)
+
+    def batch(self):
+        return self.batch_type(self.store)
+
+
+class FakeAsyncFirestore(FakeFirestore):
+    """Stand-in for google.cloud.firestore.AsyncClient."""
+
+    document_type = FakeAsyncDocument
+    batch_type = FakeAsyncBatch
@@ -1,58 +1,161 @@
 from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
 from google.cloud.firestore import Client
 import asyncio
+import copy
 import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Any
+from typing import Awaitable, Callable, Optional, Any
+
+from firebase_db.executor import get_firestore_executor
+from firebase_db.journal import WriteJournal
+from firebase_db.resume_schema import (
+    FIRESTORE_MAX_INT,
+    serialize_resume,
+    validate_and_normalize_numbers,
+)
+from firebase_db.supervisor import RESUME_SAVE_JOURNAL_PATH, OnSaveFailed, ResumeSaveSupervisor
+from firebase_db.write_behind import (
+    RESUME_WRITE_BEHIND,
+    WRITE_BEHIND_JOURNAL_PATH,
+    PendingWrite,
+    ResumeWriteBehindQueue,
+)
 
 logger = logging.getLogger(__name__)
 
-# Firestore supports 64-bit signed integers: -2^63 to 2^63-1
-# Maximum value: 9,223,372,036,854,775,807
-# Minimum value: -9,223,372,036,854,775,808
-FIRESTORE_MAX_INT = 9223372036854775807
-FIRESTORE_MIN_INT = -9223372036854775808
+# "executor" runs the sync client in FirestoreExecutor, "async" uses the native AsyncClient
+FIRESTORE_CLIENT_MODE = os.getenv("FIRESTORE_CLIENT_MODE", "executor").strip().lower()
+
+# Read every saved resume back and log it. Doubles round trips and billed reads - debugging only.
+FIRESTORE_VERIFY_WRITES = os.getenv("FIRESTORE_VERIFY_WRITES", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
+# Resume cache settings (seconds / number of users). Set either to 0 to disable the cache.
+RESUME_CACHE_TTL = float(os.getenv("RESUME_CACHE_TTL", "60"))
+RESUME_CACHE_MAX_SIZE = int(os.getenv("RESUME_CACHE_MAX_SIZE", "10000"))
 
-def validate_and_normalize_numbers(data: Any) -> Any:
+
+class ResumeCache:
     """
-    Recursively validate and normalize numeric values for Firestore compatibility.
-    
-    Firestore supports 64-bit signed integers. Numbers outside this range are converted to strings.
+    Async read-through cache for resumes with TTL expiry and LRU eviction.
     
-    Args:
-        data: Data structure (dict, list, or primitive value) to validate
-        
-    Returns:
-        Normalized data structure with numbers validated/converted
-    """
-    if isinstance(data, dict):
-        return {key: validate_and_normalize_numbers(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [validate_and_normalize_numbers(item) for item in data]
-    elif isinstance(data, (int, float)):
-        # Convert float to int if it's a whole number
-        if isinstance(data, float) and data.is_integer():
-            data = int(data)
-        
-        # Check if number is within Firestore's integer range
-        if isinstance(data, int):
-            if data > FIRESTORE_MAX_INT or data < FIRESTORE_MIN_INT:
-                logger.warning(
-                    f"Number {data} is out of Firestore integer range. Converting to string."
-                )
-                return str(data)
-            return data
-        elif isinstance(data, float):
-            # For floats, check if they're reasonable (Firestore supports doubles)
-            # But to be safe, convert very large floats to strings
-            if abs(data) > 1e15:  # Very large numbers
-                logger.warning(
-                    f"Float {data} is very large. Converting to string."
-                )
-                return str(data)
-            return data
-    return data
+    Missing resumes are cached as well, so repeated /start presses from users
+    without a resume don't reach Firestore either. Concurrent misses for the same
+    user share a single Firestore read.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[int, tuple[float, Optional[dict]]] = OrderedDict()
+        self._inflight: dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    async def get_or_load(
+        self, user_id: int, loader: Callable[[int], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        """
+        Return cached resume for user_id, loading it with loader on a miss.
+        
+        Exceptions raised by loader are propagated and nothing is cached.
+        """
+        if not self.enabled:
+            return await loader(user_id)
+
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._entries[user_id]
+
+        self.misses += 1
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id, loader))
+            self._inflight[user_id] = task
+        value = await asyncio.shield(task)
+        return copy.deepcopy(value)
+
+    async def _load(
+        self, user_id: int, loader: Callable[[int], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        task = asyncio.current_task()
+        try:
+            value = await loader(user_id)
+        finally:
+            # If the entry was invalidated while loading, the value may be stale - don't store it
+            is_current = self._inflight.get(user_id) is task
+            if is_current:
+                del self._inflight[user_id]
+        if is_current:
+            self.set(user_id, value)
+        return value
+
+    def set(self, user_id: int, value: Optional[dict]) -> None:
+        """Store value (None means "no resume") for user_id."""
+        if not self.enabled:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop cached value for user_id and detach any in-flight load."""
+        self._entries.pop(user_id, None)
+        self._inflight.pop(user_id, None)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_resume_cache = ResumeCache(ttl=RESUME_CACHE_TTL, max_size=RESUME_CACHE_MAX_SIZE)
+
+# Set by start_resume_write_behind() when RESUME_WRITE_BEHIND is enabled
+_write_behind: Optional[ResumeWriteBehindQueue] = None
+
+# Set by start_resume_saves(); until then finished resumes are saved inline
+_resume_saves: Optional[ResumeSaveSupervisor] = None
+
+
+def get_resume_cache_stats() -> dict[str, Any]:
+    """
+    Get resume cache counters (hits, misses, hit rate, size, evictions, invalidations).
+    """
+    return _resume_cache.stats()
 
 
 def get_firestore_client() -> Client:
@@ -109,6 +212,137 @@ def add_user_sync(data: dict) -> Optional[str]:
         return None
 
 
+def resume_user_id(resume: dict) -> Optional[int]:
+    """
+    Get the validated owner user_id of resume data.
+    
+    Args:
+        resume: Dictionary containing resume data (must include user_id as int)
+        
+    Returns:
+        The user_id as int, or None if it is missing or invalid
+    """
+    user_id = resume.get("user_id")
+    
+    # Log original user_id for debugging
+    logger.debug(f"Original user_id from resume: {user_id}, type: {type(user_id)}")
+    
+    # Validate user_id - must be present and be an integer
+    if user_id is None:
+        logger.error("Resume data missing user_id. Resume keys: %s", list(resume.keys()))
+        return None
+    
+    # Ensure user_id is int
+    if not isinstance(user_id, int):
+        try:
+            user_id = int(user_id)
+            logger.debug(f"Converted user_id to int: {user_id}")
+        except (ValueError, TypeError) as e:
+            logger.error(
+                f"Invalid user_id type: {type(user_id)}, value: {user_id}, error: {str(e)}"
+            )
+            return None
+    
+    # Final validation - ensure user_id is a valid positive integer within Firestore range
+    if not isinstance(user_id, int) or user_id <= 0:
+        logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+        return None
+    
+    # Validate user_id is within Firestore's integer range (64-bit signed)
+    if user_id > FIRESTORE_MAX_INT:
+        logger.error(
+            f"user_id {user_id} exceeds Firestore maximum integer value {FIRESTORE_MAX_INT}. "
+            f"Cannot save resume."
+        )
+        return None
+    return user_id
+
+
+def prepare_resume_document(resume: dict) -> Optional[tuple[int, dict]]:
+    """
+    Validate resume data and build the Firestore document for it.
+    
+    Shared by the executor and the native async client paths.
+    
+    Args:
+        resume: Dictionary containing resume data (must include user_id as int)
+        
+    Returns:
+        Tuple of (user_id, document) or None if resume data is invalid
+    """
+    user_id = resume_user_id(resume)
+    if user_id is None:
+        return None
+    
+    # Ensure username is None if not provided (not empty string)
+    username = resume.get("username")
+    if username == "":
+        username = None
+    elif username is not None and not isinstance(username, str):
+        username = str(username) if username else None
+    
+    # One pass over the fields without user_id and username: validates values, strips
+    # emojis from free text and normalizes numbers (see firebase_db.resume_schema)
+    resume_clean = serialize_resume(
+        {k: v for k, v in resume.items() if k not in ("user_id", "username")}
+    )
+    
+    resume_with_timestamp = {
+        **resume_clean,
+        "user_id": user_id,  # Always int, explicitly set
+        "username": username,  # str or None, explicitly set
+        "created_at": firestore.SERVER_TIMESTAMP,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+    
+    # Log final values before saving
+    logger.debug(
+        f"Final values before saving - user_id: {user_id} (type: {type(user_id)}), "
+        f"username: {username} (type: {type(username)})"
+    )
+    return user_id, resume_with_timestamp
+
+
+def pending_resume_document(resume: dict) -> Optional[dict]:
+    """
+    Shape a resume that is not in Firestore yet like a Firestore read of it.
+    
+    Runs prepare_resume_document; created_at/updated_at are only set by Firestore,
+    so they are left out.
+    
+    Returns:
+        The resume document, or None if the resume data is invalid
+    """
+    prepared = prepare_resume_document(copy.deepcopy(resume))
+    if prepared is None:
+        return None
+    return {k: v for k, v in prepared[1].items() if k not in ("created_at", "updated_at")}
+
+
+def log_resume_write(user_id: int, username: Optional[str], write_result) -> None:
+    """Log a saved resume using the WriteResult returned by set()."""
+    logger.info(
+        f"Resume added to Firestore - user_id: {user_id}, username: {username}, "
+        f"document_id: {user_id}, update_time: {getattr(write_result, 'update_time', None)}"
+    )
+
+
+def log_saved_resume(user_id: int, username: Optional[str], saved_doc) -> None:
+    """Log what was actually saved, based on a read-back snapshot (FIRESTORE_VERIFY_WRITES)."""
+    if saved_doc.exists:
+        saved_data = saved_doc.to_dict()
+        saved_user_id = saved_data.get("user_id") if saved_data else None
+        logger.info(
+            f"Resume added to Firestore - user_id: {user_id} (saved as: {saved_user_id}, type: {type(saved_user_id)}), "
+            f"username: {username}, document_id: {user_id}"
+        )
+    else:
+        logger.warning(f"Resume document was not found after saving - user_id: {user_id}")
+        logger.info(
+            f"Resume added to Firestore - user_id: {user_id}, username: {username}, document_id: {user_id}"
+        )
+
+
 def add_resume_sync(resume: dict) -> Optional[str]:
     """
     Synchronously add a resume to Firestore.
@@ -123,86 +357,20 @@ def add_resume_sync(resume: dict) -> Optional[str]:
         The document ID of the new resume entry, or None if error occurs
     """
     try:
-        user_id = resume.get("user_id")
-        
-        # Log original user_id for debugging
-        logger.debug(f"Original user_id from resume: {user_id}, type: {type(user_id)}")
-        
-        # Validate user_id - must be present and be an integer
-        if user_id is None:
-            logger.error("Resume data missing user_id. Resume keys: %s", list(resume.keys()))
-            return None
-        
-        # Ensure user_id is int
-        if not isinstance(user_id, int):
-            try:
-                user_id = int(user_id)
-                logger.debug(f"Converted user_id to int: {user_id}")
-            except (ValueError, TypeError) as e:
-                logger.error(
-                    f"Invalid user_id type: {type(user_id)}, value: {user_id}, error: {str(e)}"
-                )
-                return None
-        
-        # Final validation - ensure user_id is a valid positive integer within Firestore range
-        if not isinstance(user_id, int) or user_id <= 0:
-            logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+        prepared = prepare_resume_document(resume)
+        if prepared is None:
             return None
-        
-        # Validate user_id is within Firestore's integer range (64-bit signed)
-        if user_id > FIRESTORE_MAX_INT:
-            logger.error(
-                f"user_id {user_id} exceeds Firestore maximum integer value {FIRESTORE_MAX_INT}. "
-                f"Cannot save resume."
-            )
-            return None
-        
-        # Ensure username is None if not provided (not empty string)
-        username = resume.get("username")
-        if username == "":
-            username = None
-        elif username is not None and not isinstance(username, str):
-            username = str(username) if username else None
+        user_id, resume_with_timestamp = prepared
         
         db = get_firestore_client()
-        
-        # Create a copy of resume data without user_id and username to avoid overwriting
-        resume_clean = {k: v for k, v in resume.items() if k not in ("user_id", "username")}
-        
-        # Validate and normalize all numeric values in resume data
-        resume_clean = validate_and_normalize_numbers(resume_clean)
-        
-        resume_with_timestamp = {
-            **resume_clean,
-            "user_id": user_id,  # Always int, explicitly set
-            "username": username,  # str or None, explicitly set
-            "created_at": firestore.SERVER_TIMESTAMP,
-            "updated_at": firestore.SERVER_TIMESTAMP,
-        }
-        
-        # Log final values before saving
-        logger.debug(
-            f"Final values before saving - user_id: {user_id} (type: {type(user_id)}), "
-            f"username: {username} (type: {type(username)})"
-        )
-        
         doc_ref = db.collection("resumes").document(str(user_id))
-        doc_ref.set(resume_with_timestamp)
+        write_result = doc_ref.set(resume_with_timestamp)
         
-        # Verify what was actually saved
-        saved_doc = doc_ref.get()
-        if saved_doc.exists:
-            saved_data = saved_doc.to_dict()
-            saved_user_id = saved_data.get("user_id") if saved_data else None
-            logger.info(
-                f"Resume added to Firestore - user_id: {user_id} (saved as: {saved_user_id}, type: {type(saved_user_id)}), "
-                f"username: {username}, document_id: {user_id}"
-            )
+        if FIRESTORE_VERIFY_WRITES:
+            # Verify what was actually saved
+            log_saved_resume(user_id, resume_with_timestamp["username"], doc_ref.get())
         else:
-            logger.warning(f"Resume document was not found after saving - user_id: {user_id}")
-            logger.info(
-                f"Resume added to Firestore - user_id: {user_id}, username: {username}, document_id: {user_id}"
-            )
+            log_resume_write(user_id, resume_with_timestamp["username"], write_result)
         
         return str(user_id)
     except Exception as e:
@@ -223,8 +391,15 @@ async def add_user(data: dict) -> Optional[str]:
     Returns:
         The document ID of the new user entry, or None if error occurs
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, add_user_sync, data)
+    if FIRESTORE_CLIENT_MODE == "async":
+        from firebase_db import crud_async
+
+        return await crud_async.add_user(data)
+    try:
+        return await get_firestore_executor().run(add_user_sync, data)
+    except asyncio.TimeoutError:
+        logger.error("Timed out adding user to Firestore")
+        return None
 
 
 async def add_resume(resume: dict) -> Optional[str]:
@@ -235,10 +410,54 @@ async def add_resume(resume: dict) -> Optional[str]:
         resume: Dictionary containing resume data
         
     Returns:
-        The document ID of the new resume entry, or None if error occurs
+        The document ID of the new resume entry, or None if error occurs.
+        With write-behind enabled the resume is queued and the ID is returned
+        before it is persisted.
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, add_resume_sync, resume)
+    if _write_behind is not None:
+        user_id = resume_user_id(resume)
+        if user_id is None:
+            return None
+        _write_behind.enqueue(user_id, PendingWrite(op="set", data=dict(resume)))
+        return str(user_id)
+
+    if FIRESTORE_CLIENT_MODE == "async":
+        from firebase_db import crud_async
+
+        doc_id = await crud_async.add_resume(resume)
+    else:
+        try:
+            doc_id = await get_firestore_executor().run(add_resume_sync, resume)
+        except asyncio.TimeoutError:
+            # The write may still land after the timeout
+            logger.error("Timed out adding resume to Firestore")
+            doc_id = None
+    try:
+        _resume_cache.invalidate(int(resume.get("user_id")))
+    except (TypeError, ValueError):
+        pass
+    return doc_id
+
+
+def _fetch_resume_sync(user_id: int) -> Optional[dict]:
+    """
+    Read a resume document from Firestore.
+    
+    Returns:
+        Dictionary containing resume data, or None if not found.
+        Firestore errors are raised to the caller.
+    """
+    db = get_firestore_client()
+    doc_ref = db.collection("resumes").document(str(user_id))
+    doc = doc_ref.get()
+
+    if doc.exists:
+        resume_data = doc.to_dict()
+        logger.info(f"Resume retrieved from Firestore - user_id: {user_id}")
+        return resume_data
+    else:
+        logger.debug(f"Resume not found in Firestore - user_id: {user_id}")
+        return None
 
 
 def get_resume_sync(user_id: int) -> Optional[dict]:
@@ -256,17 +475,7 @@ def get_resume_sync(user_id: int) -> Optional[dict]:
             logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
             return None
         
-        db = get_firestore_client()
-        doc_ref = db.collection("resumes").document(str(user_id))
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            resume_data = doc.to_dict()
-            logger.info(f"Resume retrieved from Firestore - user_id: {user_id}")
-            return resume_data
-        else:
-            logger.debug(f"Resume not found in Firestore - user_id: {user_id}")
-            return None
+        return _fetch_resume_sync(user_id)
     except Exception as e:
         logger.error(
             f"Error getting resume from Firestore: {str(e)}",
@@ -279,14 +488,43 @@ async def get_resume(user_id: int) -> Optional[dict]:
     """
     Asynchronously get a resume from Firestore by user_id.
     
+    Reads go through the resume cache; errors are never cached.
+    
     Args:
         user_id: Telegram user ID (must be int)
         
     Returns:
         Dictionary containing resume data, or None if not found or error occurs
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, get_resume_sync, user_id)
+    if not isinstance(user_id, int) or user_id <= 0:
+        logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+        return None
+
+    async def load(uid: int) -> Optional[dict]:
+        if FIRESTORE_CLIENT_MODE == "async":
+            from firebase_db import crud_async
+
+            return await crud_async.fetch_resume(uid)
+        return await get_firestore_executor().run(_fetch_resume_sync, uid)
+
+    try:
+        resume = await _resume_cache.get_or_load(user_id, load)
+    except Exception as e:
+        logger.error(
+            f"Error getting resume from Firestore: {str(e)}",
+            exc_info=True
+        )
+        return None
+
+    if _write_behind is not None and _write_behind.has_pending(user_id):
+        # Read-your-writes: apply queued writes that are not in Firestore yet
+        resume = copy.deepcopy(_write_behind.overlay(user_id, resume))
+    if _resume_saves is not None:
+        # A finished resume still being saved in the background is newer than Firestore
+        pending = _resume_saves.pending(user_id)
+        if pending is not None:
+            resume = pending_resume_document(pending)
+    return resume
 
 
 def delete_resume_sync(user_id: int) -> bool:
@@ -306,15 +544,15 @@ def delete_resume_sync(user_id: int) -> bool:
         
         db = get_firestore_client()
         doc_ref = db.collection("resumes").document(str(user_id))
-        doc = doc_ref.get()
         
-        if doc.exists:
-            doc_ref.delete()
-            logger.info(f"Resume deleted from Firestore - user_id: {user_id}")
-            return True
-        else:
+        # Delete with an exists=True precondition instead of reading the document first
+        try:
+            doc_ref.delete(option=db.write_option(exists=True))
+        except NotFound:
             logger.warning(f"Resume not found for deletion - user_id: {user_id}")
             return False
+        logger.info(f"Resume deleted from Firestore - user_id: {user_id}")
+        return True
     except Exception as e:
         logger.error(
             f"Error deleting resume from Firestore: {str(e)}",
@@ -331,10 +569,66 @@ async def delete_resume(user_id: int) -> bool:
         user_id: Telegram user ID (must be int)
         
     Returns:
-        True if resume was deleted successfully, False otherwise
+        True if resume was deleted successfully, False otherwise (also when
+        it does not exist). With write-behind enabled the delete is queued and
+        True is returned once the resume is known to exist.
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, delete_resume_sync, user_id)
+    if _resume_saves is not None and isinstance(user_id, int):
+        # A background save landing after the delete would bring the resume back
+        await _resume_saves.discard(user_id)
+
+    if _write_behind is not None:
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+            return False
+        # Same not-found contract as the direct path; get_resume sees queued writes
+        if await get_resume(user_id) is None:
+            logger.warning(f"Resume not found for deletion - user_id: {user_id}")
+            return False
+        _write_behind.enqueue(user_id, PendingWrite(op="delete"))
+        return True
+
+    if FIRESTORE_CLIENT_MODE == "async":
+        from firebase_db import crud_async
+
+        deleted = await crud_async.delete_resume(user_id)
+    else:
+        try:
+            deleted = await get_firestore_executor().run(delete_resume_sync, user_id)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out deleting resume from Firestore - user_id: {user_id}")
+            deleted = False
+    if isinstance(user_id, int):
+        _resume_cache.invalidate(user_id)
+    if deleted:
+        # Write through: the resume is known to be gone
+        _resume_cache.set(user_id, None)
+    return deleted
+
+
+def prepare_resume_update(updates: dict) -> dict:
+    """
+    Build the Firestore update payload for a resume.
+    
+    user_id and username identify the resume owner and are never overwritten
+    by an update, so they are dropped from the payload.
+    
+    Args:
+        updates: Dictionary containing fields to update
+        
+    Returns:
+        Normalized update payload with updated_at timestamp
+    """
+    # Validate and normalize all numeric values in updates
+    updates_normalized = validate_and_normalize_numbers(
+        {k: v for k, v in updates.items() if k not in ("user_id", "username")}
+    )
+    
+    # Prepare updates with timestamp
+    return {
+        **updates_normalized,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
 
 
 def update_resume_sync(user_id: int, updates: dict) -> bool:
@@ -355,30 +649,14 @@ def update_resume_sync(user_id: int, updates: dict) -> bool:
         
         db = get_firestore_client()
         doc_ref = db.collection("resumes").document(str(user_id))
-        doc = doc_ref.get()
+        update_data = prepare_resume_update(updates)
         
-        if not doc.exists:
+        # update() carries an exists=True precondition - one round trip, NotFound if missing
+        try:
+            doc_ref.update(update_data)
+        except NotFound:
             logger.warning(f"Resume not found for update - user_id: {user_id}")
             return False
-        
-        # Validate and normalize all numeric values in updates
-        updates_normalized = validate_and_normalize_numbers(updates)
-        
-        # Prepare updates with timestamp
-        update_data = {
-            **updates_normalized,
-            "updated_at": firestore.SERVER_TIMESTAMP,
-        }
-        
-        # Ensure user_id and username are preserved if they exist in updates
-        existing_data = doc.to_dict()
-        if existing_data:
-            if "user_id" in updates:
-                update_data["user_id"] = existing_data.get("user_id")
-            if "username" in updates:
-                update_data["username"] = existing_data.get("username")
-        
-        doc_ref.update(update_data)
         logger.info(f"Resume updated in Firestore - user_id: {user_id}")
         return True
     except Exception as e:
@@ -398,7 +676,201 @@ async def update_resume(user_id: int, updates: dict) -> bool:
         updates: Dictionary containing fields to update
         
     Returns:
-        True if resume was updated successfully, False otherwise
+        True if resume was updated successfully, False otherwise (also when
+        it does not exist). With write-behind enabled the update is queued and
+        True is returned once the resume is known to exist.
+    """
+    if _resume_saves is not None and isinstance(user_id, int):
+        # The resume may not be in Firestore yet - update the pending save instead
+        if await _resume_saves.amend(user_id, updates):
+            return True
+
+    if _write_behind is not None:
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+            return False
+        if await get_resume(user_id) is None:
+            logger.warning(f"Resume not found for update - user_id: {user_id}")
+            return False
+        _write_behind.enqueue(user_id, PendingWrite(op="update", data=dict(updates)))
+        return True
+
+    if FIRESTORE_CLIENT_MODE == "async":
+        from firebase_db import crud_async
+
+        updated = await crud_async.update_resume(user_id, updates)
+    else:
+        try:
+            updated = await get_firestore_executor().run(update_resume_sync, user_id, updates)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out updating resume in Firestore - user_id: {user_id}")
+            updated = False
+    if isinstance(user_id, int):
+        _resume_cache.invalidate(user_id)
+    return updated
+
+
+def add_write_to_batch(db, batch, user_id: int, write: PendingWrite) -> None:
+    """
+    Add a queued resume write to a Firestore WriteBatch (sync or async client).
+    """
+    doc_ref = db.collection("resumes").document(str(user_id))
+    if write.op == "set":
+        prepared = prepare_resume_document(write.data)
+        if prepared is None:
+            return
+        batch.set(doc_ref, prepared[1])
+    elif write.op == "update":
+        batch.update(doc_ref, prepare_resume_update(write.data))
+    elif write.op == "delete":
+        batch.delete(doc_ref)
+    else:
+        logger.error(f"Unknown resume write op {write.op!r} - user_id: {user_id}")
+
+
+def commit_resume_writes_sync(writes: list[tuple[int, PendingWrite]]) -> None:
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, update_resume_sync, user_id, updates)
\ No newline at end of file
+    Commit queued resume writes in one WriteBatch.
+    
+    Raises on failure. NotFound of a single update (resume deleted meanwhile)
+    is logged and dropped, like update_resume does.
+    """
+    db = get_firestore_client()
+    batch = db.batch()
+    for user_id, write in writes:
+        add_write_to_batch(db, batch, user_id, write)
+    try:
+        batch.commit()
+    except NotFound:
+        if len(writes) > 1:
+            raise
+        logger.warning(f"Resume not found for update - user_id: {writes[0][0]}")
+        return
+    logger.info(f"Committed {len(writes)} resume writes to Firestore")
+
+
+async def _commit_resume_writes(writes: list[tuple[int, PendingWrite]]) -> None:
+    if FIRESTORE_CLIENT_MODE == "async":
+        from firebase_db import crud_async
+
+        await crud_async.commit_resume_writes(writes)
+    else:
+        await get_firestore_executor().run(commit_resume_writes_sync, writes)
+
+
+async def _invalidate_flushed(user_ids: list[int]) -> None:
+    for user_id in user_ids:
+        _resume_cache.invalidate(user_id)
+    if _resume_saves is not None:
+        # Background saves handed to write-behind are persisted now
+        await _resume_saves.confirm_persisted(user_ids)
+
+
+async def _report_failed_writes(user_ids: list[int]) -> None:
+    for user_id in user_ids:
+        _resume_cache.invalidate(user_id)
+    if _resume_saves is not None:
+        # Background saves whose write-behind write was dropped - the user is told
+        await _resume_saves.persist_failed(user_ids)
+
+
+def _is_persisted(user_id: int) -> bool:
+    """True unless a write of the resume is still queued in write-behind."""
+    return _write_behind is None or not _write_behind.has_pending(user_id)
+
+
+async def start_resume_write_behind() -> None:
+    """
+    Start the resume write-behind queue if RESUME_WRITE_BEHIND is enabled.
+    
+    Replays writes journaled by a previous run. Until this is called, resume
+    writes go straight to Firestore.
+    """
+    global _write_behind
+    if not RESUME_WRITE_BEHIND or _write_behind is not None:
+        return
+    queue = ResumeWriteBehindQueue(
+        commit=_commit_resume_writes,
+        journal=WriteJournal(WRITE_BEHIND_JOURNAL_PATH),
+        on_flushed=_invalidate_flushed,
+        on_failed=_report_failed_writes,
+    )
+    await queue.start()
+    _write_behind = queue
+    logger.info("Resume write-behind queue started")
+
+
+async def stop_resume_write_behind() -> None:
+    """
+    Flush and stop the resume write-behind queue (called on bot shutdown).
+    """
+    global _write_behind
+    if _write_behind is not None:
+        queue = _write_behind
+        _write_behind = None
+        await queue.stop()
+
+
+def get_write_behind_stats() -> Optional[dict[str, Any]]:
+    """Get write-behind queue metrics, or None if write-behind is not running."""
+    return _write_behind.stats() if _write_behind is not None else None
+
+
+async def submit_resume_save(resume: dict) -> bool:
+    """
+    Save a finished resume in the background, without waiting for Firestore.
+
+    The resume is journaled first, so it survives a restart. Before start_resume_saves()
+    is called the resume is saved inline instead.
+
+    Returns:
+        True if the resume was accepted (or saved), False if it is invalid or the
+        inline save failed
+    """
+    if _resume_saves is None:
+        return await add_resume(resume) is not None
+    user_id = resume_user_id(resume)
+    if user_id is None:
+        return False
+    await _resume_saves.submit(user_id, dict(resume))
+    return True
+
+
+async def start_resume_saves(on_failure: Optional[OnSaveFailed] = None) -> None:
+    """
+    Start the background resume save supervisor and replay journaled saves.
+
+    on_failure(user_id) is awaited when a save has failed for good.
+    """
+    global _resume_saves
+    if _resume_saves is not None:
+        return
+    supervisor = ResumeSaveSupervisor(
+        save=add_resume,
+        journal=WriteJournal(RESUME_SAVE_JOURNAL_PATH),
+        on_failure=on_failure,
+        is_persisted=_is_persisted,
+    )
+    _resume_saves = supervisor
+    await supervisor.start()
+    logger.info("Resume save supervisor started")
+
+
+async def stop_resume_saves() -> None:
+    """
+    Let background resume saves finish (called on bot shutdown, before the
+    write-behind queue and executor are stopped).
+    """
+    global _resume_saves
+    if _resume_saves is not None:
+        supervisor = _resume_saves
+        await supervisor.stop()
+        if _write_behind is not None:
+            # Saves only queued in write-behind leave the save journal once flushed
+            await _write_behind.flush()
+        _resume_saves = None
+
+
+def get_resume_save_stats() -> Optional[dict[str, Any]]:
+    """Get background resume save metrics, or None if the supervisor is not running."""
+    return _resume_saves.stats() if _resume_saves is not None else None
@@ -0,0 +1,210 @@
+"""
+Native async Firestore CRUD operations on google.cloud.firestore.AsyncClient.
+
+Same signatures and return contract as the executor-based functions in
+firebase_db.crud, without a thread hop per call. Selected with
+FIRESTORE_CLIENT_MODE=async; firebase_db.crud dispatches here and keeps
+handling the resume cache.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from firebase_admin import firestore, firestore_async
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore import AsyncClient
+
+from firebase_db.crud import (
+    FIRESTORE_VERIFY_WRITES,
+    add_write_to_batch,
+    log_resume_write,
+    log_saved_resume,
+    prepare_resume_document,
+    prepare_resume_update,
+)
+from firebase_db.executor import FIRESTORE_CALL_TIMEOUT
+from firebase_db.write_behind import PendingWrite
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_firestore_client() -> AsyncClient:
+    """
+    Get async Firestore database client.
+    Creates the client lazily (inside the running event loop) after Firebase is initialized.
+    """
+    return firestore_async.client()
+
+
+async def _with_timeout(awaitable):
+    return await asyncio.wait_for(awaitable, FIRESTORE_CALL_TIMEOUT or None)
+
+
+async def add_user(data: dict) -> Optional[str]:
+    """
+    Add a user to Firestore.
+
+    Args:
+        data: Dictionary containing user data
+
+    Returns:
+        The document ID of the new user entry, or None if error occurs
+    """
+    try:
+        db = get_async_firestore_client()
+        user_data = {
+            **data,
+            "created_at": firestore.SERVER_TIMESTAMP,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
+        _, doc_ref = await _with_timeout(db.collection("users").add(user_data))
+        logger.info(f"User added to Firestore with document ID: {doc_ref.id}")
+        return doc_ref.id
+    except Exception as e:
+        logger.error(f"Error adding user to Firestore: {str(e)}", exc_info=True)
+        return None
+
+
+async def add_resume(resume: dict) -> Optional[str]:
+    """
+    Add a resume to Firestore (document ID is user_id).
+
+    Args:
+        resume: Dictionary containing resume data (must include user_id as int)
+
+    Returns:
+        The document ID of the new resume entry, or None if error occurs
+    """
+    try:
+        prepared = prepare_resume_document(resume)
+        if prepared is None:
+            return None
+        user_id, resume_with_timestamp = prepared
+
+        db = get_async_firestore_client()
+        doc_ref = db.collection("resumes").document(str(user_id))
+        write_result = await _with_timeout(doc_ref.set(resume_with_timestamp))
+
+        if FIRESTORE_VERIFY_WRITES:
+            # Verify what was actually saved
+            saved_doc = await _with_timeout(doc_ref.get())
+            log_saved_resume(user_id, resume_with_timestamp["username"], saved_doc)
+        else:
+            log_resume_write(user_id, resume_with_timestamp["username"], write_result)
+
+        return str(user_id)
+    except Exception as e:
+        logger.error(
+            f"Error adding resume to Firestore: {str(e)}",
+            exc_info=True
+        )
+        return None
+
+
+async def fetch_resume(user_id: int) -> Optional[dict]:
+    """
+    Read a resume document from Firestore.
+
+    Returns:
+        Dictionary containing resume data, or None if not found.
+        Firestore errors are raised to the caller (the cache must not store them).
+    """
+    db = get_async_firestore_client()
+    doc = await _with_timeout(db.collection("resumes").document(str(user_id)).get())
+
+    if doc.exists:
+        logger.info(f"Resume retrieved from Firestore - user_id: {user_id}")
+        return doc.to_dict()
+    logger.debug(f"Resume not found in Firestore - user_id: {user_id}")
+    return None
+
+
+async def delete_resume(user_id: int) -> bool:
+    """
+    Delete a resume from Firestore by user_id.
+
+    Args:
+        user_id: Telegram user ID (must be int)
+
+    Returns:
+        True if resume was deleted successfully, False otherwise
+    """
+    try:
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+            return False
+
+        db = get_async_firestore_client()
+        doc_ref = db.collection("resumes").document(str(user_id))
+
+        # Delete with an exists=True precondition instead of reading the document first
+        try:
+            await _with_timeout(doc_ref.delete(option=db.write_option(exists=True)))
+        except NotFound:
+            logger.warning(f"Resume not found for deletion - user_id: {user_id}")
+            return False
+        logger.info(f"Resume deleted from Firestore - user_id: {user_id}")
+        return True
+    except Exception as e:
+        logger.error(
+            f"Error deleting resume from Firestore: {str(e)}",
+            exc_info=True
+        )
+        return False
+
+
+async def update_resume(user_id: int, updates: dict) -> bool:
+    """
+    Update a resume in Firestore by user_id.
+
+    Args:
+        user_id: Telegram user ID (must be int)
+        updates: Dictionary containing fields to update
+
+    Returns:
+        True if resume was updated successfully, False otherwise
+    """
+    try:
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.error(f"Invalid user_id value: {user_id} (must be positive integer)")
+            return False
+
+        db = get_async_firestore_client()
+        doc_ref = db.collection("resumes").document(str(user_id))
+        update_data = prepare_resume_update(updates)
+
+        # update() carries an exists=True precondition - one round trip, NotFound if missing
+        try:
+            await _with_timeout(doc_ref.update(update_data))
+        except NotFound:
+            logger.warning(f"Resume not found for update - user_id: {user_id}")
+            return False
+        logger.info(f"Resume updated in Firestore - user_id: {user_id}")
+        return True
+    except Exception as e:
+        logger.error(
+            f"Error updating resume in Firestore: {str(e)}",
+            exc_info=True
+        )
+        return False
+
+
+async def commit_resume_writes(writes: list[tuple[int, PendingWrite]]) -> None:
+    """
+    Commit queued resume writes in one async WriteBatch.
+
+    Same contract as firebase_db.crud.commit_resume_writes_sync.
+    """
+    db = get_async_firestore_client()
+    batch = db.batch()
+    for user_id, write in writes:
+        add_write_to_batch(db, batch, user_id, write)
+    try:
+        await _with_timeout(batch.commit())
+    except NotFound:
+        if len(writes) > 1:
+            raise
+        logger.warning(f"Resume not found for update - user_id: {writes[0][0]}")
+        return
+    logger.info(f"Committed {len(writes)} resume writes to Firestore")
@@ -0,0 +1,190 @@
+"""
+Dedicated thread pool for blocking Firestore SDK calls.
+
+Keeps Firestore I/O off the process-wide default executor, bounds the number of
+concurrent SDK calls and exposes queue-depth and latency metrics.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", "8"))
+# Per-call timeout in seconds (0 disables)
+FIRESTORE_CALL_TIMEOUT = float(os.getenv("FIRESTORE_CALL_TIMEOUT", "15"))
+
+
+class FirestoreExecutor:
+    """
+    Sized thread pool for Firestore calls with per-call timeouts.
+
+    A timed out call raises asyncio.TimeoutError in the caller. The SDK call itself
+    can't be interrupted, but if it is still queued it is cancelled and never runs.
+    """
+
+    def __init__(
+        self, max_workers: int = FIRESTORE_MAX_WORKERS, timeout: float = FIRESTORE_CALL_TIMEOUT
+    ):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+        # Metrics are updated from worker threads
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_run_time = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="firestore"
+            )
+        return self._executor
+
+    def _call(self, func: Callable[..., Any], args: tuple, submitted_at: float) -> Any:
+        started_at = time.monotonic()
+        queue_wait = started_at - submitted_at
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_queue_wait += queue_wait
+            self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+
+        failed = False
+        try:
+            return func(*args)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                if failed:
+                    self.failed += 1
+                self.total_run_time += time.monotonic() - started_at
+
+    def _on_done(self, future: Future) -> None:
+        # Cancelled while still queued - _call never ran
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run blocking func(*args) in the Firestore pool.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            timeout: Override for the default per-call timeout (seconds, 0 disables)
+
+        Returns:
+            Result of func
+
+        Raises:
+            asyncio.TimeoutError: If the call did not finish in time
+            RuntimeError: If the executor was shut down
+        """
+        if self._closed:
+            raise RuntimeError("Firestore executor is shut down")
+
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        try:
+            future = self._get_executor().submit(self._call, func, args, time.monotonic())
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(self._on_done)
+
+        call_timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), call_timeout or None)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            logger.error(
+                f"Firestore call {getattr(func, '__name__', func)} timed out after {call_timeout}s"
+            )
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        """Get executor metrics."""
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "active": self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "avg_queue_wait": self.total_queue_wait / started if started else 0.0,
+                "max_queue_wait": self.max_queue_wait,
+                "avg_run_time": self.total_run_time / self.completed if self.completed else 0.0,
+            }
+
+    async def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting calls and wait for in-flight calls to finish."""
+        self._closed = True
+        if self._executor is None:
+            return
+        executor = self._executor
+        self._executor = None
+        if wait:
+            await asyncio.to_thread(executor.shutdown, wait=True)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Firestore executor shut down - stats: {self.stats()}")
+
+
+_firestore_executor: Optional[FirestoreExecutor] = None
+
+
+def get_firestore_executor() -> FirestoreExecutor:
+    """
+    Get the process-wide Firestore executor, creating it on first use.
+    """
+    global _firestore_executor
+    if _firestore_executor is None:
+        _firestore_executor = FirestoreExecutor()
+    return _firestore_executor
+
+
+def get_firestore_executor_stats() -> dict[str, Any]:
+    """Get metrics of the Firestore executor."""
+    return get_firestore_executor().stats()
+
+
+async def shutdown_firestore_executor(wait: bool = True) -> None:
+    """
+    Shut down the Firestore executor (called on bot shutdown).
+    """
+    global _firestore_executor
+    if _firestore_executor is not None:
+        await _firestore_executor.shutdown(wait=wait)
+        _firestore_executor = None
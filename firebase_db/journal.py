@@ -0,0 +1,72 @@
+"""
+Append-only local journal for Firestore writes that could not be persisted.
+
+Entries are stored as JSON lines so they survive restarts and can be replayed.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_JOURNAL_DIR = PROJECT_ROOT / "data"
+
+
+class WriteJournal:
+    """Durable JSON-lines journal of pending writes."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, entries: list[dict[str, Any]]) -> None:
+        """Append entries and fsync, so they are durable before we return."""
+        if not entries:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self) -> list[dict[str, Any]]:
+        """Read all entries, skipping corrupted lines (e.g. a torn last write)."""
+        with self._lock:
+            if not self.path.exists():
+                return []
+            entries = []
+            with self.path.open("r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupted journal line {line_no} in {self.path}")
+            return entries
+
+    def rewrite(self, entries: list[dict[str, Any]]) -> None:
+        """Atomically replace the journal contents."""
+        with self._lock:
+            if not entries:
+                self.path.unlink(missing_ok=True)
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.rewrite([])
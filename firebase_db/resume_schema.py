@@ -0,0 +1,252 @@
+"""
+Single-pass serializer for resume documents.
+
+The resume layout is described once in RESUME_SCHEMA and compiled into a table of
+converter functions at import time. Serializing a resume is then one pass over its
+fields that validates values, strips emojis from free-text fields only and keeps
+numbers within Firestore's 64-bit integer range. Option values (categories, regions,
+work types) are written as they are.
+"""
+
+import logging
+import re
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Firestore supports 64-bit signed integers: -2^63 to 2^63-1
+# Maximum value: 9,223,372,036,854,775,807
+# Minimum value: -9,223,372,036,854,775,808
+FIRESTORE_MAX_INT = 9223372036854775807
+FIRESTORE_MIN_INT = -9223372036854775808
+
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F1E0-\U0001F1FF"
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA00-\U0001FA6F"
+    "\U0001FA70-\U0001FAFF"
+    "\U00002600-\U000026FF"
+    "\U00002700-\U000027BF"
+    "]+",
+    flags=re.UNICODE,
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+Converter = Callable[[str, Any], Any]
+
+# Returned by a converter to leave the value out of its map
+_SKIP = object()
+
+
+def remove_emojis(text: str) -> str:
+    """
+    Remove emojis and other Unicode symbols from text.
+
+    Also cleans up extra spaces left after emoji removal.
+    """
+    if not text:
+        return text
+    cleaned = EMOJI_PATTERN.sub("", text)
+    return WHITESPACE_PATTERN.sub(" ", cleaned).strip()
+
+
+def normalize_number(value: Any) -> Any:
+    """
+    Fit a number into Firestore: whole floats become ints, numbers out of range strings.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        if value > FIRESTORE_MAX_INT or value < FIRESTORE_MIN_INT:
+            logger.warning(
+                f"Number {value} is out of Firestore integer range. Converting to string."
+            )
+            return str(value)
+        return value
+    # Firestore supports doubles, but to be safe very large floats become strings
+    if abs(value) > 1e15:
+        logger.warning(f"Float {value} is very large. Converting to string.")
+        return str(value)
+    return value
+
+
+def validate_and_normalize_numbers(data: Any) -> Any:
+    """
+    Recursively validate and normalize numeric values for Firestore compatibility.
+
+    Used for values the schema does not describe.
+
+    Args:
+        data: Data structure (dict, list, or primitive value) to validate
+
+    Returns:
+        Normalized data structure with numbers validated/converted
+    """
+    if isinstance(data, dict):
+        return {key: validate_and_normalize_numbers(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [validate_and_normalize_numbers(item) for item in data]
+    return normalize_number(data)
+
+
+# Field kinds used in RESUME_SCHEMA
+
+
+def _text(field: str, value: Any) -> Any:
+    """Free text typed by the user: emojis are removed."""
+    if isinstance(value, str):
+        return remove_emojis(value)
+    return validate_and_normalize_numbers(value)
+
+
+def _option(field: str, value: Any) -> Any:
+    """Value picked from the bot's own options (or a flag): kept as is."""
+    return value
+
+
+def _int_range(low: int, high: int) -> Converter:
+    def convert(field: str, value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            number = int(value) if isinstance(value, (int, float, str)) else None
+        except (ValueError, TypeError):
+            logger.warning(f"Could not convert {field} to int: {value}, setting to None")
+            return None
+        if number is not None and not low <= number <= high:
+            logger.warning(f"Invalid {field} value: {number}, setting to None")
+            return None
+        return number
+
+    return convert
+
+
+def _amount(field: str, value: Any) -> Any:
+    """Whole amount; spaces and separators typed by the user are ignored."""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            digits = value.replace(" ", "").replace(",", "").replace(".", "")
+            value = int(digits) if digits else None
+        elif isinstance(value, float):
+            value = int(value)
+        elif isinstance(value, bool) or not isinstance(value, int):
+            value = None
+    except (ValueError, TypeError):
+        logger.warning(f"Could not convert {field} to int: {value}, setting to None")
+        return None
+    return normalize_number(value)
+
+
+def _years(low: float, high: float) -> Converter:
+    def convert(field: str, value: Any) -> Any:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            logger.warning(f"Invalid {field} type: {type(value)}, skipping")
+            return _SKIP
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not low <= value <= high:
+            logger.warning(f"Invalid {field} value: {value}, skipping")
+            return _SKIP
+        return value
+
+    return convert
+
+
+def _list_of(item: Converter) -> Converter:
+    def convert(field: str, value: Any) -> Any:
+        if not isinstance(value, list):
+            return validate_and_normalize_numbers(value)
+        return [item(field, v) for v in value]
+
+    return convert
+
+
+def _map_of(item: Converter) -> Converter:
+    """Dict with free keys (e.g. driving category -> years); invalid values are left out."""
+
+    def convert(field: str, value: Any) -> Any:
+        if not isinstance(value, dict):
+            return validate_and_normalize_numbers(value)
+        result = {}
+        for key, v in value.items():
+            converted = item(f"{field}[{key}]", v)
+            if converted is not _SKIP:
+                result[key] = converted
+        return result
+
+    return convert
+
+
+def _struct(fields: dict[str, Any]) -> Converter:
+    compiled = compile_schema(fields)
+
+    def convert(field: str, value: Any) -> Any:
+        if not isinstance(value, dict):
+            return validate_and_normalize_numbers(value)
+        return serialize(compiled, value)
+
+    return convert
+
+
+RESUME_SCHEMA: dict[str, Any] = {
+    "name": _text,
+    "phone": _text,
+    "age": _int_range(0, 150),
+    "place_of_living": {
+        "region_key": _option,
+        "region_name": _option,
+        "city": _text,
+    },
+    "driving_categories": _list_of(_option),
+    "driving_experience": _map_of(_years(0, 100)),
+    "semi_trailer_types": _list_of(_option),
+    "types_of_work": _list_of(_option),
+    "types_of_cars": _list_of(_text),
+    "race_duration_preference": _list_of(_option),
+    "is_adr_license": _option,
+    "docs_for_driving_abroad": _list_of(_option),
+    "military_booking": _option,
+    "desired_salary": _amount,
+    "description": _text,
+}
+
+
+def compile_schema(schema: dict[str, Any]) -> dict[str, Converter]:
+    """Turn a field specification into a table of converters (nested dicts become structs)."""
+    return {
+        field: _struct(kind) if isinstance(kind, dict) else kind
+        for field, kind in schema.items()
+    }
+
+
+def serialize(compiled: dict[str, Converter], data: dict) -> dict:
+    """
+    Convert data with a compiled schema in one pass.
+
+    Fields the schema does not describe only get their numbers normalized.
+    """
+    result = {}
+    for field, value in data.items():
+        convert = compiled.get(field)
+        result[field] = (
+            convert(field, value) if convert is not None else validate_and_normalize_numbers(value)
+        )
+    return result
+
+
+_COMPILED_RESUME_SCHEMA = compile_schema(RESUME_SCHEMA)
+
+
+def serialize_resume(resume: dict) -> dict:
+    """Validate and clean resume fields for Firestore (see RESUME_SCHEMA)."""
+    return serialize(_COMPILED_RESUME_SCHEMA, resume)
@@ -0,0 +1,309 @@
+"""
+Supervised background saves of finished resumes.
+
+The survey reply does not wait for Firestore: the finished resume is journaled
+locally, handed to ResumeSaveSupervisor and saved in a background task with retries
+and exponential backoff. Saves are serialized per user and a newer resume replaces
+one that is still waiting. When a save finally fails the resume stays in the journal
+(replayed on the next start) and on_failure is called so the user can be told.
+
+save() may only queue the resume (write-behind): with is_persisted given, a saved
+resume stays journaled until is_persisted(user_id) is true at a confirm_persisted()
+call, i.e. until it has actually been flushed to Firestore. If the queue gives up
+on the write instead, persist_failed() reports it through on_failure.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from firebase_db.journal import DEFAULT_JOURNAL_DIR, WriteJournal
+
+logger = logging.getLogger(__name__)
+
+RESUME_SAVE_MAX_ATTEMPTS = int(os.getenv("RESUME_SAVE_MAX_ATTEMPTS", "5"))
+RESUME_SAVE_BACKOFF = float(os.getenv("RESUME_SAVE_BACKOFF", "1.0"))
+RESUME_SAVE_MAX_BACKOFF = float(os.getenv("RESUME_SAVE_MAX_BACKOFF", "30.0"))
+RESUME_SAVE_SHUTDOWN_TIMEOUT = float(os.getenv("RESUME_SAVE_SHUTDOWN_TIMEOUT", "10.0"))
+RESUME_SAVE_JOURNAL_PATH = os.getenv(
+    "RESUME_SAVE_JOURNAL_PATH", str(DEFAULT_JOURNAL_DIR / "resume_saves.jsonl")
+)
+
+# Fields that identify the resume owner and are never changed by an update
+OWNER_FIELDS = ("user_id", "username")
+
+SaveResume = Callable[[dict], Awaitable[Optional[str]]]
+OnSaveFailed = Callable[[int], Awaitable[None]]
+IsPersisted = Callable[[int], bool]
+
+
+class ResumeSaveSupervisor:
+    """
+    Runs resume saves in supervised background tasks.
+
+    save() must persist the resume and return its document ID, or None on failure
+    (exceptions are treated as failures too).
+    """
+
+    def __init__(
+        self,
+        save: SaveResume,
+        journal: WriteJournal,
+        on_failure: Optional[OnSaveFailed] = None,
+        max_attempts: int = RESUME_SAVE_MAX_ATTEMPTS,
+        backoff: float = RESUME_SAVE_BACKOFF,
+        max_backoff: float = RESUME_SAVE_MAX_BACKOFF,
+        is_persisted: Optional[IsPersisted] = None,
+    ):
+        self._save = save
+        self._is_persisted = is_persisted
+        self._journal = journal
+        self._on_failure = on_failure
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        # Newest resume per user not picked up by its worker yet
+        self._latest: dict[int, dict] = {}
+        # Resume a worker is currently saving
+        self._current: dict[int, dict] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._in_attempt: set[int] = set()
+        self._discarded: set[int] = set()
+        self._journal_entries: dict[int, dict[str, Any]] = {}
+        # Saved, but still queued for Firestore - journaled until confirm_persisted()
+        self._awaiting_flush: set[int] = set()
+
+        self.submitted = 0
+        self.superseded = 0
+        self.saved = 0
+        self.failed = 0
+        self.retries = 0
+        self.max_save_latency = 0.0
+        self.total_save_latency = 0.0
+
+    async def submit(self, user_id: int, resume: dict) -> None:
+        """Journal a resume and save it in the background."""
+        entry = {"user_id": user_id, "resume": resume}
+        await asyncio.to_thread(self._journal.append, [entry])
+        self._journal_entries[user_id] = entry
+        # A flush of the previous save doesn't cover this resume
+        self._awaiting_flush.discard(user_id)
+        self._enqueue(user_id, resume)
+
+    def _enqueue(self, user_id: int, resume: dict) -> None:
+        if user_id in self._latest:
+            self.superseded += 1
+        self._latest[user_id] = resume
+        self._discarded.discard(user_id)
+        self.submitted += 1
+        if user_id not in self._workers:
+            self._workers[user_id] = asyncio.create_task(self._run(user_id))
+
+    def pending(self, user_id: int) -> Optional[dict]:
+        """Get the newest resume of a user that is not persisted yet (read-your-writes)."""
+        resume = self._latest.get(user_id) or self._current.get(user_id)
+        return dict(resume) if resume is not None else None
+
+    async def amend(self, user_id: int, updates: dict) -> bool:
+        """
+        Apply an update to a resume whose save is still pending.
+
+        Returns False if nothing is pending for the user - the update then has to go
+        to Firestore as usual.
+        """
+        resume = self._latest.get(user_id) or self._current.get(user_id)
+        if resume is None:
+            return False
+        amended = {**resume, **{k: v for k, v in updates.items() if k not in OWNER_FIELDS}}
+        await self.submit(user_id, amended)
+        return True
+
+    async def discard(self, user_id: int) -> None:
+        """
+        Drop the pending save of a resume that is being deleted.
+
+        An attempt already sent to Firestore is waited for, so it cannot land after
+        the delete.
+        """
+        self._latest.pop(user_id, None)
+        task = self._workers.get(user_id)
+        if task is not None:
+            if user_id in self._in_attempt:
+                self._discarded.add(user_id)
+                await asyncio.wait([task])
+            else:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._awaiting_flush.discard(user_id)
+        if self._journal_entries.pop(user_id, None) is not None:
+            await self._rewrite_journal()
+
+    async def confirm_persisted(self, user_ids: list[int]) -> None:
+        """
+        Drop journal entries of saved resumes that have reached Firestore.
+
+        Called after a write-behind flush; a user whose resume is queued again (a
+        newer write is pending) stays journaled.
+        """
+        confirmed = [
+            user_id
+            for user_id in user_ids
+            if user_id in self._awaiting_flush
+            and (self._is_persisted is None or self._is_persisted(user_id))
+        ]
+        if not confirmed:
+            return
+        for user_id in confirmed:
+            self._awaiting_flush.discard(user_id)
+            self._journal_entries.pop(user_id, None)
+        await self._rewrite_journal()
+
+    async def persist_failed(self, user_ids: list[int]) -> None:
+        """
+        Report saved resumes whose queued write was given up on.
+
+        Called when write-behind drops writes after its retries; users still
+        waiting for the flush get on_failure. The write itself stays in the
+        write-behind journal, so the save journal entry is dropped.
+        """
+        failed = [user_id for user_id in user_ids if user_id in self._awaiting_flush]
+        if not failed:
+            return
+        for user_id in failed:
+            self._awaiting_flush.discard(user_id)
+            self._journal_entries.pop(user_id, None)
+        await self._rewrite_journal()
+        for user_id in failed:
+            self.failed += 1
+            logger.error(f"Queued resume save was given up on - user_id: {user_id}")
+            await self._report_failure(user_id)
+
+    async def _run(self, user_id: int) -> None:
+        try:
+            while user_id in self._latest and user_id not in self._discarded:
+                resume = self._current[user_id] = self._latest.pop(user_id)
+                await self._save_with_retries(user_id, resume)
+        finally:
+            self._current.pop(user_id, None)
+            self._workers.pop(user_id, None)
+            self._discarded.discard(user_id)
+
+    async def _save_with_retries(self, user_id: int, resume: dict) -> None:
+        started_at = time.monotonic()
+        for attempt in range(1, self.max_attempts + 1):
+            self._in_attempt.add(user_id)
+            try:
+                doc_id = await self._save(resume)
+            except Exception as e:
+                logger.error(f"Resume save failed - user_id: {user_id}, error: {str(e)}")
+                doc_id = None
+            finally:
+                self._in_attempt.discard(user_id)
+
+            if user_id in self._discarded:
+                return
+            if doc_id:
+                latency = time.monotonic() - started_at
+                self.saved += 1
+                self.total_save_latency += latency
+                self.max_save_latency = max(self.max_save_latency, latency)
+                if user_id not in self._latest:
+                    # Nothing newer was journaled meanwhile
+                    if self._is_persisted is not None and not self._is_persisted(user_id):
+                        # Only queued so far; keep the entry until the queue has flushed
+                        self._awaiting_flush.add(user_id)
+                    else:
+                        self._journal_entries.pop(user_id, None)
+                        await self._rewrite_journal()
+                return
+            if user_id in self._latest:
+                # A newer resume replaces this one, retrying the old one is pointless
+                self.superseded += 1
+                return
+            if attempt < self.max_attempts:
+                self.retries += 1
+                delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+                logger.warning(
+                    f"Retrying resume save in {delay:.1f}s - user_id: {user_id}, "
+                    f"attempt: {attempt}/{self.max_attempts}"
+                )
+                await asyncio.sleep(delay)
+
+        self.failed += 1
+        logger.error(
+            f"Giving up on resume save after {self.max_attempts} attempts, "
+            f"kept in journal - user_id: {user_id}"
+        )
+        await self._report_failure(user_id)
+
+    async def _report_failure(self, user_id: int) -> None:
+        if self._on_failure is not None:
+            try:
+                await self._on_failure(user_id)
+            except Exception as e:
+                logger.error(f"Resume save failure callback failed - user_id: {user_id}: {e}")
+
+    async def _rewrite_journal(self) -> None:
+        await asyncio.to_thread(self._journal.rewrite, list(self._journal_entries.values()))
+
+    async def start(self) -> None:
+        """Replay resumes journaled by a previous run."""
+        entries = await asyncio.to_thread(self._journal.load)
+        replay: dict[int, dict[str, Any]] = {}
+        for entry in entries:
+            try:
+                user_id = int(entry["user_id"])
+                if not isinstance(entry["resume"], dict):
+                    raise TypeError("resume is not a dict")
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping invalid resume save journal entry: {entry}")
+                continue
+            # Later entries are newer resumes of the same user
+            replay[user_id] = entry
+        if not replay:
+            return
+        logger.info(f"Replaying {len(replay)} journaled resume saves")
+        self._journal_entries.update(replay)
+        # Compact the journal to one entry per user
+        await self._rewrite_journal()
+        for user_id, entry in replay.items():
+            self._enqueue(user_id, entry["resume"])
+
+    async def stop(self, timeout: float = RESUME_SAVE_SHUTDOWN_TIMEOUT) -> None:
+        """
+        Give running saves up to timeout seconds, then cancel the rest.
+
+        Cancelled saves stay in the journal and are replayed on the next start.
+        """
+        workers = list(self._workers.values())
+        if workers:
+            _, still_running = await asyncio.wait(workers, timeout=timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.gather(*still_running, return_exceptions=True)
+                logger.warning(
+                    f"{len(still_running)} resume saves unfinished at shutdown, kept in journal"
+                )
+        logger.info(f"Resume save supervisor stopped - stats: {self.stats()}")
+
+    def stats(self) -> dict[str, Any]:
+        """Get save counts, retries and save latency (seconds, including retries)."""
+        return {
+            "running": len(self._workers),
+            "journaled": len(self._journal_entries),
+            "awaiting_flush": len(self._awaiting_flush),
+            "submitted": self.submitted,
+            "superseded": self.superseded,
+            "saved": self.saved,
+            "failed": self.failed,
+            "retries": self.retries,
+            "avg_save_latency": self.total_save_latency / self.saved if self.saved else 0.0,
+            "max_save_latency": self.max_save_latency,
+        }
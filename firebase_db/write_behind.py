@@ -0,0 +1,336 @@
+"""
+Optional write-behind queue for resume writes.
+
+Writes are coalesced per user_id so only the latest state of each resume is kept,
+and flushed as Firestore WriteBatch commits of up to 500 operations - when the
+queue is full or on a timer. Writes that still fail are kept for retry with exponential
+backoff and mirrored to a local journal, which is replayed on the next start.
+Writes given up on after max_attempts are reported through on_failed.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from firebase_db.journal import DEFAULT_JOURNAL_DIR, WriteJournal
+
+logger = logging.getLogger(__name__)
+
+# Firestore limit of operations per WriteBatch
+FIRESTORE_MAX_BATCH_OPERATIONS = 500
+
+RESUME_WRITE_BEHIND = os.getenv("RESUME_WRITE_BEHIND", "").strip().lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_BATCH = min(
+    int(os.getenv("WRITE_BEHIND_MAX_BATCH", str(FIRESTORE_MAX_BATCH_OPERATIONS))),
+    FIRESTORE_MAX_BATCH_OPERATIONS,
+)
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+# Delay before retrying a failed write (seconds), doubled per attempt up to the max
+WRITE_BEHIND_RETRY_BACKOFF = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF", "1.0"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "60.0"))
+WRITE_BEHIND_JOURNAL_PATH = os.getenv(
+    "WRITE_BEHIND_JOURNAL_PATH", str(DEFAULT_JOURNAL_DIR / "resume_write_behind.jsonl")
+)
+
+# Fields that identify the resume owner and are never changed by an update
+OWNER_FIELDS = ("user_id", "username")
+
+
+@dataclass
+class PendingWrite:
+    """Latest pending write for one resume."""
+
+    op: str  # "set", "update" or "delete"
+    data: Optional[dict] = None
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # monotonic time before which a failed write is not retried
+    retry_at: float = 0.0
+
+    def merge(self, newer: "PendingWrite") -> "PendingWrite":
+        """Coalesce a newer write on top of this one, keeping only the final state."""
+        if newer.op != "update":
+            return newer
+        if self.op == "delete":
+            # Update of a deleted resume would fail with NotFound - the delete wins
+            return self
+        return PendingWrite(
+            op=self.op,
+            data={**self.data, **newer.data},
+            attempts=self.attempts,
+            enqueued_at=self.enqueued_at,
+            retry_at=self.retry_at,
+        )
+
+    def apply(self, resume: Optional[dict]) -> Optional[dict]:
+        """Apply this write to a resume as read from Firestore (read-your-writes)."""
+        if self.op == "delete":
+            return None
+        if self.op == "set":
+            return dict(self.data)
+        if resume is None:
+            return None
+        return {**resume, **{k: v for k, v in self.data.items() if k not in OWNER_FIELDS}}
+
+    def to_journal(self, user_id: int) -> dict[str, Any]:
+        return {"user_id": user_id, "op": self.op, "data": self.data}
+
+
+CommitWrites = Callable[[list[tuple[int, PendingWrite]]], Awaitable[None]]
+OnFlushed = Callable[[list[int]], Awaitable[None]]
+OnFailed = Callable[[list[int]], Awaitable[None]]
+
+
+class ResumeWriteBehindQueue:
+    """
+    Coalescing write-behind queue flushed as Firestore batch commits.
+
+    commit() must write the given resumes in one batch and raise on failure.
+    A failed batch is retried write by write so one bad write doesn't block
+    the others. on_flushed(user_ids) is awaited after writes are committed,
+    on_failed(user_ids) after writes have failed max_attempts times.
+    """
+
+    def __init__(
+        self,
+        commit: CommitWrites,
+        journal: WriteJournal,
+        max_batch_size: int = WRITE_BEHIND_MAX_BATCH,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+        on_flushed: Optional[OnFlushed] = None,
+        retry_backoff: float = WRITE_BEHIND_RETRY_BACKOFF,
+        max_backoff: float = WRITE_BEHIND_MAX_BACKOFF,
+        on_failed: Optional[OnFailed] = None,
+    ):
+        self._commit = commit
+        self._journal = journal
+        self.max_batch_size = max(1, min(max_batch_size, FIRESTORE_MAX_BATCH_OPERATIONS))
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._on_flushed = on_flushed
+        self._on_failed = on_failed
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+
+        self._pending: dict[int, PendingWrite] = {}
+        self._in_flight: dict[int, PendingWrite] = {}
+        self._journal_entries: dict[int, dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.writes_committed = 0
+        self.writes_failed = 0
+        self.last_batch_size = 0
+        self.max_batch_size_seen = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def enqueue(self, user_id: int, write: PendingWrite) -> None:
+        """Queue a write, coalescing it with any pending write for the same resume."""
+        previous = self._pending.get(user_id)
+        if previous is not None:
+            self.coalesced += 1
+            write = previous.merge(write)
+        self._pending[user_id] = write
+        self.enqueued += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def overlay(self, user_id: int, resume: Optional[dict]) -> Optional[dict]:
+        """Apply not yet persisted writes to a resume read from Firestore."""
+        for writes in (self._in_flight, self._pending):
+            write = writes.get(user_id)
+            if write is not None:
+                resume = write.apply(resume)
+        return resume
+
+    def has_pending(self, user_id: int) -> bool:
+        return user_id in self._pending or user_id in self._in_flight
+
+    async def start(self) -> None:
+        """Replay journaled writes and start the periodic flush task."""
+        entries = await asyncio.to_thread(self._journal.load)
+        for entry in entries:
+            try:
+                user_id = int(entry["user_id"])
+                write = PendingWrite(op=entry["op"], data=entry.get("data"))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping invalid write-behind journal entry: {entry}")
+                continue
+            self._journal_entries[user_id] = entry
+            self.enqueue(user_id, write)
+        if entries:
+            logger.info(f"Replaying {len(entries)} journaled resume writes")
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and flush everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info(f"Write-behind queue stopped - stats: {self.stats()}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush(due_only=True)
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {str(e)}", exc_info=True)
+
+    async def flush(self, due_only: bool = False) -> None:
+        """
+        Commit pending writes in batches of up to max_batch_size.
+
+        With due_only, failed writes still backing off are left for a later flush.
+        """
+        async with self._flush_lock:
+            # Writes that failed during this flush are not retried before the next one
+            retried: set[int] = set()
+            while True:
+                now = time.monotonic()
+                user_ids = [
+                    user_id
+                    for user_id, write in self._pending.items()
+                    if user_id not in retried and (not due_only or write.retry_at <= now)
+                ][: self.max_batch_size]
+                if not user_ids:
+                    break
+                batch = [(user_id, self._pending.pop(user_id)) for user_id in user_ids]
+                retried.update(await self._flush_batch(batch))
+
+    async def _flush_batch(self, batch: list[tuple[int, PendingWrite]]) -> list[int]:
+        """Commit one batch; returns the user_ids of writes queued again for retry."""
+        started_at = time.monotonic()
+        self._in_flight = dict(batch)
+        failed: list[tuple[int, PendingWrite]] = []
+        try:
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                if len(batch) > 1:
+                    logger.warning(
+                        f"Batch commit of {len(batch)} resume writes failed, "
+                        f"retrying one by one: {str(e)}"
+                    )
+                    failed = await self._commit_one_by_one(batch)
+                else:
+                    self._log_failed_write(batch[0], e)
+                    failed = batch
+        finally:
+            self._in_flight = {}
+
+        # Failed writes go back to the queue right away, so overlay() and has_pending()
+        # keep seeing them; newer writes are merged on top of them
+        retried: list[int] = []
+        given_up: list[int] = []
+        for user_id, write in failed:
+            write.attempts += 1
+            self._journal_entries[user_id] = write.to_journal(user_id)
+            if write.attempts < self.max_attempts:
+                delay = min(self.retry_backoff * 2 ** (write.attempts - 1), self.max_backoff)
+                write.retry_at = time.monotonic() + delay
+                newer = self._pending.get(user_id)
+                self._pending[user_id] = write.merge(newer) if newer is not None else write
+                retried.append(user_id)
+            else:
+                logger.error(
+                    f"Giving up on resume write after {write.attempts} attempts, "
+                    f"kept in journal - user_id: {user_id}"
+                )
+                given_up.append(user_id)
+
+        failed_ids = {user_id for user_id, _ in failed}
+        flushed_ids = [user_id for user_id, _ in batch if user_id not in failed_ids]
+        if self._on_flushed and flushed_ids:
+            try:
+                await self._on_flushed(flushed_ids)
+            except Exception as e:
+                # The writes are committed; a failing callback must not turn them into retries
+                logger.error(f"Write-behind on_flushed callback failed: {str(e)}", exc_info=True)
+
+        latency = time.monotonic() - started_at
+        self.batches += 1
+        self.writes_committed += len(flushed_ids)
+        self.writes_failed += len(failed)
+        self.last_batch_size = len(batch)
+        self.max_batch_size_seen = max(self.max_batch_size_seen, len(batch))
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+        journal_changed = bool(failed)
+        for user_id in flushed_ids:
+            journal_changed |= self._journal_entries.pop(user_id, None) is not None
+        if journal_changed:
+            await asyncio.to_thread(self._journal.rewrite, list(self._journal_entries.values()))
+
+        if self._on_failed and given_up:
+            try:
+                await self._on_failed(given_up)
+            except Exception as e:
+                logger.error(f"Write-behind on_failed callback failed: {str(e)}", exc_info=True)
+        return retried
+
+    async def _commit_one_by_one(
+        self, batch: list[tuple[int, PendingWrite]]
+    ) -> list[tuple[int, PendingWrite]]:
+        failed = []
+        for item in batch:
+            try:
+                await self._commit([item])
+            except Exception as e:
+                self._log_failed_write(item, e)
+                failed.append(item)
+        return failed
+
+    @staticmethod
+    def _log_failed_write(item: tuple[int, PendingWrite], error: Exception) -> None:
+        user_id, write = item
+        logger.error(
+            f"Resume write failed - user_id: {user_id}, op: {write.op}, error: {str(error)}"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Get queue metrics (batch sizes, flush latency, failures)."""
+        return {
+            "pending": len(self._pending),
+            "journaled": len(self._journal_entries),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "writes_committed": self.writes_committed,
+            "writes_failed": self.writes_failed,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size_seen,
+            "avg_batch_size": (
+                (self.writes_committed + self.writes_failed) / self.batches if self.batches else 0.0
+            ),
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "avg_flush_latency": self.total_flush_latency / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime
+
+import admission
+import pytest
+from admission import AdmissionMiddleware, create_admission_middleware
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from build_resume.stage_resume import ResumeForm
+
+USER = User(id=42, is_bot=False, first_name="Іван")
+CHAT = Chat(id=42, type="private")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Record overload replies to messages and callbacks."""
+    sent = []
+
+    async def answer(self, text, **kwargs):
+        sent.append(("message", text))
+
+    async def safe_callback_answer(callback, text=None, show_alert=False):
+        sent.append(("callback", text))
+
+    monkeypatch.setattr(Message, "answer", answer)
+    monkeypatch.setattr(admission, "safe_callback_answer", safe_callback_answer)
+    return sent
+
+
+def message_update(update_id: int) -> Update:
+    message = Message(
+        message_id=update_id, date=datetime.now(), chat=CHAT, from_user=USER, text="/start"
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def callback_update(update_id: int) -> Update:
+    callback = CallbackQuery(id=str(update_id), from_user=USER, chat_instance="42", data="cat_1")
+    return Update(update_id=update_id, callback_query=callback)
+
+
+async def feed(middleware, updates, raw_state=None) -> list[int]:
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.update_id)
+
+    for update in updates:
+        await middleware(handler, update, {"raw_state": raw_state})
+    return handled
+
+
+def test_admission_control_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("ADMISSION_RATE", raising=False)
+    assert create_admission_middleware() is None
+
+
+def test_admission_control_from_env(monkeypatch):
+    monkeypatch.setenv("ADMISSION_RATE", "30")
+    monkeypatch.delenv("ADMISSION_BURST", raising=False)
+    middleware = create_admission_middleware()
+    assert middleware is not None
+    assert middleware.bucket.rate == 30
+    assert middleware.bucket.capacity == 60
+
+
+def test_updates_above_the_rate_are_shed(clock, replies):
+    middleware = AdmissionMiddleware(rate=10, burst=5, priority_reserve=0)
+    handled = asyncio.run(feed(middleware, [message_update(i) for i in range(7)]))
+    assert handled == [0, 1, 2, 3, 4]
+    # One token is back after 1/rate seconds
+    clock.now += 0.1
+    handled = asyncio.run(feed(middleware, [message_update(i) for i in range(7, 9)]))
+    assert handled == [7]
+    assert middleware.stats() == {
+        "admitted": 6,
+        "admitted_priority": 0,
+        "shed": 3,
+        "shed_priority": 0,
+        "shed_replies": 3,
+    }
+
+
+def test_survey_updates_may_use_the_priority_reserve(clock, replies):
+    middleware = AdmissionMiddleware(
+        rate=1, burst=4, priority_reserve=0.5, priority_states=ResumeForm
+    )
+    new = asyncio.run(feed(middleware, [message_update(i) for i in range(3)]))
+    survey = asyncio.run(
+        feed(middleware, [callback_update(i) for i in range(3, 6)], ResumeForm.name.state)
+    )
+    # New traffic stops at the reserve, survey updates take the rest of the bucket
+    assert new == [0, 1]
+    assert survey == [3, 4]
+    stats = middleware.stats()
+    assert (stats["admitted"], stats["admitted_priority"]) == (4, 2)
+    assert (stats["shed"], stats["shed_priority"]) == (2, 1)
+
+
+def test_state_outside_the_priority_group_gets_no_reserve(clock, replies):
+    middleware = AdmissionMiddleware(
+        rate=1, burst=4, priority_reserve=0.5, priority_states=ResumeForm
+    )
+    handled = asyncio.run(
+        feed(middleware, [message_update(i) for i in range(3)], "EditResume:field")
+    )
+    assert handled == [0, 1]
+
+
+def test_shed_replies_are_rate_limited(clock, replies):
+    middleware = AdmissionMiddleware(rate=1, burst=1, priority_reserve=0, shed_reply_rate=2)
+    updates = [message_update(0)] + [callback_update(i) for i in range(1, 3)]
+    updates += [message_update(i) for i in range(3, 6)]
+    asyncio.run(feed(middleware, updates))
+    # Five updates shed, only the first two get the overload reply
+    assert replies == [("callback", admission.msg_overloaded)] * 2
+    # Half a second later the update is still shed, but there is a reply token again
+    clock.now += 0.5
+    asyncio.run(feed(middleware, [message_update(6)]))
+    assert replies[-1] == ("message", admission.msg_overloaded)
+    stats = middleware.stats()
+    assert (stats["admitted"], stats["shed"], stats["shed_replies"]) == (1, 6, 3)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import CallbackQuery, Update, User
+from callback_router import CallbackRouter
+
+USER = User(id=42, is_bot=False, first_name="Іван")
+
+
+def handler(name: str):
+    async def handle(callback, state):
+        return name
+
+    handle.__name__ = name
+    return handle
+
+
+def router() -> CallbackRouter:
+    router = CallbackRouter()
+    router.exact("edit_resume_menu", handler("menu"))
+    router.exact("edit_field_name", handler("name_exact"))
+    router.prefix("edit_", handler("edit"))
+    router.prefix("edit_field_", handler("field"))
+    router.prefix("region_", handler("region"))
+    return router
+
+
+def resolved(router: CallbackRouter, callback_data: str) -> str | None:
+    handle = router.resolve(callback_data)
+    return handle.__name__ if handle else None
+
+
+def test_exact_match_wins_over_prefixes():
+    assert resolved(router(), "edit_resume_menu") == "menu"
+    assert resolved(router(), "edit_field_name") == "name_exact"
+
+
+def test_longest_prefix_wins():
+    assert resolved(router(), "edit_field_age") == "field"
+    assert resolved(router(), "edit_other") == "edit"
+    assert resolved(router(), "region_Ky") == "region"
+    # A prefix on its own is a match too
+    assert resolved(router(), "region_") == "region"
+
+
+def test_unrouted_callback_data():
+    assert resolved(router(), "edit") is None
+    assert resolved(router(), "unknown") is None
+    assert resolved(router(), "") is None
+    callback = CallbackQuery(id="1", from_user=USER, chat_instance="test", data="unknown")
+    assert router().match(callback) is False
+
+
+def test_duplicate_routes_are_rejected():
+    with pytest.raises(ValueError):
+        router().exact("edit_resume_menu", handler("again"))
+    with pytest.raises(ValueError):
+        router().prefix("region_", handler("again"))
+
+
+def test_dispatcher_routes_callbacks_through_one_handler():
+    async def run():
+        calls = []
+        callback_router = CallbackRouter()
+
+        async def process_region(callback, state):
+            calls.append(("region", callback.data, await state.get_state()))
+
+        callback_router.prefix("region_", process_region)
+        dp = Dispatcher()
+        callback_router.register(dp)
+        bot = Bot("42:TEST")
+        for update_id, data in enumerate(("region_Ky", "unknown")):
+            callback = CallbackQuery(
+                id=str(update_id), from_user=USER, chat_instance="test", data=data
+            )
+            await dp.feed_update(bot, Update(update_id=update_id, callback_query=callback))
+        await bot.session.close()
+        return calls, len(dp.callback_query.handlers)
+
+    calls, handlers = asyncio.run(run())
+    assert calls == [("region", "region_Ky", None)]
+    assert handlers == 1
@@ -0,0 +1,310 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+
+from firebase_db import crud  # noqa: E402
+from firebase_db.journal import WriteJournal  # noqa: E402
+from firebase_db.supervisor import ResumeSaveSupervisor  # noqa: E402
+
+RESUME = {
+    "user_id": 42,
+    "username": "",
+    "name": "Іван 🚚",
+    "age": 35,
+    "driving_categories": ["C", "CE"],
+    "description": "Досвід 👍",
+}
+
+
+def test_pending_resume_document_matches_a_firestore_read():
+    document = crud.pending_resume_document(RESUME)
+    assert document == {
+        "user_id": 42,
+        "username": None,
+        "name": "Іван",
+        "age": 35,
+        "driving_categories": ["C", "CE"],
+        "description": "Досвід",
+    }
+    # The pending resume itself is left as it is
+    assert RESUME["name"] == "Іван 🚚"
+
+
+def test_get_resume_serializes_a_pending_save(tmp_path, monkeypatch):
+    async def never_saved(resume):
+        await asyncio.Event().wait()
+
+    async def load(user_id, loader):
+        return None
+
+    async def run():
+        supervisor = ResumeSaveSupervisor(
+            save=never_saved, journal=WriteJournal(tmp_path / "saves.jsonl")
+        )
+        monkeypatch.setattr(crud, "_resume_saves", supervisor)
+        monkeypatch.setattr(crud._resume_cache, "get_or_load", load)
+        await supervisor.submit(42, RESUME)
+        resume = await crud.get_resume(42)
+        await supervisor.stop(timeout=0)
+        return resume
+
+    assert asyncio.run(run()) == crud.pending_resume_document(RESUME)
+
+
+def test_save_through_write_behind_is_journaled_until_flushed(tmp_path, monkeypatch):
+    from firebase_db.write_behind import ResumeWriteBehindQueue
+
+    committed = []
+
+    async def commit(writes):
+        committed.extend(user_id for user_id, _ in writes)
+
+    async def run():
+        queue = ResumeWriteBehindQueue(
+            commit=commit,
+            journal=WriteJournal(tmp_path / "write_behind.jsonl"),
+            on_flushed=crud._invalidate_flushed,
+        )
+        supervisor = ResumeSaveSupervisor(
+            save=crud.add_resume,
+            journal=WriteJournal(tmp_path / "saves.jsonl"),
+            is_persisted=crud._is_persisted,
+        )
+        monkeypatch.setattr(crud, "_write_behind", queue)
+        monkeypatch.setattr(crud, "_resume_saves", supervisor)
+        await supervisor.submit(42, RESUME)
+        await supervisor.stop()
+        # add_resume only queued it: a crash now must not lose the resume
+        before_flush = supervisor.stats()["journaled"]
+        await queue.flush()
+        return before_flush, supervisor.stats()
+
+    before_flush, stats = asyncio.run(run())
+    assert before_flush == 1
+    assert committed == [42]
+    assert (stats["journaled"], stats["awaiting_flush"]) == (0, 0)
+    assert WriteJournal(tmp_path / "saves.jsonl").load() == []
+
+
+def test_add_resume_sync_writes_without_reading_back(monkeypatch):
+    from unittest.mock import MagicMock
+
+    db = MagicMock()
+    monkeypatch.setattr(crud, "get_firestore_client", lambda: db)
+    monkeypatch.setattr(crud, "FIRESTORE_VERIFY_WRITES", False)
+
+    assert crud.add_resume_sync(RESUME) == "42"
+    doc_ref = db.collection.return_value.document.return_value
+    db.collection.assert_called_with("resumes")
+    doc_ref.set.assert_called_once()
+    doc_ref.get.assert_not_called()
+
+    monkeypatch.setattr(crud, "FIRESTORE_VERIFY_WRITES", True)
+    crud.add_resume_sync(RESUME)
+    doc_ref.get.assert_called_once()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(crud, "time", clock)
+    return clock
+
+
+def counting_loader(resumes: dict):
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        return resumes.get(user_id)
+
+    return load, loads
+
+
+def test_resume_cache_expires_after_ttl(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=10)
+    load, loads = counting_loader({42: RESUME})
+
+    async def run():
+        first = await cache.get_or_load(42, load)
+        clock.now += 59
+        second = await cache.get_or_load(42, load)
+        clock.now += 2
+        third = await cache.get_or_load(42, load)
+        return first, second, third
+
+    assert asyncio.run(run()) == (RESUME, RESUME, RESUME)
+    assert loads == [42, 42]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_resume_cache_evicts_least_recently_used(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=2)
+    load, loads = counting_loader({1: {"user_id": 1}, 2: {"user_id": 2}, 3: {"user_id": 3}})
+
+    async def run():
+        for user_id in (1, 2, 1, 3):
+            await cache.get_or_load(user_id, load)
+        # 2 was used least recently
+        for user_id in (1, 3, 2):
+            await cache.get_or_load(user_id, load)
+
+    asyncio.run(run())
+    assert loads == [1, 2, 3, 2]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_resume_cache_caches_missing_resumes(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=10)
+    load, loads = counting_loader({})
+
+    async def run():
+        return [await cache.get_or_load(7, load) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert loads == [7]
+
+
+def test_resume_cache_shares_concurrent_loads(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=10)
+    loads = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def load(user_id):
+            loads.append(user_id)
+            await release.wait()
+            return dict(RESUME)
+
+        readers = [asyncio.create_task(cache.get_or_load(42, load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*readers)
+
+    results = asyncio.run(run())
+    assert loads == [42]
+    assert results == [RESUME] * 3
+    # Every caller gets its own copy
+    results[0]["name"] = "changed"
+    assert results[1]["name"] == RESUME["name"]
+
+
+def test_resume_cache_drops_load_invalidated_in_flight(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=10)
+    loads = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def stale_load(user_id):
+            loads.append("stale")
+            await release.wait()
+            return {"name": "old"}
+
+        async def fresh_load(user_id):
+            loads.append("fresh")
+            return {"name": "new"}
+
+        reader = asyncio.create_task(cache.get_or_load(42, stale_load))
+        await asyncio.sleep(0)
+        # The resume is written while it is being read
+        cache.invalidate(42)
+        release.set()
+        stale = await reader
+        return stale, await cache.get_or_load(42, fresh_load)
+
+    stale, fresh = asyncio.run(run())
+    assert stale == {"name": "old"}
+    assert fresh == {"name": "new"}
+    assert loads == ["stale", "fresh"]
+
+
+def test_resume_cache_does_not_cache_failed_loads(clock):
+    cache = crud.ResumeCache(ttl=60, max_size=10)
+    attempts = []
+
+    async def load(user_id):
+        attempts.append(user_id)
+        if len(attempts) == 1:
+            raise RuntimeError("Firestore unavailable")
+        return RESUME
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load(42, load)
+        return await cache.get_or_load(42, load)
+
+    assert asyncio.run(run()) == RESUME
+    assert attempts == [42, 42]
+
+
+def firestore_mock(monkeypatch, module, mock_type):
+    """A client mock whose resume document writes are mock_type methods."""
+    from unittest.mock import MagicMock
+
+    db = MagicMock()
+    doc_ref = db.collection.return_value.document.return_value
+    doc_ref.update = mock_type()
+    doc_ref.delete = mock_type()
+    getter = "get_firestore_client" if module is crud else "get_async_firestore_client"
+    monkeypatch.setattr(module, getter, lambda: db)
+    return db, doc_ref
+
+
+def test_update_and_delete_sync_are_single_conditional_writes(monkeypatch):
+    from unittest.mock import MagicMock
+
+    from google.api_core.exceptions import NotFound
+
+    db, doc_ref = firestore_mock(monkeypatch, crud, MagicMock)
+
+    assert crud.update_resume_sync(42, {"age": 36, "user_id": 7})
+    payload = doc_ref.update.call_args.args[0]
+    assert payload["age"] == 36 and "user_id" not in payload
+    assert crud.delete_resume_sync(42)
+    db.write_option.assert_called_with(exists=True)
+    assert doc_ref.delete.call_args.kwargs["option"] is db.write_option.return_value
+    doc_ref.get.assert_not_called()
+
+    # A missing resume is reported by the precondition, not by a read
+    doc_ref.update.side_effect = NotFound("No document to update")
+    doc_ref.delete.side_effect = NotFound("No document to delete")
+    assert crud.update_resume_sync(42, {"age": 36}) is False
+    assert crud.delete_resume_sync(42) is False
+    doc_ref.get.assert_not_called()
+
+    doc_ref.update.side_effect = RuntimeError("unavailable")
+    assert crud.update_resume_sync(42, {"age": 36}) is False
+
+
+def test_update_and_delete_async_map_not_found_to_false(monkeypatch):
+    from unittest.mock import AsyncMock
+
+    from firebase_db import crud_async
+    from google.api_core.exceptions import NotFound
+
+    db, doc_ref = firestore_mock(monkeypatch, crud_async, AsyncMock)
+
+    async def update_and_delete():
+        return [await crud_async.update_resume(42, {"age": 36}), await crud_async.delete_resume(42)]
+
+    async def run():
+        results = await update_and_delete()
+        doc_ref.update.side_effect = NotFound("No document to update")
+        doc_ref.delete.side_effect = NotFound("No document to delete")
+        return results + await update_and_delete()
+
+    assert asyncio.run(run()) == [True, True, False, False]
+    db.write_option.assert_called_with(exists=True)
+    doc_ref.get.assert_not_called()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from firebase_db.executor import FirestoreExecutor
+
+
+def test_results_errors_and_metrics():
+    def fail():
+        raise ValueError("bad document")
+
+    async def run():
+        executor = FirestoreExecutor(max_workers=2, timeout=5)
+        results = [await executor.run(pow, 2, 10), await executor.run(str.upper, "ok")]
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+        await executor.shutdown()
+        return results, executor.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [1024, "OK"]
+    assert (stats["submitted"], stats["completed"], stats["failed"]) == (3, 3, 1)
+    assert (stats["queue_depth"], stats["active"], stats["timed_out"]) == (0, 0, 0)
+
+
+def test_calls_are_bounded_by_max_workers():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def call():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def run():
+        executor = FirestoreExecutor(max_workers=2, timeout=5)
+        await asyncio.gather(*(executor.run(call) for _ in range(6)))
+        await executor.shutdown()
+        return executor.stats()
+
+    stats = asyncio.run(run())
+    assert peak == 2
+    assert stats["max_queue_depth"] >= 3
+    assert stats["max_queue_wait"] > 0
+
+
+def test_timed_out_call_raises_and_queued_call_never_runs():
+    release = threading.Event()
+    ran = []
+
+    def blocking():
+        release.wait(5)
+        ran.append("blocking")
+
+    def queued():
+        ran.append("queued")
+
+    async def run():
+        executor = FirestoreExecutor(max_workers=1, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(blocking)
+        # Waits behind the blocked worker and times out before it gets a thread
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(queued)
+        release.set()
+        await executor.shutdown()
+        return executor.stats()
+
+    stats = asyncio.run(run())
+    assert ran == ["blocking"]
+    assert (stats["timed_out"], stats["completed"], stats["queue_depth"]) == (2, 1, 0)
+
+
+def test_per_call_timeout_override():
+    async def run():
+        executor = FirestoreExecutor(max_workers=1, timeout=0.01)
+        result = await executor.run(time.sleep, 0.05, timeout=0)
+        await executor.shutdown()
+        return result
+
+    assert asyncio.run(run()) is None
+
+
+def test_shut_down_executor_refuses_calls():
+    async def run():
+        executor = FirestoreExecutor()
+        await executor.shutdown()
+        with pytest.raises(RuntimeError):
+            await executor.run(time.time)
+
+    asyncio.run(run())
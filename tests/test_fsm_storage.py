@@ -0,0 +1,148 @@
+import asyncio
+from datetime import timezone
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from fsm_storage import (
+    BufferedFSMContext,
+    InstrumentedStorage,
+    SQLiteStorage,
+    create_redis_storage,
+    pack_data,
+    unpack_data,
+)
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+def firestore_resume() -> dict:
+    """A resume as get_resume returns it from Firestore (server timestamps included)."""
+    return {
+        "user_id": 42,
+        "username": "driver42",
+        "name": "Іван Петренко",
+        "phone": "+380501234567",
+        "age": 35,
+        "place_of_living": {"region_key": "Ky", "region_name": "Київська", "city": "Бровари"},
+        "driving_categories": ["B", "C", "CE"],
+        "driving_experience": {"C": 5, "CE": 3},
+        "semi_trailer_types": ["Тентований"],
+        "types_of_work": ["Міжнародні"],
+        "types_of_cars": ["DAF", "MAN"],
+        "race_duration_preference": ["Рейси до 7 днів"],
+        "is_adr_license": True,
+        "docs_for_driving_abroad": ["Не маю"],
+        "military_booking": False,
+        "desired_salary": 45000,
+        "description": "",
+        "created_at": DatetimeWithNanoseconds(
+            2026, 10, 1, 8, 30, 15, nanosecond=123456789, tzinfo=timezone.utc
+        ),
+        "updated_at": DatetimeWithNanoseconds(2026, 10, 2, 9, 0, 0, tzinfo=timezone.utc),
+    }
+
+
+def edit_flow_data() -> dict:
+    """FSM data of the edit flow after handle_edit_field."""
+    return {
+        "editing_resume": firestore_resume(),
+        "editing_field": "age",
+        "editing_user_id": 42,
+        "editing_username": "driver42",
+        "selected_driver_categories": 0b10011,
+    }
+
+
+def test_pack_round_trip_with_firestore_timestamps():
+    data = edit_flow_data()
+    restored = unpack_data(pack_data(data))
+    assert restored == data
+    created_at = restored["editing_resume"]["created_at"]
+    assert created_at.tzinfo is not None
+    assert created_at.microsecond == 123456
+
+
+def test_pack_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        pack_data({"value": object()})
+
+
+def test_empty_data_is_not_stored():
+    assert pack_data({}) is None
+    assert unpack_data(None) == {}
+
+
+def test_sqlite_storage_round_trip(tmp_path):
+    async def run():
+        storage = SQLiteStorage(tmp_path / "fsm.sqlite3")
+        try:
+            await storage.set_state(KEY, "ResumeForm:age")
+            await storage.set_data(KEY, edit_flow_data())
+            updated = await storage.update_data(KEY, {"age": 36})
+            return await storage.get_state(KEY), await storage.get_data(KEY), updated
+        finally:
+            await storage.close()
+
+    state, data, updated = asyncio.run(run())
+    assert state == "ResumeForm:age"
+    assert data == {**edit_flow_data(), "age": 36}
+    assert updated == data
+
+
+def test_redis_storage_round_trip():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        storage = create_redis_storage("redis://localhost:6379/0")
+        # Local stand-in for the Redis server
+        storage.redis = fakeredis.FakeAsyncRedis()
+        await storage.set_data(KEY, edit_flow_data())
+        data = await storage.get_data(KEY)
+        await storage.set_data(KEY, {})
+        return data, await storage.get_data(KEY)
+
+    data, cleared = asyncio.run(run())
+    assert data == edit_flow_data()
+    assert cleared == {}
+
+
+def test_buffered_context_reads_and_writes_once(tmp_path):
+    async def run():
+        storage = InstrumentedStorage(SQLiteStorage(tmp_path / "fsm.sqlite3"))
+        try:
+            context = BufferedFSMContext(storage, KEY, raw_state=None)
+            await context.update_data(editing_resume=firestore_resume())
+            await context.update_data(editing_field="age")
+            await context.get_data()
+            await context.flush()
+            return storage.stats(), await storage.storage.get_data(KEY)
+        finally:
+            await storage.close()
+
+    stats, stored = asyncio.run(run())
+    assert stats["get_data_calls"] == 1
+    assert stats["set_data_calls"] == 1
+    assert stored == {"editing_resume": firestore_resume(), "editing_field": "age"}
+
+
+def test_instrumented_storage_counts_calls_per_update():
+    storage = InstrumentedStorage(MemoryStorage())
+
+    async def handler(event, data):
+        await storage.get_state(KEY)
+        await storage.update_data(KEY, {"age": event})
+        return event
+
+    async def run():
+        return [await storage.count_update(handler, age, {}) for age in (35, 36)]
+
+    assert asyncio.run(run()) == [35, 36]
+    assert storage.stats() == {
+        "updates": 2,
+        "calls": 4,
+        "calls_per_update": 2.0,
+        "get_state_calls": 2,
+        "update_data_calls": 2,
+    }
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from aiogram.types import Chat, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from constants import SEMI_TRAILERS_TYPES
+from functions import (
+    KeyboardDebouncer,
+    build_selection_keyboard,
+    get_updated_keyboard,
+    selection_items,
+    selection_mask,
+)
+
+
+def keyboard(text: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=text, callback_data=text)]]
+    )
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    """Record edit_reply_markup calls; each one takes 50 ms like an API round trip."""
+    calls = []
+
+    async def edit_reply_markup(self, reply_markup=None, **kwargs):
+        calls.append(("start", reply_markup))
+        await asyncio.sleep(0.05)
+        calls.append(("end", reply_markup))
+
+    monkeypatch.setattr(Message, "edit_reply_markup", edit_reply_markup)
+    return calls
+
+
+def message() -> Message:
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=42, type="private"))
+
+
+def test_debouncer_sends_only_the_latest_keyboard(edits):
+    async def run():
+        debouncer = KeyboardDebouncer(delay=0.02)
+        for text in ("a", "b", "c"):
+            debouncer.schedule(message(), keyboard(text))
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.15)
+        return debouncer.stats()
+
+    stats = asyncio.run(run())
+    assert edits == [("start", keyboard("c")), ("end", keyboard("c"))]
+    assert (stats["scheduled"], stats["sent"], stats["saved"], stats["pending"]) == (3, 1, 2, 0)
+
+
+def test_discard_before_the_deadline_cancels_the_edit(edits):
+    async def run():
+        debouncer = KeyboardDebouncer(delay=0.02)
+        debouncer.schedule(message(), keyboard("a"))
+        await debouncer.discard(message())
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert edits == []
+
+
+def test_discard_waits_for_an_edit_in_flight(edits):
+    async def run():
+        debouncer = KeyboardDebouncer(delay=0.01)
+        debouncer.schedule(message(), keyboard("stale"))
+        await asyncio.sleep(0.03)  # the edit is on its way to Telegram
+        await debouncer.discard(message())
+        # The handler's own change must land after the debounced edit
+        edits.append(("remove", None))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert edits == [
+        ("start", keyboard("stale")),
+        ("end", keyboard("stale")),
+        ("remove", None),
+    ]
+
+
+def test_keyboard_scheduled_during_an_edit_is_sent_after_it(edits):
+    async def run():
+        debouncer = KeyboardDebouncer(delay=0.01)
+        debouncer.schedule(message(), keyboard("a"))
+        await asyncio.sleep(0.03)
+        debouncer.schedule(message(), keyboard("b"))
+        await asyncio.sleep(0.15)
+        return debouncer.stats()
+
+    stats = asyncio.run(run())
+    assert [markup for step, markup in edits if step == "end"] == [keyboard("a"), keyboard("b")]
+    assert stats["pending"] == 0
+
+
+def test_selection_mask_from_legacy_list():
+    assert selection_mask(["Самоскид", "Тентований"], SEMI_TRAILERS_TYPES) == 0b00101
+    # Unknown strings (e.g. options renamed since) are dropped
+    assert selection_mask(["Бочка", "Цистерна"], SEMI_TRAILERS_TYPES) == 0b10000
+    assert selection_mask(None, SEMI_TRAILERS_TYPES) == 0
+    assert selection_mask(0b11, SEMI_TRAILERS_TYPES) == 0b11
+
+
+def test_selection_items_in_options_order():
+    assert selection_items(0b10101, SEMI_TRAILERS_TYPES) == ["Тентований", "Самоскид", "Бочка"]
+    assert selection_items(0, SEMI_TRAILERS_TYPES) == []
+    assert selection_items(["Бочка"], SEMI_TRAILERS_TYPES) == ["Бочка"]
+    assert selection_items(None, SEMI_TRAILERS_TYPES) == []
+    for mask in range(1 << len(SEMI_TRAILERS_TYPES)):
+        items = selection_items(mask, SEMI_TRAILERS_TYPES)
+        assert selection_mask(items, SEMI_TRAILERS_TYPES) == mask
+
+
+def test_selection_keyboard_marks_selected_and_is_cached():
+    options = tuple(SEMI_TRAILERS_TYPES)
+    markup = build_selection_keyboard(options, "trailer_", 0b00010)
+    rows = [row[0] for row in markup.inline_keyboard]
+    assert [button.text for button in rows] == [
+        "Тентований",
+        "Рефрижератор ✔",
+        "Самоскид",
+        "Кран-маніпулятор",
+        "Бочка",
+        rows[-1].text,
+    ]
+    assert [button.callback_data for button in rows] == [
+        "trailer_0",
+        "trailer_1",
+        "trailer_2",
+        "trailer_3",
+        "trailer_4",
+        "trailer_submit",
+    ]
+    assert build_selection_keyboard(options, "trailer_", 0b00010) is markup
+    assert build_selection_keyboard(options, "trailer_", 0b00011) is not markup
+    legacy = asyncio.run(get_updated_keyboard({"Рефрижератор"}, SEMI_TRAILERS_TYPES, "trailer_"))
+    assert legacy is markup
+
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from admission import TokenBucket
+from aiogram.methods import AnswerCallbackQuery, EditMessageReplyMarkup, SendMessage
+from outbound import OutboundScheduler
+
+
+def test_token_bucket_try_take_keeps_reserve():
+    bucket = TokenBucket(rate=1.0, capacity=4)
+    assert bucket.try_take(reserve=2.0)
+    assert not bucket.try_take(reserve=2.5)
+    assert bucket.try_take()
+
+
+def test_token_bucket_reservations_queue_up():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.delay() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    assert not bucket.is_idle()
+
+
+def survey_step_reply() -> list:
+    """API requests of a multi-select step: debounced edit, submit reply, next question."""
+    return [
+        AnswerCallbackQuery(callback_query_id="1"),
+        EditMessageReplyMarkup(chat_id=42, message_id=1),
+        AnswerCallbackQuery(callback_query_id="2"),
+        EditMessageReplyMarkup(chat_id=42, message_id=1),
+        SendMessage(chat_id=42, text="✅ Ви обрали: C, CE"),
+        SendMessage(chat_id=42, text="Наступне питання"),
+    ]
+
+
+async def send_all(scheduler: OutboundScheduler, methods: list) -> None:
+    async def make_request(bot, method):
+        return True
+
+    for method in methods:
+        await scheduler(make_request, None, method)
+
+
+def test_survey_step_reply_is_not_delayed():
+    scheduler = OutboundScheduler()
+    asyncio.run(send_all(scheduler, survey_step_reply()))
+    stats = scheduler.stats()
+    assert stats["edit_max_wait"] < 0.05
+    assert stats["default_max_wait"] < 0.05
+
+
+def test_chat_is_paced_past_the_burst():
+    scheduler = OutboundScheduler(chat_rate=20.0, chat_burst=2.0)
+    messages = [SendMessage(chat_id=42, text=str(i)) for i in range(4)]
+    asyncio.run(send_all(scheduler, messages))
+    # The third and fourth message wait for the chat bucket (50 ms each)
+    assert scheduler.stats()["default_max_wait"] == pytest.approx(0.05, abs=0.03)
@@ -0,0 +1,90 @@
+from firebase_db.resume_schema import (
+    FIRESTORE_MAX_INT,
+    RESUME_SCHEMA,
+    compile_schema,
+    remove_emojis,
+    serialize,
+    serialize_resume,
+)
+
+
+def resume() -> dict:
+    return {
+        "name": "Іван 🚚 Петренко",
+        "phone": "+380501234567",
+        "age": 35,
+        "place_of_living": {"region_key": "Ky", "region_name": "Київська", "city": "Бровари 🏠"},
+        "driving_categories": ["C", "CE"],
+        "driving_experience": {"C": 5, "CE": 3.0},
+        "semi_trailer_types": ["Тентований"],
+        "types_of_work": ["Міжнародні"],
+        "types_of_cars": ["DAF", "MAN 👍"],
+        "race_duration_preference": ["Рейси 21+ день"],
+        "is_adr_license": True,
+        "docs_for_driving_abroad": ["Код 95 (дозвіл на перевезення в ЄС)"],
+        "military_booking": False,
+        "desired_salary": 45000,
+        "description": "Досвід 10 років 💪  на міжнародних рейсах",
+    }
+
+
+def test_emojis_are_stripped_from_text_fields():
+    document = serialize_resume(resume())
+    assert document["name"] == "Іван Петренко"
+    assert document["place_of_living"]["city"] == "Бровари"
+    assert document["types_of_cars"] == ["DAF", "MAN"]
+    assert document["description"] == "Досвід 10 років на міжнародних рейсах"
+
+
+def test_option_fields_are_kept_as_they_are():
+    options = ["Рейси 21+ день ⏱", "Рейси  до 7 днів"]
+    document = serialize_resume({**resume(), "race_duration_preference": options})
+    assert document["race_duration_preference"] == options
+    assert document["place_of_living"]["region_name"] == "Київська"
+    assert document["is_adr_license"] is True
+    assert document["military_booking"] is False
+
+
+def test_age_is_an_int_in_range():
+    for age, expected in (("35", 35), (35.0, 35), (200, None), (-1, None), ("abc", None)):
+        assert serialize_resume({"age": age})["age"] == expected
+    assert serialize_resume({"age": None})["age"] is None
+
+
+def test_desired_salary_ignores_separators():
+    for salary, expected in (("45 000", 45000), ("45,000", 45000), (45000.0, 45000), ("", None)):
+        assert serialize_resume({"desired_salary": salary})["desired_salary"] == expected
+    assert serialize_resume({"desired_salary": "багато"})["desired_salary"] is None
+
+
+def test_invalid_driving_experience_is_left_out():
+    experience = {"B": 2.5, "C": 5.0, "CE": 120, "C1": "x", "C1E": True}
+    document = serialize_resume({"driving_experience": experience})
+    assert document["driving_experience"] == {"B": 2.5, "C": 5}
+    assert isinstance(document["driving_experience"]["C"], int)
+
+
+def test_fields_outside_the_schema_only_get_numbers_normalized():
+    document = serialize_resume(
+        {"extra": {"count": 2.0, "big": FIRESTORE_MAX_INT + 1}, "note": "Привіт 👋"}
+    )
+    assert document["extra"] == {"count": 2, "big": str(FIRESTORE_MAX_INT + 1)}
+    assert document["note"] == "Привіт 👋"
+
+
+def test_unexpected_shapes_fall_back_to_number_normalization():
+    document = serialize_resume(
+        {"types_of_cars": None, "driving_experience": [1.0], "place_of_living": "Київ"}
+    )
+    assert document == {"types_of_cars": None, "driving_experience": [1], "place_of_living": "Київ"}
+
+
+def test_nested_structs_are_compiled():
+    compiled = compile_schema({"outer": {"inner": {"text": RESUME_SCHEMA["name"]}}})
+    document = serialize(compiled, {"outer": {"inner": {"text": "a 🚚 b", "n": 3.0}}})
+    assert document == {"outer": {"inner": {"text": "a b", "n": 3}}}
+
+
+def test_remove_emojis_collapses_whitespace():
+    assert remove_emojis("  Привіт 👋  світ  ") == "Привіт світ"
+    assert remove_emojis("") == ""
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from security_backends import BLACKLIST, WHITELIST, RedisSecurityBackend
+from security_middleware import SecurityMiddleware
+
+
+def shared_backends() -> tuple[RedisSecurityBackend, RedisSecurityBackend]:
+    """Two replicas' backends on one (local stand-in) Redis server."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    return (
+        RedisSecurityBackend(fakeredis.FakeAsyncRedis(server=server)),
+        RedisSecurityBackend(fakeredis.FakeAsyncRedis(server=server)),
+    )
+
+
+def test_redis_request_windows_are_shared():
+    first, second = shared_backends()
+
+    async def run():
+        now = time.time()
+        await first.record_request(1, now, burst_window=2.0)
+        await second.record_request(1, now + 0.1, burst_window=2.0)
+        return await first.record_request(1, now + 0.2, burst_window=2.0)
+
+    counts = asyncio.run(run())
+    assert counts.burst == 3
+    assert counts.per_minute >= 3
+    assert counts.previous_request_time is not None
+
+
+def test_redis_block_and_lists_are_shared():
+    first, second = shared_backends()
+
+    async def run():
+        blocked_until = time.time() + 300
+        await first.set_block(1, blocked_until)
+        await first.add_to_list(WHITELIST, 2)
+        await first.add_to_list(BLACKLIST, 3)
+        statuses = [await second.get_user_status(user_id) for user_id in (1, 2, 3)]
+        await second.remove_from_list(BLACKLIST, 3)
+        return blocked_until, statuses, await first.get_user_status(3)
+
+    blocked_until, (blocked, whitelisted, blacklisted), unlisted = asyncio.run(run())
+    assert blocked.blocked_until == pytest.approx(blocked_until)
+    assert whitelisted.whitelisted and not whitelisted.blacklisted
+    assert blacklisted.blacklisted
+    assert not unlisted.blacklisted
+
+
+def test_redis_callback_counts_are_shared():
+    first, second = shared_backends()
+
+    async def run():
+        now = time.time()
+        results = []
+        for i, backend in enumerate((first, second, first, second)):
+            results.append(await backend.record_callback(1, now + i * 0.1, "toggle_C", 3.0))
+        # Another button starts a new streak
+        results.append(await first.record_callback(1, now + 0.5, "toggle_CE", 3.0))
+        return results
+
+    results = asyncio.run(run())
+    assert [counts.per_second for counts in results] == [1, 2, 3, 4, 5]
+    assert [counts.identical for counts in results] == [1, 2, 3, 4, 1]
+
+
+def test_identical_streak_resets_after_window():
+    first, second = shared_backends()
+
+    async def run():
+        now = time.time()
+        await first.record_callback(1, now, "toggle_C", 3.0)
+        await second.record_callback(1, now + 1.0, "toggle_C", 3.0)
+        return await first.record_callback(1, now + 3.5, "toggle_C", 3.0)
+
+    assert asyncio.run(run()).identical == 1
+
+
+def test_middleware_blocks_are_seen_by_other_replica():
+    first, second = shared_backends()
+    replica = SecurityMiddleware(backend=second)
+
+    async def run():
+        await first.set_block(1, time.time() + 300)
+        status = await second.get_user_status(1)
+        return replica._is_blocked(1, status.blocked_until)
+
+    assert asyncio.run(run())
+
+
+def test_list_methods_stay_sync_and_reach_shared_backend():
+    first, second = shared_backends()
+    middleware = SecurityMiddleware(backend=first)
+
+    async def run():
+        middleware.add_to_whitelist(1)
+        middleware.add_to_blacklist(2)
+        await middleware.flush_list_updates()
+        listed = [await second.get_user_status(user_id) for user_id in (1, 2)]
+        middleware.remove_from_blacklist(2)
+        await middleware.flush_list_updates()
+        return listed, await second.get_user_status(2)
+
+    (whitelisted, blacklisted), unlisted = asyncio.run(run())
+    assert middleware.whitelist == {1}
+    assert whitelisted.whitelisted
+    assert blacklisted.blacklisted
+    assert not unlisted.blacklisted
+
+
+def test_list_methods_with_memory_backend():
+    middleware = SecurityMiddleware()
+    middleware.add_to_whitelist(1)
+    middleware.add_to_blacklist(2)
+    middleware.remove_from_whitelist(1)
+    assert middleware.whitelist == set()
+    assert middleware.blacklist == {2}
+
+    status = asyncio.run(middleware.backend.get_user_status(2))
+    assert status.blacklisted
+
+
+def test_memory_backend_identical_streak():
+    middleware = SecurityMiddleware()
+    backend = middleware.backend
+
+    async def run():
+        now = time.time()
+        presses = ["toggle_C", "toggle_C", "toggle_CE", "toggle_C", "toggle_C"]
+        return [
+            (await backend.record_callback(1, now + i * 0.3, data, 3.0)).identical
+            for i, data in enumerate(presses)
+        ]
+
+    assert asyncio.run(run()) == [1, 2, 1, 1, 2]
+
+
+# A bot replica in its own process: records requests and presses of one button for
+# user 1 and prints the counts it got back. The replicas run at the same time, so
+# their script calls interleave on the server.
+REPLICA_SCRIPT = """
+import asyncio, json, sys
+from redis.asyncio import Redis
+from security_backends import RedisSecurityBackend
+
+async def main(port, replica, count, start):
+    redis = Redis(port=port)
+    backend = RedisSecurityBackend(redis)
+    times = [start + (replica * count + i) * 0.001 for i in range(count)]
+    requests = [await backend.record_request(1, now, burst_window=3600.0) for now in times]
+    callbacks = [await backend.record_callback(1, now, "toggle_C", 3600.0) for now in times]
+    await redis.aclose()
+    print(json.dumps({
+        "per_minute": [counts.per_minute for counts in requests],
+        "burst": [counts.burst for counts in requests],
+        "identical": [counts.identical for counts in callbacks],
+    }))
+
+asyncio.run(main(*map(int, sys.argv[1:4]), float(sys.argv[4])))
+"""
+
+
+def test_redis_windows_are_atomic_across_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    replicas, count = 4, 100
+    # Every timestamp falls into one minute window
+    start = time.time() // 60 * 60 + 1
+
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        env = {**os.environ, "PYTHONPATH": str(Path(__file__).parent.parent / "app")}
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", REPLICA_SCRIPT]
+                + [str(server.server_address[1]), str(replica), str(count), repr(start)],
+                stdout=subprocess.PIPE,
+                env=env,
+                text=True,
+            )
+            for replica in range(replicas)
+        ]
+        results = [json.loads(process.communicate(timeout=60)[0]) for process in processes]
+        assert all(process.returncode == 0 for process in processes)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Each script call saw all calls before it and none got lost
+    total = replicas * count
+    expected = list(range(1, total + 1))
+    assert sorted(round(n) for result in results for n in result["per_minute"]) == expected
+    assert sorted(n for result in results for n in result["burst"]) == expected
+    assert sorted(n for result in results for n in result["identical"]) == expected
@@ -0,0 +1,334 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+import security_middleware
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from fsm_storage import InstrumentedStorage
+from security_middleware import (
+    SecurityMiddleware,
+    SlidingWindowCounter,
+    TimestampRing,
+    create_security_middleware,
+    hamming_distance,
+    message_digest,
+    message_simhash,
+)
+
+USER = User(id=42, is_bot=False, first_name="Іван")
+CHAT = Chat(id=42, type="private")
+
+# Multi-select steps of the survey: taps on the options, then the confirm button
+TOGGLE_STEPS = {
+    "ResumeForm:driving_categories": ["cat_1", "cat_2", "cat_4", "cat_5", "cat_2", "cat_6"],
+    "ResumeForm:driving_semi_trailer_types": ["trailer_0", "trailer_1", "trailer_3"],
+    "ResumeForm:type_of_work": ["work_0", "work_1", "work_0", "work_0", "work_2"],
+    "ResumeForm:types_of_cars": ["car_0", "car_2", "car_3", "car_5", "car_6", "car_7", "car_9"],
+    "ResumeForm:race_duration_preference": ["race_0", "race_1", "race_2"],
+    "ResumeForm:docs_for_driving_abroad": ["docs_0", "docs_2"],
+}
+TEXT_STEPS = {
+    "name": "Іван Петренко",
+    "phone": "+380501234567",
+    "age": "35",
+    "place_of_living_city": "Бровари",
+    "desired_salary": "45000",
+    "description": "Досвід міжнародних перевезень",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(security_middleware, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def answered(monkeypatch):
+    answers = []
+
+    async def safe_callback_answer(callback, text=None, show_alert=False):
+        answers.append(callback.id)
+
+    monkeypatch.setattr(security_middleware, "safe_callback_answer", safe_callback_answer)
+    return answers
+
+
+def message_update(update_id: int, text: str) -> Update:
+    message = Message(
+        message_id=update_id, date=datetime.now(), chat=CHAT, from_user=USER, text=text
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    callback = CallbackQuery(id=str(update_id), from_user=USER, chat_instance="42", data=data)
+    return Update(update_id=update_id, callback_query=callback)
+
+
+def fast_survey_run() -> list[tuple[float, Update, str | None]]:
+    """(seconds since the previous update, update, FSM state) of a quick survey run."""
+    events = [(0.0, message_update(0, "/start"), None)]
+    for step, text in TEXT_STEPS.items():
+        events.append((2.0, message_update(len(events), text), f"ResumeForm:{step}"))
+    for state, taps in TOGGLE_STEPS.items():
+        # A tap every 150 ms, then straight to confirm
+        for i, data in enumerate(taps):
+            delay = 1.0 if i == 0 else 0.15
+            events.append((delay, callback_update(len(events), data), state))
+        events.append((0.15, callback_update(len(events), "confirm"), state))
+    return events
+
+
+async def run_events(middleware, clock, events) -> list[int]:
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.update_id)
+
+    for delay, update, state in events:
+        clock.now += delay
+        await middleware(handler, update, {"raw_state": state})
+    return handled
+
+
+def test_fast_survey_run_is_never_rejected(clock, answered):
+    middleware = create_security_middleware(backend=None)
+    events = fast_survey_run()
+
+    handled = asyncio.run(run_events(middleware, clock, events))
+
+    assert handled == [update.update_id for _, update, _ in events]
+    assert not middleware.get_user_stats(USER.id)["is_blocked"]
+    assert all(stats["failures"] == 0 for stats in middleware.get_rule_stats().values())
+    assert answered == []
+
+
+def test_very_fast_tapping_is_rejected_but_not_blocked(clock, answered):
+    middleware = create_security_middleware(backend=None)
+    # Ten taps 100 ms apart, e.g. a double tap on every option
+    events = [
+        (0.1, callback_update(i, f"cat_{i % 5}"), "ResumeForm:driving_categories")
+        for i in range(10)
+    ]
+
+    handled = asyncio.run(run_events(middleware, clock, events))
+
+    assert len(handled) < len(events)
+    assert not middleware.get_user_stats(USER.id)["is_blocked"]
+    # Every rejected tap is answered
+    assert sorted(answered) == sorted(
+        update.callback_query.id for _, update, _ in events if update.update_id not in handled
+    )
+
+
+def test_callback_flood_is_blocked_and_answered(clock, answered):
+    middleware = create_security_middleware(backend=None)
+    events = [(0.02, callback_update(i, "cat_1"), None) for i in range(100)]
+
+    handled = asyncio.run(run_events(middleware, clock, events))
+
+    assert middleware.get_user_stats(USER.id)["is_blocked"]
+    assert len(handled) + len(answered) == len(events)
+
+
+def test_blocked_message_is_dropped(clock, answered):
+    middleware = SecurityMiddleware()
+    middleware.add_to_blacklist(USER.id)
+
+    handled = asyncio.run(run_events(middleware, clock, [(0.0, message_update(1, "Привіт"), None)]))
+
+    assert handled == []
+    assert answered == []
+
+
+def test_sliding_window_counter_weights_previous_window():
+    counter = SlidingWindowCounter(60)
+    for second in range(0, 60, 2):
+        counter.hit(600.0 + second)
+    assert counter.estimate(659.0) == 30
+    # A quarter into the next window, three quarters of the previous one still count
+    counter.hit(675.0)
+    assert counter.estimate(675.0) == pytest.approx(30 * 0.75 + 1)
+    # Windows further back don't count at all
+    assert counter.estimate(800.0) == 0
+
+
+def test_sliding_window_counter_counts_past_request_history():
+    # More requests than any per-user history kept, so hour/day limits can trip
+    counter = SlidingWindowCounter(3600)
+    for i in range(500):
+        counter.hit(3600.0 + i)
+    assert counter.estimate(4100.0) == 500
+
+
+def test_timestamp_ring_overwrites_oldest_and_counts():
+    ring = TimestampRing(3)
+    assert ring.last() is None
+    for timestamp in (1.0, 2.0, 3.0, 4.0):
+        ring.append(timestamp)
+    assert len(ring) == 3
+    assert ring.last() == 4.0
+    assert ring.count_since(2.5) == 2
+    ring.expire_before(3.5)
+    assert len(ring) == 1
+    ring.clear()
+    assert len(ring) == 0
+
+
+def test_timestamp_ring_key_counts_follow_evictions():
+    ring = TimestampRing(3, with_keys=True)
+    for timestamp, key in ((1.0, 7), (2.0, 7), (3.0, -5), (4.0, 9)):
+        ring.append(timestamp, key)
+    # The first 7 was overwritten
+    assert ring.keys() == [7, -5, 9]
+    assert ring.count_key(7) == 1
+    ring.expire_before(3.5)
+    assert ring.keys() == [9]
+    assert ring.count_key(7) == 0
+    assert ring.count_key(-5) == 0
+
+
+SPAM = "Купуйте дешеві шини у нас, знижки до 50% тільки сьогодні!"
+SPAM_VARIANTS = [
+    "Купуйте дешеві шини у нас! Знижки до 50% тільки сьогодні",
+    "купуйте дешеві шини у нас... знижки до 50% тільки сьогодні!!",
+    "КУПУЙТЕ ДЕШЕВІ ШИНИ У НАС, ЗНИЖКИ ДО 50% ТІЛЬКИ СЬОГОДНІ",
+]
+
+
+def test_message_digest_is_stable_64_bit():
+    digest = message_digest(SPAM)
+    assert digest == message_digest(str(SPAM))
+    assert -(2**63) <= digest < 2**63
+    assert message_digest(SPAM + " ") != digest
+
+
+def test_message_simhash_near_duplicates_are_close():
+    fingerprint = message_simhash(SPAM)
+    for variant in SPAM_VARIANTS:
+        assert hamming_distance(message_simhash(variant), fingerprint) <= 3
+    assert hamming_distance(message_simhash(TEXT_STEPS["description"]), fingerprint) > 3
+
+
+def test_spam_detection_counts_identical_messages(clock):
+    middleware = SecurityMiddleware(max_identical_messages=3, identical_message_window=60)
+    middleware._activity(42)
+    results = []
+    for _ in range(4):
+        clock.now += 5
+        results.append(middleware._check_spam_detection(42, SPAM)[0])
+    assert results == [True, True, True, False]
+    # Out of the window they no longer count
+    clock.now += 61
+    assert middleware._check_spam_detection(42, SPAM)[0]
+
+
+def test_spam_detection_near_duplicates_only_when_enabled(clock):
+    texts = [SPAM, *SPAM_VARIANTS]
+    for distance, expected in ((None, [True] * 4), (3, [True, True, True, False])):
+        middleware = SecurityMiddleware(max_identical_messages=3, near_duplicate_distance=distance)
+        middleware._activity(42)
+        results = []
+        for text in texts:
+            clock.now += 5
+            results.append(middleware._check_spam_detection(42, text)[0])
+        assert results == expected
+
+
+def track(middleware: SecurityMiddleware, clock: FakeClock, user_ids) -> None:
+    for user_id in user_ids:
+        clock.now += 1
+        middleware._activity(user_id).last_activity = clock.now
+
+
+def test_tracked_users_are_capped_least_recent_first(clock):
+    middleware = SecurityMiddleware(max_tracked_users=3)
+    track(middleware, clock, [1, 2, 3, 1, 4])
+    assert list(middleware.user_activities) == [3, 1, 4]
+    assert middleware.evicted_users == 1
+
+
+def test_cap_keeps_blocked_users(clock):
+    middleware = SecurityMiddleware(max_tracked_users=3)
+    track(middleware, clock, [1, 2, 3])
+    middleware.user_activities[1].blocked_until = clock.now + 300
+    track(middleware, clock, [4])
+    assert list(middleware.user_activities) == [3, 4, 1]
+    assert middleware.evicted_users == 1
+    # Once the block is over they can be evicted again
+    clock.now += 301
+    track(middleware, clock, [5, 6, 7])
+    assert list(middleware.user_activities) == [5, 6, 7]
+    assert middleware.evicted_users == 4
+
+
+def test_idle_users_expire_a_batch_at_a_time(clock):
+    middleware = SecurityMiddleware(user_idle_ttl=3600, expiry_batch_size=2)
+    track(middleware, clock, range(1, 6))
+    clock.now += 3600
+    track(middleware, clock, [6])
+    middleware._cleanup_old_data()
+    assert list(middleware.user_activities) == [3, 4, 5, 6]
+    middleware._cleanup_old_data()
+    assert list(middleware.user_activities) == [5, 6]
+    assert middleware.expired_users == 4
+    # Users active within the TTL stop the sweep
+    middleware._cleanup_old_data()
+    assert list(middleware.user_activities) == [6]
+    middleware._cleanup_old_data()
+    assert list(middleware.user_activities) == [6]
+    assert middleware.expired_users == 5
+
+
+def test_expiry_keeps_blocked_users(clock):
+    middleware = SecurityMiddleware(user_idle_ttl=3600, expiry_batch_size=10)
+    track(middleware, clock, [1, 2])
+    middleware.user_activities[1].blocked_until = clock.now + 86400
+    clock.now += 3601
+    middleware._cleanup_old_data()
+    assert list(middleware.user_activities) == [1]
+    assert middleware.expired_users == 1
+
+
+def test_survey_protection_does_not_read_the_state_again(clock):
+    storage = InstrumentedStorage(MemoryStorage())
+    dp = Dispatcher(storage=storage)
+    dp.update.outer_middleware(storage.count_update)
+    dp.update.middleware(create_security_middleware(backend=None))
+    handled = []
+
+    @dp.message()
+    async def answer_step(message: Message, raw_state):
+        handled.append(raw_state)
+
+    async def run():
+        bot = Bot("42:TEST")
+        key = StorageKey(bot_id=bot.id, chat_id=CHAT.id, user_id=USER.id)
+        await storage.storage.set_state(key, "ResumeForm:age")
+        for i in range(3):
+            clock.now += 2
+            await dp.feed_update(bot, message_update(i, "35"))
+        await bot.session.close()
+
+    asyncio.run(run())
+    stats = storage.stats()
+    assert handled == ["ResumeForm:age"] * 3
+    # Only FSMContextMiddleware reads the state; survey protection reuses its raw_state
+    assert stats["get_state_calls"] == 3
+    assert stats["calls_per_update"] == 1.0
@@ -0,0 +1,170 @@
+import asyncio
+
+from firebase_db.journal import WriteJournal
+from firebase_db.supervisor import ResumeSaveSupervisor
+from firebase_db.write_behind import PendingWrite, ResumeWriteBehindQueue
+
+RESUME = {"user_id": 1, "username": "driver", "name": "Іван"}
+
+
+def _supervisor(tmp_path, save, **kwargs) -> ResumeSaveSupervisor:
+    return ResumeSaveSupervisor(
+        save=save, journal=WriteJournal(tmp_path / "saves.jsonl"), backoff=0.0, **kwargs
+    )
+
+
+def _journaled(tmp_path) -> list:
+    return WriteJournal(tmp_path / "saves.jsonl").load()
+
+
+def test_saved_resume_leaves_the_journal(tmp_path):
+    async def save(resume):
+        return "1"
+
+    async def run():
+        supervisor = _supervisor(tmp_path, save)
+        await supervisor.submit(1, RESUME)
+        await supervisor.stop()
+        return supervisor.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["saved"], stats["journaled"]) == (1, 0)
+    assert _journaled(tmp_path) == []
+
+
+def test_failed_save_is_retried_then_kept_and_reported(tmp_path):
+    attempts = []
+    failures = []
+
+    async def save(resume):
+        attempts.append(resume)
+        raise RuntimeError("Firestore unavailable")
+
+    async def on_failure(user_id):
+        failures.append(user_id)
+
+    async def run():
+        supervisor = _supervisor(tmp_path, save, on_failure=on_failure, max_attempts=3)
+        await supervisor.submit(1, RESUME)
+        await supervisor.stop()
+
+    asyncio.run(run())
+    assert len(attempts) == 3
+    assert failures == [1]
+    assert _journaled(tmp_path) == [{"user_id": 1, "resume": RESUME}]
+
+
+def test_queued_save_stays_journaled_until_flushed(tmp_path):
+    queued = {1}
+
+    async def save(resume):
+        return "1"  # e.g. only enqueued to write-behind
+
+    async def run():
+        supervisor = _supervisor(tmp_path, save, is_persisted=lambda user_id: user_id not in queued)
+        await supervisor.submit(1, RESUME)
+        await supervisor.stop()
+        after_save = _journaled(tmp_path)
+        # A flush of some other write while this one is still queued
+        await supervisor.confirm_persisted([1])
+        still_queued = _journaled(tmp_path)
+        queued.clear()
+        await supervisor.confirm_persisted([1])
+        return after_save, still_queued, supervisor.stats()
+
+    after_save, still_queued, stats = asyncio.run(run())
+    assert after_save == [{"user_id": 1, "resume": RESUME}]
+    assert still_queued == after_save
+    assert (stats["journaled"], stats["awaiting_flush"]) == (0, 0)
+    assert _journaled(tmp_path) == []
+
+
+def test_newer_resume_is_not_confirmed_by_an_older_flush(tmp_path):
+    queued = {1}
+
+    async def save(resume):
+        return "1"
+
+    newer = {**RESUME, "name": "Петро"}
+
+    async def run():
+        supervisor = _supervisor(tmp_path, save, is_persisted=lambda user_id: user_id not in queued)
+        await supervisor.submit(1, RESUME)
+        await supervisor.stop()
+        await supervisor.submit(1, newer)
+        # The flush of the first resume arrives before the newer one is saved
+        queued.clear()
+        await supervisor.confirm_persisted([1])
+        journal = _journaled(tmp_path)
+        await supervisor.stop()
+        return journal
+
+    assert asyncio.run(run())[-1] == {"user_id": 1, "resume": newer}
+    assert _journaled(tmp_path) == []
+
+
+def test_journaled_saves_are_replayed_on_start(tmp_path):
+    saved = []
+
+    async def save(resume):
+        saved.append(resume)
+        return "1"
+
+    WriteJournal(tmp_path / "saves.jsonl").append(
+        [{"user_id": 1, "resume": RESUME}, {"user_id": 1, "resume": {**RESUME, "age": 30}}]
+    )
+
+    async def run():
+        supervisor = _supervisor(tmp_path, save)
+        await supervisor.start()
+        await supervisor.stop()
+
+    asyncio.run(run())
+    assert saved == [{**RESUME, "age": 30}]
+    assert _journaled(tmp_path) == []
+
+
+def test_given_up_write_behind_write_is_reported(tmp_path):
+    failures = []
+
+    async def commit(writes):
+        raise RuntimeError("Firestore unavailable")
+
+    async def on_failure(user_id):
+        failures.append(user_id)
+
+    async def run():
+        async def save(resume):
+            queue.enqueue(resume["user_id"], PendingWrite(op="set", data=resume))
+            return "1"  # only queued
+
+        supervisor = _supervisor(
+            tmp_path,
+            save,
+            on_failure=on_failure,
+            is_persisted=lambda user_id: not queue.has_pending(user_id),
+        )
+        queue = ResumeWriteBehindQueue(
+            commit=commit,
+            journal=WriteJournal(tmp_path / "writes.jsonl"),
+            max_attempts=2,
+            on_flushed=supervisor.confirm_persisted,
+            on_failed=supervisor.persist_failed,
+        )
+        await supervisor.submit(1, RESUME)
+        await supervisor.stop()
+        reported_early = list(failures)
+        await queue.flush()
+        await queue.flush()
+        return reported_early, supervisor.stats()
+
+    reported_early, stats = asyncio.run(run())
+    # The save counted as done once queued; the user hears about it when the write is dropped
+    assert reported_early == []
+    assert failures == [1]
+    assert (stats["failed"], stats["awaiting_flush"], stats["journaled"]) == (1, 0, 0)
+    assert _journaled(tmp_path) == []
+    # The write itself is kept for replay by the write-behind journal
+    assert WriteJournal(tmp_path / "writes.jsonl").load() == [
+        {"user_id": 1, "op": "set", "data": RESUME}
+    ]
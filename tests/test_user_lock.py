@@ -0,0 +1,197 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+import user_lock
+from aiogram.types import CallbackQuery, Chat, Message, User
+from constants import msg_please_wait
+from user_lock import UserLockMiddleware
+
+USER = User(id=42, is_bot=False, first_name="Іван")
+CHAT = Chat(id=42, type="private")
+OTHER_USER = User(id=43, is_bot=False, first_name="Петро")
+OTHER_CHAT = Chat(id=43, type="private")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeState:
+    """FSMContext stand-in counting state reads"""
+
+    def __init__(self, state: str | None):
+        self.state = state
+        self.reads = 0
+
+    async def get_state(self) -> str | None:
+        self.reads += 1
+        return self.state
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(user_lock, "time", clock)
+    return clock
+
+
+def message(message_id: int) -> Message:
+    return Message(
+        message_id=message_id, date=datetime.now(), chat=CHAT, from_user=USER, text="Київ"
+    )
+
+
+def test_updates_past_max_waiters_are_dropped_with_one_wait_reply(monkeypatch):
+    replies = []
+    answers = []
+
+    async def answer(self, text, **kwargs):
+        replies.append(text)
+
+    async def safe_callback_answer(callback, text=None, show_alert=False):
+        answers.append(text)
+
+    monkeypatch.setattr(Message, "answer", answer)
+    monkeypatch.setattr(user_lock, "safe_callback_answer", safe_callback_answer)
+
+    async def run():
+        middleware = UserLockMiddleware(max_waiters=1)
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(event, data):
+            await release.wait()
+            handled.append(event)
+
+        data = {"event_from_user": USER, "event_chat": CHAT}
+        tasks = [asyncio.create_task(middleware(handler, message(i), dict(data))) for i in range(5)]
+        callback = CallbackQuery(id="1", from_user=USER, chat_instance="42", data="cat_1")
+        tasks.append(asyncio.create_task(middleware(handler, callback, dict(data))))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return middleware, handled
+
+    middleware, handled = asyncio.run(run())
+    assert len(handled) == 2
+    stats = middleware.stats()
+    assert (stats["dropped"], stats["dropped_messages"], stats["wait_replies"]) == (4, 3, 1)
+    assert stats["active_users"] == 0
+    assert replies == [msg_please_wait]
+    assert answers == [msg_please_wait]
+
+
+def update_data(user: User, chat: Chat, **extra) -> dict:
+    return {"event_from_user": user, "event_chat": chat, **extra}
+
+
+def test_same_user_runs_serially_other_users_in_parallel():
+    async def run():
+        middleware = UserLockMiddleware()
+        running = {USER.id: 0, OTHER_USER.id: 0}
+        peaks = {USER.id: 0, OTHER_USER.id: 0}
+        overlapped = []
+
+        async def handler(event, data):
+            user_id = data["event_from_user"].id
+            running[user_id] += 1
+            peaks[user_id] = max(peaks[user_id], running[user_id])
+            for _ in range(3):
+                await asyncio.sleep(0)
+                overlapped.append(all(running.values()))
+            running[user_id] -= 1
+            return event
+
+        updates = [(USER, CHAT, 1), (USER, CHAT, 2), (OTHER_USER, OTHER_CHAT, 3), (USER, CHAT, 4)]
+        results = await asyncio.gather(
+            *(middleware(handler, event, update_data(user, chat)) for user, chat, event in updates)
+        )
+        return results, peaks, any(overlapped), middleware.stats()
+
+    results, peaks, overlapped, stats = asyncio.run(run())
+    assert results == [1, 2, 3, 4]
+    assert peaks == {USER.id: 1, OTHER_USER.id: 1}
+    assert overlapped
+    assert (stats["acquired"], stats["contended"]) == (4, 2)
+
+
+def test_state_is_read_again_after_waiting():
+    async def run():
+        middleware = UserLockMiddleware()
+        state = FakeState("ResumeForm:driving_categories")
+        seen = []
+
+        async def handler(event, data):
+            seen.append(data["raw_state"])
+            await asyncio.sleep(0)
+            # The confirm tap moves the survey on
+            state.state = "ResumeForm:driving_semi_trailer_types"
+
+        # Both updates were given the state read before the first one ran
+        data = update_data(USER, CHAT, state=state, raw_state=state.state)
+        await asyncio.gather(
+            *(middleware(handler, event, dict(data)) for event in ("confirm", "trailer_0"))
+        )
+        return seen, state.reads
+
+    seen, reads = asyncio.run(run())
+    assert seen == ["ResumeForm:driving_categories", "ResumeForm:driving_semi_trailer_types"]
+    # Only the update that waited reads the state again
+    assert reads == 1
+
+
+def test_slots_are_freed_when_users_go_idle():
+    async def failing_handler(event, data):
+        raise ValueError("handler failed")
+
+    async def run():
+        middleware = UserLockMiddleware()
+        release = asyncio.Event()
+        in_flight = []
+
+        async def handler(event, data):
+            await release.wait()
+
+        users = [User(id=user_id, is_bot=False, first_name="Іван") for user_id in range(100)]
+        tasks = [
+            asyncio.create_task(middleware(handler, None, update_data(user, None)))
+            for user in users * 2
+        ]
+        await asyncio.sleep(0)
+        in_flight.append(middleware.stats()["active_users"])
+        release.set()
+        await asyncio.gather(*tasks)
+        # An update failing in the handler frees its slot too
+        with pytest.raises(ValueError):
+            await middleware(failing_handler, None, update_data(USER, CHAT))
+        return in_flight, middleware
+
+    in_flight, middleware = asyncio.run(run())
+    assert in_flight == [100]
+    assert middleware._slots == {}
+    assert middleware.stats()["active_users"] == 0
+
+
+def test_wait_time_is_recorded(clock):
+    async def run():
+        middleware = UserLockMiddleware()
+
+        async def handler(event, data):
+            await asyncio.sleep(0)
+            clock.now += event
+
+        await asyncio.gather(
+            *(middleware(handler, seconds, update_data(USER, CHAT)) for seconds in (2.0, 1.0, 0.5))
+        )
+        return middleware.stats()
+
+    stats = asyncio.run(run())
+    # The second update waits 2 s, the third 3 s
+    assert (stats["acquired"], stats["contended"]) == (3, 2)
+    assert stats["max_wait"] == 3.0
+    assert stats["avg_wait"] == pytest.approx(5.0 / 3)
@@ -0,0 +1,135 @@
+import asyncio
+
+from firebase_db.journal import WriteJournal
+from firebase_db.write_behind import PendingWrite, ResumeWriteBehindQueue
+
+
+def test_merge_update_on_set_keeps_set():
+    merged = PendingWrite(op="set", data={"name": "A", "age": 30}).merge(
+        PendingWrite(op="update", data={"age": 31})
+    )
+    assert merged.op == "set"
+    assert merged.data == {"name": "A", "age": 31}
+
+
+def test_merge_set_or_delete_replaces_previous():
+    previous = PendingWrite(op="update", data={"age": 31})
+    assert previous.merge(PendingWrite(op="delete")).op == "delete"
+    newer_set = PendingWrite(op="set", data={"name": "B"})
+    assert previous.merge(newer_set) is newer_set
+
+
+def test_merge_update_after_delete_keeps_delete():
+    merged = PendingWrite(op="delete").merge(PendingWrite(op="update", data={"age": 1}))
+    assert merged.op == "delete"
+
+
+def test_merge_keeps_retry_state():
+    failed = PendingWrite(op="update", data={"a": 1}, attempts=2, retry_at=5.0)
+    merged = failed.merge(PendingWrite(op="update", data={"b": 2}))
+    assert (merged.attempts, merged.retry_at) == (2, 5.0)
+    assert merged.data == {"a": 1, "b": 2}
+
+
+def test_apply():
+    stored = {"user_id": 1, "username": "old", "age": 30}
+    assert PendingWrite(op="delete").apply(stored) is None
+    assert PendingWrite(op="set", data={"age": 40}).apply(stored) == {"age": 40}
+    # Updates never change the owner fields
+    updated = PendingWrite(op="update", data={"age": 31, "username": "new"}).apply(stored)
+    assert updated == {"user_id": 1, "username": "old", "age": 31}
+    # Updating a missing resume leaves it missing
+    assert PendingWrite(op="update", data={"age": 31}).apply(None) is None
+
+
+def _queue(tmp_path, commit, **kwargs) -> ResumeWriteBehindQueue:
+    return ResumeWriteBehindQueue(
+        commit=commit, journal=WriteJournal(tmp_path / "journal.jsonl"), **kwargs
+    )
+
+
+def test_flush_coalesces_and_commits_in_batches(tmp_path):
+    batches = []
+
+    async def commit(batch):
+        batches.append([(user_id, write.op) for user_id, write in batch])
+
+    async def run():
+        queue = _queue(tmp_path, commit, max_batch_size=2)
+        queue.enqueue(1, PendingWrite(op="set", data={"age": 30}))
+        queue.enqueue(1, PendingWrite(op="update", data={"age": 31}))
+        queue.enqueue(2, PendingWrite(op="delete"))
+        queue.enqueue(3, PendingWrite(op="set", data={}))
+        await queue.flush()
+        return queue
+
+    queue = asyncio.run(run())
+    assert batches == [[(1, "set"), (2, "delete")], [(3, "set")]]
+    assert queue.stats()["coalesced"] == 1
+    assert queue.stats()["pending"] == 0
+
+
+def test_failing_on_flushed_does_not_fail_flush(tmp_path):
+    async def commit(batch):
+        pass
+
+    async def on_flushed(user_ids):
+        raise RuntimeError("callback failed")
+
+    async def run():
+        queue = _queue(tmp_path, commit, on_flushed=on_flushed)
+        queue.enqueue(1, PendingWrite(op="delete"))
+        await queue.flush()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.stats()["writes_committed"] == 1
+    assert queue.stats()["pending"] == 0
+
+
+def test_failed_write_backs_off_and_is_journaled(tmp_path):
+    attempts = []
+
+    async def commit(batch):
+        attempts.append(len(batch))
+        raise RuntimeError("Firestore unavailable")
+
+    async def run():
+        queue = _queue(tmp_path, commit, retry_backoff=60.0)
+        queue.enqueue(1, PendingWrite(op="set", data={"age": 30}))
+        await queue.flush(due_only=True)
+        # Still backing off: the next tick does not retry it
+        await queue.flush(due_only=True)
+        return queue
+
+    queue = asyncio.run(run())
+    assert attempts == [1]
+    assert queue.stats()["pending"] == 1
+    assert WriteJournal(tmp_path / "journal.jsonl").load() == [
+        {"user_id": 1, "op": "set", "data": {"age": 30}}
+    ]
+
+
+def test_failed_write_stays_visible_while_later_batches_commit(tmp_path):
+    reads = []
+
+    async def commit(batch):
+        user_ids = [user_id for user_id, _ in batch]
+        if 1 in user_ids:
+            raise RuntimeError("Firestore unavailable")
+        # A read while the second batch is being written
+        reads.append((queue.has_pending(1), queue.overlay(1, {"age": 30})))
+
+    async def run():
+        nonlocal queue
+        queue = _queue(tmp_path, commit, max_batch_size=1)
+        queue.enqueue(1, PendingWrite(op="update", data={"age": 31}))
+        queue.enqueue(2, PendingWrite(op="delete"))
+        await queue.flush()
+        return queue.stats()
+
+    queue = None
+    stats = asyncio.run(run())
+    assert reads == [(True, {"age": 31})]
+    # Tried once per flush, then left for the next one
+    assert (stats["writes_failed"], stats["pending"]) == (1, 1)